@@ -0,0 +1,113 @@
+"""Compara el preprocesamiento original del tablero con ``preprocesamiento.py``.
+
+Genera líneas sintéticas con la forma que devolvía la consulta original
+(fecha y hora como texto, nombres repetidos), las pasa por los dos caminos
+con el mismo filtro (un mes y una ventana de horas) y mide tiempo y pico de
+memoria con ``tracemalloc``. Los resultados de ambos deben coincidir.
+
+Uso::
+
+    python -m backend.datapp.benchmark_preprocesamiento --filas 1000000
+"""
+import argparse
+import datetime
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from backend.datapp import preprocesamiento
+
+
+def lineas_sinteticas(filas, semilla=0):
+    """Líneas de dos años con 20 empleados y 300 productos."""
+    azar = np.random.default_rng(semilla)
+    dias = azar.integers(0, 730, filas)
+    segundos = azar.integers(8 * 3600, 23 * 3600, filas)
+    fechas = (np.datetime64('2024-01-01') + dias).astype(str)
+    horas = pd.Series(segundos).map(lambda s: f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}")
+    cantidad = azar.integers(1, 6, filas)
+    return pd.DataFrame({
+        'fecha_emision': fechas.astype(object),
+        'hora_emision': horas.to_numpy(dtype=object),
+        'empleado_nombre': np.array([f"Empleado {i}" for i in range(20)], dtype=object)[azar.integers(0, 20, filas)],
+        'producto_nombre': np.array([f"Producto {i}" for i in range(300)], dtype=object)[azar.integers(0, 300, filas)],
+        'cantidad_vendida': cantidad,
+        'total_venta': cantidad * azar.integers(10, 200, filas) * 100.0,
+    })
+
+
+def legado(df, año_filtro, mes_filtro, dia_rango_filtro, time_inicio, time_fin):
+    """Lo que hacía ``run_dashboard`` antes: ``apply`` por fila, texto y ``df.copy()``."""
+    df = df.copy()  # read_sql entregaba un DataFrame nuevo en cada render
+    df['fecha_emision'] = pd.to_datetime(df['fecha_emision']).dt.date
+    df['hora_emision_str'] = df['hora_emision'].astype(str).apply(lambda t: str(t).split('.')[0])
+    df['fecha_hora_emision'] = pd.to_datetime(df['fecha_emision'].astype(str) + ' ' + df['hora_emision_str'])
+    df['año'] = df['fecha_hora_emision'].dt.year
+    df['mes_num'] = df['fecha_hora_emision'].dt.month
+    df['mes'] = df['fecha_hora_emision'].dt.month_name()
+    df['dia'] = df['fecha_hora_emision'].dt.day
+    df['dia_semana'] = df['fecha_hora_emision'].dt.day_name()
+    df['hora_emision_time'] = df['fecha_hora_emision'].dt.time
+
+    filtrado = df.copy()
+    filtrado = filtrado[filtrado['fecha_hora_emision'].dt.year == año_filtro]
+    filtrado = filtrado[filtrado['fecha_hora_emision'].dt.month_name() == mes_filtro]
+    filtrado = filtrado[(filtrado['fecha_hora_emision'].dt.day >= dia_rango_filtro[0]) & (filtrado['fecha_hora_emision'].dt.day <= dia_rango_filtro[1])]
+    filtrado = filtrado[(filtrado['fecha_hora_emision'].dt.time >= time_inicio) & (filtrado['fecha_hora_emision'].dt.time <= time_fin)]
+
+    por_fecha = filtrado.groupby(filtrado['fecha_hora_emision'].dt.date)['total_venta'].sum()
+    por_empleado = filtrado.groupby('empleado_nombre')['total_venta'].sum()
+    por_producto = filtrado.groupby('producto_nombre')[['total_venta', 'cantidad_vendida']].sum()
+    return por_fecha, por_empleado, por_producto
+
+
+def vectorizado(df, desde, hasta, hora_desde, hora_hasta):
+    lineas = preprocesamiento.preparar(df)
+    filtro = (desde, hasta, hora_desde, hora_hasta)
+    return tuple(preprocesamiento.agrupar(lineas, agrupacion, filtro) for agrupacion in ('dia', 'empleado', 'producto'))
+
+
+def medir(funcion, *args):
+    """Segundos y pico de memoria (MB) de ``funcion(*args)``, y su resultado.
+
+    Son dos corridas: ``tracemalloc`` encarece cada asignación y falsearía
+    el tiempo.
+    """
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    segundos = time.perf_counter() - inicio
+    tracemalloc.start()
+    funcion(*args)
+    pico = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return segundos, pico, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del preprocesamiento del tablero")
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    filas = parser.parse_args().filas
+
+    df = lineas_sinteticas(filas)
+    desde, hasta = datetime.date(2025, 3, 1), datetime.date(2025, 3, 31)
+    seg_legado, mem_legado, (fecha_l, empleado_l, producto_l) = medir(
+        legado, df, 2025, 'March', (1, 31), datetime.time(13, 0, 0), datetime.time(17, 59, 59),
+    )
+    seg_nuevo, mem_nuevo, (fecha_n, empleado_n, producto_n) = medir(vectorizado, df, desde, hasta, 13, 17)
+
+    assert np.allclose(fecha_l.to_numpy(), fecha_n['total_venta'].to_numpy())
+    assert np.allclose(empleado_l.to_numpy(), empleado_n['total_venta'].to_numpy())
+    assert (producto_l['cantidad_vendida'].to_numpy() == producto_n['cantidad_vendida'].to_numpy()).all()
+
+    compacto = preprocesamiento.preparar(df).memory_usage(deep=True).sum() / 1e6
+    print(f"{filas:,} líneas (DataFrame de entrada: {df.memory_usage(deep=True).sum() / 1e6:,.0f} MB)")
+    print(f"{'':12}{'segundos':>10}{'pico MB':>10}")
+    print(f"{'original':12}{seg_legado:>10.2f}{mem_legado:>10.0f}")
+    print(f"{'vectorizado':12}{seg_nuevo:>10.2f}{mem_nuevo:>10.0f}")
+    print(f"DataFrame compacto: {compacto:,.0f} MB; {seg_legado / seg_nuevo:.0f}x más rápido")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,120 +2,220 @@ import datetime
 import pandas as pd
 import streamlit as st
 import altair as alt
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from pathlib import Path
 
-
-def run_dashboard():
-    """Renderiza el tablero de ventas.
+from backend.datapp import preprocesamiento, snapshot
+
+
+# Orden para los días de la semana (en inglés, ya que .dt.day_name() devuelve nombres en inglés por defecto)
+orden_dias_semana = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+# Orden para los meses (en inglés)
+orden_meses = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
+
+# Tiempo máximo que un resultado vive en la caché aunque la marca de agua no cambie
+DURACION_CACHE = 600
+
+# Celdas del cubo de ventas (solo facturas activas, ver gestion/cubo.py); los
+# filtros se agregan como predicados con parámetros
+CONSULTA_VENTAS = """
+    SELECT {columnas}, SUM(c.total) AS total_venta
+    FROM {tabla} c
+    {joins}
+    WHERE 1 = 1 {filtros}
+    GROUP BY {grupo}
+"""
+
+AGRUPACIONES = {
+    'empleado': {
+        'columnas': "(e.nombre || ' ' || e.apellido) AS empleado_nombre",
+        'joins': "JOIN gestion_empleado e ON e.id = c.empleado_id",
+        'grupo': "e.id",
+    },
+    'producto': {
+        'columnas': "p.nombre AS producto_nombre, SUM(c.cantidad) AS cantidad_vendida",
+        'joins': "JOIN gestion_producto p ON p.id = c.producto_id",
+        'grupo': "p.id",
+    },
+    'dia': {
+        'columnas': "c.fecha AS fecha",
+        'joins': "",
+        'grupo': "c.fecha ORDER BY c.fecha",
+    },
+}
+
+# Nivel del cubo: tabla y su columna de fecha
+NIVELES = {
+    'hora': ('gestion_cubohora', 'fecha'),
+    'dia': ('gestion_cubodia', 'fecha'),
+    'mes': ('gestion_cubomes', 'mes'),
+}
+
+
+@st.cache_resource
+def obtener_engine():
+    """Motor de SQLAlchemy compartido por todas las sesiones y reruns.
 
     Construye la ruta de la base de datos de forma relativa al
     directorio ``backend`` para evitar dependencias de rutas absolutas.
     """
     BASE_DIR = Path(__file__).resolve().parent.parent  # .../Proyecto/backend
     DB_PATH = BASE_DIR / "webapp" / "db.sqlite3"
+    return create_engine(f"sqlite:///{DB_PATH}")
+
+
+def marca_de_agua(engine):
+    """Identifica el estado de los datos para invalidar la caché.
 
-    engine = create_engine(f"sqlite:///{DB_PATH}")
-
-
-
-    # --- Database Connection Details ---
-    # Asegúrate de que estos datos son correctos para tu base de datos
-    user = "mi_usuario"
-    password = "userRoot11"
-    host = "localhost"
-    port = "3306"
-    db = "mi_basededatos"
-
-    # Crear motor de conexión
-    #try:
-    #    engine = create_engine(f"mysql+pymysql://{user}:{password}@{host}:{port}/{db}")
-    #except Exception as e:
-    #    st.error(f"Error al crear el motor de conexión a la base de datos: {e}")
-    #    st.stop() # Detiene la ejecución si hay un error
-
-    # Leer datos con SQL
-    query = """
-    SELECT
-        f.fecha_emision,
-        f.hora_emision,
-        e.id AS empleado_id,
-        (e.nombre || ' ' || e.apellido) AS empleado_nombre,
-        p.id AS producto_id,
-        p.nombre AS producto_nombre,
-        SUM(df.cantidad) AS cantidad_vendida,
-        SUM(df.cantidad * df.precio_unitario) AS total_venta
-    FROM
-        gestion_factura f
-    JOIN
-        gestion_empleado e ON f.empleado_id = e.id
-    JOIN
-        gestion_detallefactura df ON f.id = df.factura_id
-    JOIN
-        gestion_producto p ON df.producto_id = p.id
-    WHERE
-        f.anulado = 0
-    GROUP BY
-        f.fecha_emision, f.hora_emision, e.id, p.id
-    ORDER BY
-        f.fecha_emision DESC, total_venta DESC;
+    Es la misma marca que usa la API de analytics: el último id del registro
+    de cambios (``gestion_cambiofactura``, lo llenan triggers con cada
+    factura o línea creada, editada, anulada o borrada, aunque el total no
+    cambie) y la versión ``datos`` de ``gestion_version``, que mueven las
+    reconstrucciones y las cargas con los triggers suspendidos. Se lee de
+    ``sqlite_sequence`` y no de ``MAX(id)``: el ETL de snapshots borra los
+    cambios ya consumidos.
     """
+    with engine.connect() as conn:
+        return ('sql',) + tuple(conn.execute(text("""
+            SELECT (SELECT seq FROM sqlite_sequence WHERE name = 'gestion_cambiofactura'),
+                   (SELECT valor FROM gestion_version WHERE clave = 'datos')
+        """)).one())
 
 
+def es_fin_de_mes(fecha):
+    return (fecha + datetime.timedelta(days=1)).day == 1
 
-    # Cargar datos
-    try:
-        df = pd.read_sql(query, engine)
-    except Exception as e:
-        st.error(f"Error al conectar a la base de datos o ejecutar la consulta: {e}")
-        st.stop() # Detiene la ejecución si hay un error en la base de datos
 
-    # Convertir fecha_emision a datetime
-    df['fecha_emision'] = pd.to_datetime(df['fecha_emision']).dt.date # Keep only the date part
-
-    # Handle hora_emision column: convert to string 'HH:MM:SS' if it's timedelta
-    # This is a more robust way to handle different ways read_sql might return TIME data
-    if pd.api.types.is_timedelta64_dtype(df['hora_emision']):
-        # Convert timedelta to total seconds, then format as HH:MM:SS
-        df['hora_emision_str'] = df['hora_emision'].apply(
-            lambda td: (datetime.timedelta(seconds=td.total_seconds())).total_seconds()
-        ).apply(
-            lambda s: f"{int(s // 3600):02d}:{(int(s % 3600 // 60)):02d}:{(int(s % 60)):02d}"
-        )
-    elif pd.api.types.is_object_dtype(df['hora_emision']):
-         # If it's object dtype, assume it might be time objects or strings already
-         # Attempt to convert to string 'HH:MM:SS'
-         df['hora_emision_str'] = df['hora_emision'].astype(str).apply(lambda t: str(t).split('.')[0]) # Handle potential microseconds
-    else:
-        # If it's neither timedelta nor object, assume it's already a time-like series
-        # Convert to string 'HH:MM:SS'
-        df['hora_emision_str'] = df['hora_emision'].astype(str).apply(lambda t: str(t).split('.')[0]) # Handle potential microseconds
+def nivel_cubo(agrupacion, filtro):
+    """El nivel más agregado del cubo que responde ``agrupacion`` con ``filtro``.
+
+    La ventana de horas solo existe en el grano por hora; los meses sirven
+    cuando el rango cubre meses completos y no se agrupa por día.
+    """
+    desde, hasta, hora_desde, _ = filtro
+    if hora_desde is not None:
+        return 'hora'
+    if agrupacion != 'dia' and (desde is None or desde.day == 1) and (hasta is None or es_fin_de_mes(hasta)):
+        return 'mes'
+    return 'dia'
+
 
+def predicados(filtro, columna_fecha):
+    """Traduce ``(desde, hasta, hora_desde, hora_hasta)`` a SQL y parámetros.
 
-    # Create a new datetime column combining date and time strings
-    # Combine date string and time string, then convert to datetime
-    df['fecha_hora_emision'] = pd.to_datetime(
-        df['fecha_emision'].astype(str) + ' ' + df['hora_emision_str']
+    Las fechas son inclusivas; las horas son enteras (0-23) y también
+    inclusivas, hasta el final de ``hora_hasta``.
+    """
+    desde, hasta, hora_desde, hora_hasta = filtro
+    sql, params = [], {}
+    if desde is not None:
+        sql.append(f"AND c.{columna_fecha} >= :desde")
+        params['desde'] = desde.isoformat()
+    if hasta is not None:
+        sql.append(f"AND c.{columna_fecha} <= :hasta")
+        params['hasta'] = hasta.isoformat()
+    if hora_desde is not None:
+        sql.append("AND c.hora BETWEEN :hora_desde AND :hora_hasta")
+        params['hora_desde'] = hora_desde
+        params['hora_hasta'] = hora_hasta
+    return ' '.join(sql), params
+
+
+def marca_snapshot(estado):
+    """Marca de agua de los snapshots: cambia con cada corrida del ETL."""
+    return ('snapshot', estado['marca'], estado['actualizado'])
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def lineas_snapshot(marca):
+    """Líneas activas del snapshot ya preprocesadas (ver ``preprocesamiento.py``).
+
+    Se comparten entre sesiones sin copiarse; solo se vuelven a cargar cuando
+    el ETL cambia la marca.
+    """
+    tabla = snapshot.lineas(columnas=['fecha', 'hora', 'empleado_id', 'producto_id', 'cantidad', 'total'])
+    return preprocesamiento.desde_snapshot(
+        tabla, snapshot.dimension('empleados'), snapshot.dimension('productos'),
     )
 
 
-    # Extract date and time components from the new combined column
-    df['año'] = df['fecha_hora_emision'].dt.year
-    df['mes_num'] = df['fecha_hora_emision'].dt.month # Número del mes para ordenar
-    df['mes'] = df['fecha_hora_emision'].dt.month_name() # Nombre del mes
-    df['dia'] = df['fecha_hora_emision'].dt.day # Número del día
-    df['dia_semana'] = df['fecha_hora_emision'].dt.day_name() # Nombre del día de la semana
-    df['hora_emision_time'] = df['fecha_hora_emision'].dt.time # Extract time object for filtering
+@st.cache_data(ttl=DURACION_CACHE, show_spinner=False)
+def ventas_agrupadas(_engine, agrupacion, filtro, marca):
+    """Ventas de ``filtro`` ya agrupadas por ``agrupacion`` (ver ``AGRUPACIONES``).
+
+    ``marca`` dice de dónde leer (base o snapshot) y forma parte de la clave
+    de la caché.
+    """
+    if marca[0] == 'snapshot':
+        return preprocesamiento.agrupar(lineas_snapshot(marca), agrupacion, filtro)
+    tabla, columna_fecha = NIVELES[nivel_cubo(agrupacion, filtro)]
+    filtros, params = predicados(filtro, columna_fecha)
+    consulta = CONSULTA_VENTAS.format(tabla=tabla, filtros=filtros, **AGRUPACIONES[agrupacion])
+    df = pd.read_sql(text(consulta), _engine, params=params)
+    if agrupacion == 'dia':
+        df['fecha'] = pd.to_datetime(df['fecha']).dt.date
+    return df
+
+
+@st.cache_data(ttl=DURACION_CACHE, show_spinner=False)
+def dias_con_ventas(_engine, marca):
+    """Fechas con al menos una venta activa, para llenar los selectores."""
+    if marca[0] == 'snapshot':
+        fechas = pd.Series(preprocesamiento.dias_presentes(lineas_snapshot(marca)))
+    else:
+        df = pd.read_sql(
+            text("SELECT DISTINCT fecha FROM gestion_cubodia ORDER BY fecha"),
+            _engine,
+        )
+        fechas = pd.to_datetime(df['fecha'])
+    return pd.DataFrame({
+        'año': fechas.dt.year,
+        'mes_num': fechas.dt.month,
+        'mes': fechas.dt.month_name(),
+        'dia': fechas.dt.day,
+    })
+
+
+def rango_de_fechas(año, mes, dias):
+    """Convierte la selección año/mes/días de la barra lateral en ``(desde, hasta)``."""
+    if año is None:
+        return None, None
+    if mes is None:
+        return datetime.date(año, 1, 1), datetime.date(año, 12, 31)
+    mes_num = orden_meses.index(mes) + 1
+    if dias is None:
+        ultimo = (datetime.date(año + mes_num // 12, mes_num % 12 + 1, 1) - datetime.timedelta(days=1)).day
+        dias = (1, ultimo)
+    return datetime.date(año, mes_num, dias[0]), datetime.date(año, mes_num, dias[1])
+
 
+def run_dashboard():
+    """Renderiza el tablero de ventas.
 
-    # Orden para los días de la semana (en inglés, ya que .dt.day_name() devuelve nombres en inglés por defecto)
-    orden_dias_semana = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    # Orden para los meses (en inglés)
-    orden_meses = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
+    Cada interacción solo consulta lo que cambió: los filtros viajan a SQL
+    sobre el cubo de ventas (el nivel más agregado que sirva) y los
+    resultados agrupados se guardan en ``st.cache_data`` por filtro y marca
+    de agua de los datos. Si existe un snapshot (``snapshot.py``) se lee
+    de ahí y no se toca la base de las cajas.
+    """
+    try:
+        estado = snapshot.leer_estado()
+        if estado is not None:
+            engine = None
+            marca = marca_snapshot(estado)
+        else:
+            engine = obtener_engine()
+            marca = marca_de_agua(engine)
+        df = dias_con_ventas(engine, marca)
+    except Exception as e:
+        st.error(f"Error al conectar a la base de datos o ejecutar la consulta: {e}")
+        st.stop() # Detiene la ejecución si hay un error en la base de datos
 
 
     # --- Streamlit App Layout ---
     st.title("Datos de ventas")
+    if estado is not None:
+        st.caption(f"Datos del snapshot actualizado el {estado['actualizado']}")
 
     # --- Sidebar for Filtering ---
     st.sidebar.header("Filtro de Fecha")
@@ -262,39 +362,22 @@ def run_dashboard():
     # mostrar_dataframe_filtrado = st.sidebar.checkbox("Mostrar datos filtrados", value=False, key='sidebar_display_filtered_df')
 
 
-    # --- Filtrar el DataFrame principal basado en las selecciones de la sidebar ---
-    # Filter using the combined 'fecha_hora_emision' column for date and time
-    df_filtrado_global = df.copy() # Empezar con una copia del DataFrame completo
-
-    # Aplicar filtro de fecha primero using the date part of the combined column
+    # --- Filtro como predicados SQL: fechas inclusivas y ventana de horas ---
     if filtro_tipo == 'Fecha actual':
         fecha_actual = datetime.date.today()
-        df_filtrado_global = df_filtrado_global[df_filtrado_global['fecha_hora_emision'].dt.date == fecha_actual]
-
-    elif filtro_tipo == 'Fecha específica':
-        # Apply filters based on sidebar selections using components from the combined column
-        if año_filtro is not None: # Filtra si se seleccionó un año específico
-            df_filtrado_global = df_filtrado_global[df_filtrado_global['fecha_hora_emision'].dt.year == año_filtro]
-
-        if mes_filtro is not None: # Filtra si se seleccionó un mes específico
-            df_filtrado_global = df_filtrado_global[df_filtrado_global['fecha_hora_emision'].dt.month_name() == mes_filtro]
-
-        if dia_rango_filtro is not None: # Filtra si se seleccionó un rango de días
-             min_dia, max_dia = dia_rango_filtro
-             df_filtrado_global = df_filtrado_global[(df_filtrado_global['fecha_hora_emision'].dt.day >= min_dia) & (df_filtrado_global['fecha_hora_emision'].dt.day <= max_dia)]
+        desde, hasta = fecha_actual, fecha_actual
+    else:
+        desde, hasta = rango_de_fechas(año_filtro, mes_filtro, dia_rango_filtro)
+    filtro = (desde, hasta, hora_inicio, hora_fin) if aplicar_filtro_hora else (desde, hasta, None, None)
 
-    # Aplicar filtro de hora si está habilitado using the time part of the combined column
-    if aplicar_filtro_hora and not df_filtrado_global.empty:
-         df_filtrado_global = df_filtrado_global[
-             (df_filtrado_global['fecha_hora_emision'].dt.time >= time_inicio) &
-             (df_filtrado_global['fecha_hora_emision'].dt.time <= time_fin)
-         ]
+    # La serie por día da también el total del período
+    ventas_por_fecha = ventas_agrupadas(engine, 'dia', filtro, marca)
 
     # --- Removed Display filtered DataFrame if checkbox is checked ---
     # if mostrar_dataframe_filtrado:
     #     st.subheader("Datos Filtrados (para depuración)")
-    #     st.dataframe(df_filtrado_global)
-    #     st.write(f"Número de filas después del filtro: {len(df_filtrado_global)}")
+    #     st.dataframe(ventas_por_fecha)
+    #     st.write(f"Número de filas después del filtro: {len(ventas_por_fecha)}")
 
 
     # --- Gráfico de Línea de Ventas a lo largo del Tiempo (Mostrar solo con filtro de rango de días > 1) ---
@@ -302,12 +385,6 @@ def run_dashboard():
     if filtro_tipo == 'Fecha específica' and año_filtro is not None and mes_filtro is not None and dia_rango_filtro is not None and dia_rango_filtro[0] != dia_rango_filtro[1]:
         st.subheader("Ventas a lo largo del tiempo (por fecha)")
 
-        # Agrupar por fecha de emisión y sumar las ventas para el gráfico de línea
-        # Use the date part of the combined column for grouping
-        ventas_por_fecha = df_filtrado_global.groupby(df_filtrado_global['fecha_hora_emision'].dt.date)['total_venta'].sum().reset_index()
-        # Rename the date column for Altair plotting
-        ventas_por_fecha.rename(columns={'fecha_hora_emision': 'fecha'}, inplace=True)
-
 
         # Crear gráfico de línea
         if not ventas_por_fecha.empty:
@@ -328,8 +405,8 @@ def run_dashboard():
 
     # --- Mostrar Ventas Totales para el período y hora seleccionados ---
     st.subheader("Ventas Totales")
-    if not df_filtrado_global.empty:
-        total_ventas_periodo = df_filtrado_global['total_venta'].sum()
+    if not ventas_por_fecha.empty:
+        total_ventas_periodo = ventas_por_fecha['total_venta'].sum()
         st.metric(label="Total Vendido", value=f"${total_ventas_periodo:,.2f}")
     else:
         st.info("No hay datos de ventas para el período y hora seleccionados.")
@@ -338,9 +415,9 @@ def run_dashboard():
     # --- Apartado de Ventas por Empleado para el período y hora seleccionados ---
     st.subheader("Ventas por Empleado")
 
-    # Agrupar por empleado usando el DataFrame filtrado global
-    if not df_filtrado_global.empty:
-        ventas_por_empleado = df_filtrado_global.groupby('empleado_nombre')['total_venta'].sum().reset_index()
+    # Ya viene agrupado por empleado desde SQL
+    ventas_por_empleado = ventas_agrupadas(engine, 'empleado', filtro, marca)
+    if not ventas_por_empleado.empty:
 
         # Crear gráfico de barras para empleados
         barras_empleados = alt.Chart(ventas_por_empleado).mark_bar().encode(
@@ -360,9 +437,9 @@ def run_dashboard():
 
     # --- Apartado de Ventas por Producto para el período y hora seleccionados ---
     st.subheader("Ventas por Producto")
-    # Agrupar por producto usando el DataFrame filtrado global
-    if not df_filtrado_global.empty:
-        ventas_por_producto = df_filtrado_global.groupby('producto_nombre')['total_venta'].sum().reset_index()
+    # Ya viene agrupado por producto desde SQL
+    ventas_por_producto = ventas_agrupadas(engine, 'producto', filtro, marca)
+    if not ventas_por_producto.empty:
         barras_productos = alt.Chart(ventas_por_producto).mark_bar().encode(
             x=alt.X('total_venta:Q', title='Total Vendido'),
             y=alt.Y('producto_nombre:N', title='Producto', sort='-x'),
@@ -0,0 +1,207 @@
+"""Preprocesamiento vectorizado de las líneas de venta para el tablero.
+
+Convierte las líneas (una por factura y producto) en un DataFrame compacto:
+
+- la fecha y la hora se leen como dígitos y se combinan con aritmética de
+  ``datetime64``, sin ``apply`` por fila ni volver a parsear texto;
+- los nombres de empleado y producto son categóricos;
+- las columnas numéricas se reducen al entero más chico que alcance. El
+  total queda en ``float64``: con ``float32`` se pierden los centavos.
+
+Los filtros del tablero se resuelven con máscaras sobre las columnas enteras
+ya calculadas (``dia_num``, ``hora``) y las agrupaciones con ``np.bincount``
+sobre los códigos, así que nunca se copia el DataFrame completo.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+EPOCA = datetime.date(1970, 1, 1)
+
+
+def _digitos(serie, ancho):
+    """Matriz ``(filas, ancho)`` con el valor de cada carácter ASCII menos '0'.
+
+    Los textos pasan a un arreglo de Arrow y se leen los bytes directamente
+    de su buffer: pasar miles de objetos ``str`` por NumPy es lo lento.
+    """
+    if not len(serie):
+        return np.zeros((0, ancho), np.int32)
+    texto = pc.cast(pa.array(serie, from_pandas=True), pa.string())
+    _, desplazamientos, datos = texto.buffers()
+    inicios = np.frombuffer(desplazamientos, np.int32)[texto.offset:texto.offset + len(texto)]
+    return np.frombuffer(datos, np.uint8)[inicios[:, None] + np.arange(ancho)].astype(np.int32) - ord('0')
+
+
+def _numero(digitos, desde, hasta):
+    valor = np.zeros(len(digitos), np.int32)
+    for columna in range(desde, hasta):
+        valor = valor * 10 + digitos[:, columna]
+    return valor
+
+
+def dias_desde_epoca(serie):
+    """Días desde 1970-01-01 de fechas en texto 'AAAA-MM-DD', ``date`` o ``datetime64``."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.to_numpy().astype('M8[D]').astype(np.int32)
+    # str(date) también da 'AAAA-MM-DD'
+    digitos = _digitos(serie, 10)
+    año, mes, dia = _numero(digitos, 0, 4), _numero(digitos, 5, 7), _numero(digitos, 8, 10)
+    meses = ((año - 1970) * 12 + mes - 1).astype('M8[M]')
+    return meses.astype('M8[D]').astype(np.int32) + dia - 1
+
+
+def segundos_del_dia(serie):
+    """Segundos desde medianoche de horas en texto, ``timedelta`` u horas enteras."""
+    if pd.api.types.is_timedelta64_dtype(serie):
+        return serie.to_numpy().astype('m8[s]').astype(np.int32)
+    if pd.api.types.is_integer_dtype(serie):
+        return serie.to_numpy().astype(np.int32) * 3600
+    # 'HH:MM:SS[.ffffff]': los microsegundos quedan fuera del ancho
+    digitos = _digitos(serie, 8)
+    return _numero(digitos, 0, 2) * 3600 + _numero(digitos, 3, 5) * 60 + _numero(digitos, 6, 8)
+
+
+def _entero_minimo(valores):
+    """``valores`` en el entero con signo más chico que los contiene."""
+    if not len(valores):
+        return valores.astype(np.int8)
+    tipo = np.result_type(np.min_scalar_type(-int(valores.max()) - 1), np.min_scalar_type(int(valores.min())))
+    return valores.astype(tipo, copy=False)
+
+
+def _compactar(dia_num, segundos, empleado, producto, cantidad, total):
+    # Las partes de la fecha se calculan una vez por día distinto y se reparten
+    # por índice: son pocos miles de días contra millones de líneas.
+    primero = int(dia_num.min()) if len(dia_num) else 0
+    desplazamiento = dia_num - primero
+    dias = np.arange(primero, primero + (int(desplazamiento.max()) + 1 if len(dia_num) else 0), dtype=np.int32)
+    meses = dias.astype('M8[D]').astype('M8[M]')
+    indice_mes = meses.astype(np.int32)
+    dia_del_mes = (dias - meses.astype('M8[D]').astype(np.int32) + 1).astype(np.int8)
+    return pd.DataFrame({
+        'fecha_hora_emision': (dia_num.astype(np.int64) * 86400 + segundos).view('M8[s]'),
+        'dia_num': dia_num,
+        'año': (indice_mes // 12 + 1970).astype(np.int16)[desplazamiento],
+        'mes_num': (indice_mes % 12 + 1).astype(np.int8)[desplazamiento],
+        'dia': dia_del_mes[desplazamiento],
+        'hora': (segundos // 3600).astype(np.int8),
+        # 0 = lunes; el 1970-01-01 fue jueves
+        'dia_semana': ((dias + 3) % 7).astype(np.int8)[desplazamiento],
+        'empleado_nombre': empleado,
+        'producto_nombre': producto,
+        'cantidad_vendida': _entero_minimo(np.asarray(cantidad)),
+        'total_venta': np.asarray(total, dtype=np.float64),
+    }, copy=False)
+
+
+def preparar(df):
+    """DataFrame compacto a partir de líneas con ``fecha_emision``, ``hora_emision``,
+    ``empleado_nombre``, ``producto_nombre``, ``cantidad_vendida`` y ``total_venta``.
+    """
+    return _compactar(
+        dias_desde_epoca(df['fecha_emision']),
+        segundos_del_dia(df['hora_emision']),
+        pd.Categorical(df['empleado_nombre']),
+        pd.Categorical(df['producto_nombre']),
+        df['cantidad_vendida'].to_numpy(),
+        df['total_venta'].to_numpy(),
+    )
+
+
+def _nombres(ids, dimension, clave, nombre):
+    """Categórico de nombres para una columna de ids de Arrow.
+
+    Se codifica en Arrow y solo se traducen los ids distintos, no cada fila.
+    Un id sin nombre queda como faltante.
+    """
+    codificada = pc.dictionary_encode(ids.combine_chunks())
+    mapa = dict(zip(dimension[clave].to_pylist(), dimension[nombre].to_pylist()))
+    etiquetas = [mapa.get(i) for i in codificada.dictionary.to_pylist()]
+    categorias = sorted({e for e in etiquetas if e is not None})
+    posicion = {e: n for n, e in enumerate(categorias)}
+    traduccion = np.array([posicion.get(e, -1) for e in etiquetas] or [-1], dtype=np.int32)
+    return pd.Categorical.from_codes(traduccion[codificada.indices.to_numpy()], categorias)
+
+
+def desde_snapshot(tabla, empleados, productos):
+    """``preparar`` para una tabla de ``snapshot.lineas`` y sus dimensiones."""
+    return _compactar(
+        pc.cast(tabla['fecha'], pa.int32()).to_numpy(),
+        tabla['hora'].to_numpy().astype(np.int32) * 3600,
+        _nombres(tabla['empleado_id'], empleados, 'empleado_id', 'empleado_nombre'),
+        _nombres(tabla['producto_id'], productos, 'producto_id', 'producto_nombre'),
+        tabla['cantidad'].to_numpy(),
+        tabla['total'].to_numpy(),
+    )
+
+
+def numero_de_dia(fecha):
+    """Días desde 1970-01-01, la escala de la columna ``dia_num``."""
+    return (fecha - EPOCA).days
+
+
+def mascara(df, filtro):
+    """Filas que cumplen ``(desde, hasta, hora_desde, hora_hasta)``, todo inclusivo."""
+    desde, hasta, hora_desde, hora_hasta = filtro
+    seleccion = np.ones(len(df), dtype=bool)
+    dia_num = df['dia_num'].to_numpy()
+    if desde is not None:
+        seleccion &= dia_num >= numero_de_dia(desde)
+    if hasta is not None:
+        seleccion &= dia_num <= numero_de_dia(hasta)
+    if hora_desde is not None:
+        hora = df['hora'].to_numpy()
+        seleccion &= (hora >= hora_desde) & (hora <= hora_hasta)
+    return seleccion
+
+
+def agrupar(df, agrupacion, filtro):
+    """Ventas de ``filtro`` por ``'empleado'``, ``'producto'`` o ``'dia'``.
+
+    Devuelve las mismas columnas que las consultas SQL del tablero.
+    """
+    seleccion = mascara(df, filtro)
+    total = df['total_venta'].to_numpy()[seleccion]
+
+    if agrupacion == 'dia':
+        dias = df['dia_num'].to_numpy()[seleccion]
+        if not len(dias):
+            return pd.DataFrame({'fecha': [], 'total_venta': []})
+        primero = int(dias.min())
+        suma = np.bincount(dias - primero, weights=total)
+        presentes = np.flatnonzero(np.bincount(dias - primero))
+        fechas = (presentes + primero).astype('M8[D]').astype(object)
+        return pd.DataFrame({'fecha': fechas, 'total_venta': suma[presentes]})
+
+    columna = f'{agrupacion}_nombre'
+    categorias = df[columna].cat.categories
+    codigos = df[columna].cat.codes.to_numpy()[seleccion]
+    if len(codigos) and codigos.min() < 0:
+        # Ids sin nombre en la dimensión: el JOIN de SQL también los descarta
+        validos = codigos >= 0
+        codigos, total = codigos[validos], total[validos]
+        seleccion = np.flatnonzero(seleccion)[validos]
+    presentes = np.bincount(codigos, minlength=len(categorias)) > 0
+    resultado = pd.DataFrame({
+        columna: categorias[presentes],
+        'total_venta': np.bincount(codigos, weights=total, minlength=len(categorias))[presentes],
+    })
+    if agrupacion == 'producto':
+        cantidad = df['cantidad_vendida'].to_numpy()[seleccion]
+        resultado['cantidad_vendida'] = np.bincount(
+            codigos, weights=cantidad, minlength=len(categorias)
+        )[presentes].astype(np.int64)
+    return resultado
+
+
+def dias_presentes(df):
+    """Fechas distintas (``datetime64[D]``) con al menos una línea, ordenadas."""
+    dias = df['dia_num'].to_numpy()
+    if not len(dias):
+        return np.array([], dtype='M8[D]')
+    primero = int(dias.min())
+    return (np.flatnonzero(np.bincount(dias - primero)) + primero).astype('M8[D]')
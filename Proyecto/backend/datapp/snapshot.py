@@ -0,0 +1,273 @@
+"""Snapshots columnares de ventas para analytics, alimentados por un ETL incremental.
+
+Las líneas de factura se copian desde ``db.sqlite3`` a archivos Arrow IPC, uno
+por mes (``ventas/mes=AAAA-MM.arrow``), sin comprimir para que se puedan
+abrir con ``mmap`` sin copiar nada. El tablero lee solo esos archivos y no
+toca la base donde escriben las cajas.
+
+El ETL es incremental: la tabla ``gestion_cambiofactura`` (llenada por
+triggers) dice qué facturas cambiaron desde la última marca de agua. Para
+cada mes afectado se reemplazan las filas de esas facturas por su estado
+actual; una factura anulada es una actualización más (columna ``anulado``) y
+una borrada simplemente desaparece. Empleados y productos son tablas chicas y
+se copian completas en cada corrida.
+
+Uso::
+
+    python main.py --app snapshot            # incremental
+    python main.py --app snapshot --completo # reconstruye todo
+"""
+import argparse
+import datetime
+import json
+import os
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import create_engine, text
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # .../Proyecto/backend
+DB_PATH = BASE_DIR / "webapp" / "db.sqlite3"
+DIRECTORIO = Path(os.environ.get("ANALYTICS_SNAPSHOT_DIR", BASE_DIR / "analytics_snapshot"))
+
+# Facturas por consulta al re-extraer las que cambiaron
+TAMANO_LOTE = 500
+
+ESQUEMA_VENTAS = pa.schema([
+    ("factura_id", pa.string()),
+    ("fecha", pa.date32()),
+    ("hora", pa.int8()),
+    ("empleado_id", pa.string()),
+    ("tipo_pago_id", pa.int64()),
+    ("producto_id", pa.int64()),
+    ("cantidad", pa.int32()),
+    ("precio_unitario", pa.float64()),
+    ("total", pa.float64()),
+    ("anulado", pa.bool_()),
+])
+
+CONSULTA_LINEAS = """
+    SELECT f.id AS factura_id, f.fecha_emision AS fecha, f.hora_emision AS hora,
+           f.empleado_id, f.tipo_pago_id, df.producto_id, df.cantidad, df.precio_unitario,
+           f.anulado
+    FROM gestion_factura f
+    JOIN gestion_detallefactura df ON df.factura_id = f.id
+    WHERE {filtro}
+    ORDER BY f.fecha_emision, f.id
+"""
+
+
+def obtener_engine():
+    return create_engine(f"sqlite:///{DB_PATH}")
+
+
+# --- Archivos -----------------------------------------------------------------
+
+def _ruta_mes(directorio, mes):
+    return directorio / "ventas" / f"mes={mes}.arrow"
+
+
+def _ruta_estado(directorio):
+    return directorio / "estado.json"
+
+
+def leer_estado(directorio=DIRECTORIO):
+    """Marca de agua y fecha de la última corrida, o ``None`` si nunca corrió."""
+    try:
+        return json.loads(_ruta_estado(directorio).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def _escribir(ruta, tabla):
+    # Escribir aparte y renombrar: un lector nunca ve un archivo a medias
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(".tmp")
+    with pa.OSFile(str(temporal), "wb") as destino, pa.ipc.new_file(destino, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    os.replace(temporal, ruta)
+
+
+def abrir(ruta, columnas=None):
+    """Tabla de un archivo Arrow abierto con ``mmap`` (sin copiar a memoria)."""
+    tabla = pa.ipc.open_file(pa.memory_map(str(ruta), "r")).read_all()
+    return tabla.select(columnas) if columnas else tabla
+
+
+def meses_disponibles(directorio=DIRECTORIO):
+    return sorted(p.stem.split("=", 1)[1] for p in (directorio / "ventas").glob("mes=*.arrow"))
+
+
+# --- Extracción -----------------------------------------------------------------
+
+def _a_tabla(filas):
+    """Convierte filas de ``CONSULTA_LINEAS`` a una tabla con ``ESQUEMA_VENTAS``."""
+    columnas = list(zip(*filas)) if filas else [[] for _ in range(9)]
+    factura_id, fecha, hora, empleado_id, tipo_pago_id, producto_id, cantidad, precio, anulado = columnas
+    precio = pa.array([float(p) for p in precio], pa.float64())
+    cantidad = pa.array(cantidad, pa.int32())
+    return pa.table({
+        "factura_id": pa.array(factura_id, pa.string()),
+        "fecha": pa.array([datetime.date.fromisoformat(f) for f in fecha], pa.date32()),
+        # hora_emision se guarda como texto 'HH:MM:SS[.ffffff]'
+        "hora": pa.array([int(h[:2]) for h in hora], pa.int8()),
+        "empleado_id": pa.array(empleado_id, pa.string()),
+        "tipo_pago_id": pa.array(tipo_pago_id, pa.int64()),
+        "producto_id": pa.array(producto_id, pa.int64()),
+        "cantidad": cantidad,
+        "precio_unitario": precio,
+        "total": pc.multiply(pc.cast(cantidad, pa.float64()), precio),
+        "anulado": pa.array([bool(a) for a in anulado], pa.bool_()),
+    }, schema=ESQUEMA_VENTAS)
+
+
+def _lineas(conn, filtro, params):
+    return _a_tabla(conn.execute(text(CONSULTA_LINEAS.format(filtro=filtro)), params).all())
+
+
+def _meses_con(directorio, cambiadas):
+    """Meses cuyos archivos tienen alguna de las facturas ``cambiadas``.
+
+    Se mira el archivo y no el id: una factura cambiada de fecha ya no está en
+    el mes de su id. Solo se lee la columna ``factura_id`` con ``mmap``.
+    """
+    return {
+        mes for mes in meses_disponibles(directorio)
+        if pc.any(pc.is_in(abrir(_ruta_mes(directorio, mes), ["factura_id"])["factura_id"], value_set=cambiadas)).as_py()
+    }
+
+
+def _copiar_dimensiones(conn, directorio):
+    empleados = conn.execute(text("SELECT id, nombre || ' ' || apellido FROM gestion_empleado")).all()
+    productos = conn.execute(text("SELECT id, nombre FROM gestion_producto")).all()
+    _escribir(directorio / "empleados.arrow", pa.table({
+        "empleado_id": pa.array([e[0] for e in empleados], pa.string()),
+        "empleado_nombre": pa.array([e[1] for e in empleados], pa.string()),
+    }))
+    _escribir(directorio / "productos.arrow", pa.table({
+        "producto_id": pa.array([p[0] for p in productos], pa.int64()),
+        "producto_nombre": pa.array([p[1] for p in productos], pa.string()),
+    }))
+
+
+def _reconstruir(conn, directorio):
+    meses = [fila[0] for fila in conn.execute(text(
+        "SELECT DISTINCT substr(fecha_emision, 1, 7) FROM gestion_factura ORDER BY 1"
+    ))]
+    for viejo in set(meses_disponibles(directorio)) - set(meses):
+        _ruta_mes(directorio, viejo).unlink()
+    for mes in meses:
+        # Un mes a la vez: la memoria no crece con el historial
+        _escribir(_ruta_mes(directorio, mes), _lineas(
+            conn, "f.fecha_emision >= :desde AND f.fecha_emision < :hasta",
+            {"desde": f"{mes}-01", "hasta": f"{mes}-32"},
+        ))
+    return len(meses)
+
+
+def _aplicar_cambios(conn, directorio, ids):
+    ids = sorted(ids)
+    nuevas = [
+        _lineas(conn, f"f.id IN ({', '.join(f':i{n}' for n in range(len(lote)))})",
+                {f"i{n}": valor for n, valor in enumerate(lote)})
+        for lote in (ids[i:i + TAMANO_LOTE] for i in range(0, len(ids), TAMANO_LOTE))
+    ]
+    nuevas = pa.concat_tables(nuevas) if nuevas else _a_tabla([])
+    meses_nuevas = pc.strftime(nuevas["fecha"], format="%Y-%m")
+
+    cambiadas = pa.array(ids, pa.string())
+    afectados = _meses_con(directorio, cambiadas) | set(meses_nuevas.to_pylist())
+    for mes in sorted(afectados):
+        ruta = _ruta_mes(directorio, mes)
+        partes = []
+        if ruta.exists():
+            # Se copia a memoria: el archivo se va a reemplazar
+            actual = pa.ipc.open_file(pa.OSFile(str(ruta))).read_all()
+            partes.append(actual.filter(pc.invert(pc.is_in(actual["factura_id"], value_set=cambiadas))))
+        partes.append(nuevas.filter(pc.equal(meses_nuevas, mes)))
+        tabla = pa.concat_tables(partes)
+        if tabla.num_rows:
+            _escribir(ruta, tabla.sort_by([("fecha", "ascending"), ("factura_id", "ascending")]))
+        elif ruta.exists():
+            ruta.unlink()
+    return len(afectados)
+
+
+def actualizar(engine=None, directorio=DIRECTORIO, completo=False):
+    """Lleva los snapshots al estado actual de la base y devuelve un resumen.
+
+    Consume ``gestion_cambiofactura`` hasta la marca de agua leída al
+    empezar; lo que llegue durante la corrida queda para la siguiente.
+    """
+    engine = engine or obtener_engine()
+    directorio = Path(directorio)
+    estado = leer_estado(directorio)
+    inicio = time.perf_counter()
+
+    with engine.begin() as conn:
+        marca = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM gestion_cambiofactura")).scalar()
+        _copiar_dimensiones(conn, directorio)
+        if completo or estado is None:
+            meses = _reconstruir(conn, directorio)
+            facturas = None
+        else:
+            ids = {fila[0] for fila in conn.execute(
+                text("SELECT DISTINCT factura_id FROM gestion_cambiofactura WHERE id > :desde AND id <= :hasta"),
+                {"desde": estado["marca"], "hasta": marca},
+            )}
+            meses = _aplicar_cambios(conn, directorio, ids) if ids else 0
+            facturas = len(ids)
+        # El registro ya está reflejado en los archivos
+        conn.execute(text("DELETE FROM gestion_cambiofactura WHERE id <= :hasta"), {"hasta": marca})
+
+    nuevo_estado = {"marca": marca, "actualizado": datetime.datetime.now().isoformat(timespec="seconds")}
+    _ruta_estado(directorio).write_text(json.dumps(nuevo_estado))
+    return {"meses": meses, "facturas": facturas, "segundos": time.perf_counter() - inicio, **nuevo_estado}
+
+
+# --- Lectura para el tablero -------------------------------------------------------
+
+def lineas(desde=None, hasta=None, columnas=None, directorio=DIRECTORIO):
+    """Líneas activas entre ``desde`` y ``hasta`` (inclusive), leyendo solo esos meses."""
+    meses = meses_disponibles(directorio)
+    if desde is not None:
+        meses = [m for m in meses if m >= desde.strftime("%Y-%m")]
+    if hasta is not None:
+        meses = [m for m in meses if m <= hasta.strftime("%Y-%m")]
+    leer = list(dict.fromkeys([*(columnas or ESQUEMA_VENTAS.names), "fecha", "anulado"]))
+    if not meses:
+        return ESQUEMA_VENTAS.empty_table().select(leer)
+
+    tabla = pa.concat_tables([abrir(_ruta_mes(directorio, mes), leer) for mes in meses])
+    condicion = pc.invert(tabla["anulado"])
+    if desde is not None:
+        condicion = pc.and_(condicion, pc.greater_equal(tabla["fecha"], pa.scalar(desde, pa.date32())))
+    if hasta is not None:
+        condicion = pc.and_(condicion, pc.less_equal(tabla["fecha"], pa.scalar(hasta, pa.date32())))
+    return tabla.filter(condicion)
+
+
+def dimension(nombre, directorio=DIRECTORIO):
+    """``empleados`` o ``productos``: id y nombre para mostrar."""
+    return abrir(directorio / f"{nombre}.arrow")
+
+
+def ejecutar(completo=False):
+    """Corre el ETL e imprime el resumen."""
+    resumen = actualizar(completo=completo)
+    print(
+        f"Snapshot al cambio {resumen['marca']}: {resumen['meses']} meses reescritos "
+        f"en {resumen['segundos']:.2f} s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Actualiza los snapshots de ventas para analytics")
+    parser.add_argument("--completo", action="store_true", help="Reconstruye todos los meses")
+    ejecutar(parser.parse_args().completo)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,11 +42,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.webapp.gestion.metricas.MetricasMiddleware',
+    'backend.webapp.gestion.instrumentacion.InstrumentacionSQLMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'backend.webapp.gestion.roles.RolesMiddleware',
+    'backend.webapp.gestion.perfilado.PerfiladoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,6 +67,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'backend.webapp.gestion.roles.contexto_roles',
             ],
         },
     },
@@ -78,8 +84,78 @@ DATABASES = {
         'ENGINE': 'django.db.backends.sqlite3',
         # BASE_DIR = .../webapp/barapp  → el db.sqlite3 está en .../webapp
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Las pruebas de concurrencia necesitan un archivo real: la base en
+        # memoria compartida bloquea tablas en vez de esperar el turno.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# La usa el catálogo de gestion (gestion/catalogo.py). La memoria local es por
+# proceso; con varios workers, CACHE_BACKEND=archivo o CACHE_BACKEND=base
+# comparte las versiones entre ellos (la segunda requiere `manage.py createcachetable`).
+
+CACHE_BACKENDS = {
+    'memoria': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'barapp',
+    },
+    'archivo': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / 'cache'),
+    },
+    'base': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'barapp_cache',
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('CACHE_BACKEND', 'memoria')],
+}
+
+# Documentos de factura ya generados (HTML y PDF), ver gestion/documentos.py
+DOCUMENTOS_CACHE_DIR = os.environ.get('DOCUMENTOS_CACHE_DIR', BASE_DIR / 'documentos_cache')
+DOCUMENTOS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Plantillas de las bases de prueba por niveles, ver gestion/datos_prueba.py
+DATOS_PRUEBA_DIR = os.environ.get('DATOS_PRUEBA_DIR', BASE_DIR / 'datos_prueba')
+
+# Instrumentación SQL por petición (Server-Timing y log), ver gestion/instrumentacion.py
+SQL_INSTRUMENTACION = os.environ.get('SQL_INSTRUMENTACION') == '1'
+SQL_LENTA_MS = float(os.environ.get('SQL_LENTA_MS', 100))
+# Repeticiones de una misma forma de consulta que se marcan como N+1
+SQL_N1_MINIMO = 5
+
+# Métricas de Prometheus en /metrics, ver gestion/metricas.py. Cada proceso
+# escribe su archivo en METRICAS_DIR; solo esas IP pueden leer /metrics.
+METRICAS = os.environ.get('METRICAS', '1') == '1'
+METRICAS_DIR = os.environ.get('METRICAS_DIR', BASE_DIR / 'metricas')
+METRICAS_IPS = ('127.0.0.1', '::1')
+
+# Las pruebas escriben las métricas en un directorio temporal, no en METRICAS_DIR
+TEST_RUNNER = 'backend.webapp.gestion.pruebas.EjecutorPruebas'
+
+# Perfilado de peticiones, ver gestion/perfilado.py. Un administrador lo pide
+# con la cabecera X-Perfilar: 1 o ?perfilar=1; PERFILADO_MUESTREO perfila
+# además esa fracción de todas las peticiones.
+PERFILADO = os.environ.get('PERFILADO', '1') == '1'
+PERFILADO_MUESTREO = float(os.environ.get('PERFILADO_MUESTREO', 0))
+PERFILADO_MODO = os.environ.get('PERFILADO_MODO', 'cprofile')  # o 'muestreo'
+PERFILADO_INTERVALO = 0.001  # segundos entre pilas de la petición
+PERFILADO_DIR = os.environ.get('PERFILADO_DIR', BASE_DIR / 'perfiles')
+PERFILADO_MAX = 200
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'consola': {'class': 'logging.StreamHandler'}},
+    'loggers': {
+        'backend.webapp.gestion.sql': {'handlers': ['consola'], 'level': 'INFO', 'propagate': False},
+    },
+}
 
 
 
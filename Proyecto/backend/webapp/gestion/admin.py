@@ -1,10 +1,26 @@
+import datetime
+
 from django.contrib import admin
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from django.urls import path
+
+from . import planillas
+from .exportacion import Exportacion, ids_facturas
 from .models import (
     DetalleImpuesto, Producto, Proveedor, Cliente, Empleado,
     Compra, DetalleCompra, ConfiguracionFactura, TipoPago,
-    Factura, DetalleFactura
+    Factura, DetalleFactura, SecuenciaFactura, VentaDiaria, VentaDiariaDesglose, CambioFactura
 )
 
+def exportar_seleccion(tabla, formato):
+    """Acción del admin que descarga en ``formato`` las filas de ``tabla`` de lo seleccionado."""
+    @admin.action(description=f"Exportar seleccionados a {formato.upper()}")
+    def accion(modeladmin, request, queryset):
+        return planillas.respuesta(tabla, formato, planillas.filas(tabla, seleccion=queryset))
+    accion.__name__ = f'exportar_{formato}'
+    return accion
+
 @admin.register(DetalleImpuesto)
 class DetalleImpuestoAdmin(admin.ModelAdmin):
     search_fields = ['nombre']
@@ -14,6 +30,7 @@ class DetalleImpuestoAdmin(admin.ModelAdmin):
 class ProductoAdmin(admin.ModelAdmin):
     search_fields = ['nombre']
     list_display = ['nombre', 'precio', 'stock', 'unidad_medida']
+    actions = [exportar_seleccion('inventario', 'csv'), exportar_seleccion('inventario', 'xlsx')]
 
 @admin.register(Proveedor)
 class ProveedorAdmin(admin.ModelAdmin):
@@ -35,6 +52,7 @@ class CompraAdmin(admin.ModelAdmin):
     search_fields = ['proveedor__nombre']
     list_display = ['id', 'fecha', 'proveedor', 'total']
     list_filter = ['fecha']
+    actions = [exportar_seleccion('compras', 'csv'), exportar_seleccion('compras', 'xlsx')]
 
 @admin.register(DetalleCompra)
 class DetalleCompraAdmin(admin.ModelAdmin):
@@ -45,6 +63,25 @@ class DetalleCompraAdmin(admin.ModelAdmin):
 class ConfiguracionFacturaAdmin(admin.ModelAdmin):
     list_display = ['prefijo']
 
+@admin.register(SecuenciaFactura)
+class SecuenciaFacturaAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'ultimo']
+
+@admin.register(VentaDiaria)
+class VentaDiariaAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'cantidad_facturas', 'total', 'propina', 'impuesto']
+    list_filter = ['fecha']
+
+@admin.register(VentaDiariaDesglose)
+class VentaDiariaDesgloseAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'empleado', 'tipo_pago', 'cantidad_facturas', 'total']
+    list_filter = ['fecha', 'tipo_pago']
+
+@admin.register(CambioFactura)
+class CambioFacturaAdmin(admin.ModelAdmin):
+    list_display = ['id', 'factura_id']
+    search_fields = ['factura_id']
+
 @admin.register(TipoPago)
 class TipoPagoAdmin(admin.ModelAdmin):
     search_fields = ['nombre']
@@ -55,6 +92,33 @@ class FacturaAdmin(admin.ModelAdmin):
     search_fields = ['id', 'cliente__nombre', 'empleado__nombre']
     list_display = ['id', 'fecha_emision', 'hora_emision', 'cliente', 'empleado', 'total']
     list_filter = ['fecha_emision', 'tipo_pago']
+    change_list_template = 'admin/gestion/factura/change_list.html'
+    actions = [exportar_seleccion('ventas', 'csv'), exportar_seleccion('ventas', 'xlsx')]
+
+    def get_urls(self):
+        return [
+            path('exportar-pdf/', self.admin_site.admin_view(self.exportar_pdf), name='gestion_factura_exportar_pdf'),
+        ] + super().get_urls()
+
+    def exportar_pdf(self, request):
+        """Formulario de rango de fechas; con fechas, descarga el ZIP de PDF a medida que se genera."""
+        contexto = {**self.admin_site.each_context(request), 'opts': self.model._meta, 'title': 'Exportar facturas a PDF'}
+        try:
+            desde = datetime.date.fromisoformat(request.GET['desde'])
+            hasta = datetime.date.fromisoformat(request.GET.get('hasta') or request.GET['desde'])
+        except (KeyError, ValueError):
+            return render(request, 'admin/gestion/factura/exportar_pdf.html', contexto)
+
+        ids = ids_facturas(desde, hasta)
+        if not ids:
+            contexto['sin_facturas'] = True
+            return render(request, 'admin/gestion/factura/exportar_pdf.html', contexto)
+
+        # En el proceso del servidor: un pool por petición multiplicaría los
+        # procesos por los workers. El pool queda para el comando exportar_facturas.
+        response = StreamingHttpResponse(Exportacion(ids, procesos=1), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="facturas_{desde}_{hasta}.zip"'
+        return response
 
 @admin.register(DetalleFactura)
 class DetalleFacturaAdmin(admin.ModelAdmin):
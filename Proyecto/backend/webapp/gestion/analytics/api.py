@@ -0,0 +1,128 @@
+# analytics/api.py
+"""
+Cuerpos de la API JSON de analytics (``/api/analytics/<granularidad>/<dimension>/``).
+
+La respuesta es columnar: las etiquetas de los periodos, las claves con sus
+nombres y las celdas con ventas como tres listas paralelas (fila, periodo,
+valor), sin repetir nombres ni fechas por celda.
+
+La ETag sale de la marca de agua de ``gestion_cambiofactura`` (toda factura
+creada, editada, anulada o borrada la mueve, ver migración 0009), de la
+versión de los datos (``versiones.DATOS``: la mueven las reconstrucciones
+del cubo y del resumen y las cargas con los triggers suspendidos, que no
+dejan registro), del contador del catálogo de la dimensión (los nombres) y
+de los parámetros. Las versiones son contadores en la base, así que todos
+los workers calculan la misma ETag. El cuerpo ya serializado se guarda en
+la caché bajo esa misma ETag, así que varias pantallas consultando lo mismo
+no vuelven a tocar el cubo.
+"""
+import datetime
+import hashlib
+import json
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.utils.dateparse import parse_date
+
+from backend.webapp.gestion import versiones
+from backend.webapp.gestion.analytics.series import GRANULARIDADES, MEDIDAS, serie
+from backend.webapp.gestion.catalogo import clave_contador
+from backend.webapp.gestion.metricas import lectura_cache
+from backend.webapp.gestion.models import CambioFactura, Empleado, Producto, TipoPago
+
+DIMENSIONES = {'producto': Producto, 'empleado': Empleado, 'tipo_pago': TipoPago}
+
+# Cambiarlo invalida las respuestas guardadas si cambia la forma del JSON
+FORMATO = 1
+DURACION = 300
+RANGO_MAXIMO = datetime.timedelta(days=3 * 366)
+
+
+def consulta(granularidad, dimension, params):
+    """
+    Valida la petición y devuelve ``(granularidad, dimension, desde, hasta, medida)``.
+
+    Por defecto el rango es el año en curso hasta hoy y la medida la
+    cantidad. Lanza ``ValueError`` con el motivo si algo no es válido.
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad desconocida: {granularidad}")
+    if dimension not in DIMENSIONES:
+        raise ValueError(f"Dimensión desconocida: {dimension}")
+    if dimension == 'tipo_pago' and granularidad == 'hora':
+        raise ValueError("El desglose por tipo de pago es diario: no hay granularidad por hora")
+    medida = params.get('medida', 'cantidad')
+    if medida not in MEDIDAS:
+        raise ValueError(f"Medida desconocida: {medida}")
+
+    hoy = datetime.date.today()
+    try:
+        hasta = parse_date(params.get('hasta') or hoy.isoformat())
+        desde = parse_date(params.get('desde') or hasta.replace(month=1, day=1).isoformat())
+    except ValueError:
+        hasta = desde = None
+    if desde is None or hasta is None:
+        raise ValueError("Las fechas deben tener el formato AAAA-MM-DD")
+    if desde > hasta:
+        raise ValueError("'desde' es posterior a 'hasta'")
+    if hasta - desde > RANGO_MAXIMO:
+        raise ValueError(f"El rango no puede pasar de {RANGO_MAXIMO.days} días")
+    return granularidad, dimension, desde, hasta, medida
+
+
+def marca_de_agua():
+    """Último id entregado en ``gestion_cambiofactura``."""
+    # De sqlite_sequence y no MAX(id): el ETL de snapshots borra los cambios
+    # ya consumidos y el máximo podría volver atrás.
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [CambioFactura._meta.db_table])
+        fila = cursor.fetchone()
+    return fila[0] if fila else 0
+
+
+def etag(parametros):
+    """ETag fuerte de la respuesta a ``parametros`` (ver ``consulta``) con los datos actuales."""
+    dimension = parametros[1]
+    contadores = versiones.leer(versiones.DATOS, clave_contador(DIMENSIONES[dimension]))
+    clave = (FORMATO, marca_de_agua(), contadores, parametros)
+    return hashlib.sha256(repr(clave).encode()).hexdigest()[:32]
+
+
+def _etiquetas(datos):
+    if datos.granularidad == 'hora':
+        return datos.periodos.tolist()
+    return np.datetime_as_string(datos.periodos).tolist()
+
+
+def columnas(parametros):
+    """Diccionario columnar de la serie pedida."""
+    granularidad, dimension, desde, hasta, medida = parametros
+    datos = serie(desde, hasta, granularidad, medida, dimension)
+    filas, periodos, valores = datos.celdas()
+    if medida == 'total':
+        valores = np.round(valores, 2)
+    return {
+        'granularidad': granularidad,
+        'dimension': dimension,
+        'medida': medida,
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'periodos': _etiquetas(datos),
+        'claves': datos.claves.tolist(),
+        'nombres': datos.nombres.tolist(),
+        'celdas': {'fila': filas.tolist(), 'periodo': periodos.tolist(), 'valor': valores.tolist()},
+    }
+
+
+def contenido(parametros, etag_actual):
+    """Cuerpo JSON ya codificado, desde la caché o calculado y guardado."""
+    # Si los datos cambian entre la ETag y la consulta, el cuerpo guardado es
+    # más nuevo que su ETag: el cliente solo pierde un 304, nunca ve datos viejos.
+    clave = f"analytics:api:{etag_actual}"
+    cuerpo = cache.get(clave)
+    lectura_cache('analytics', cuerpo is not None)
+    if cuerpo is None:
+        cuerpo = json.dumps(columnas(parametros), ensure_ascii=False, separators=(',', ':')).encode()
+        cache.set(clave, cuerpo, DURACION)
+    return cuerpo
@@ -0,0 +1,205 @@
+# analytics/series.py
+"""
+Series de tiempo densas sobre el cubo de ventas (gestion/cubo.py).
+
+``serie`` devuelve una matriz ``claves × periodos`` (productos o empleados
+por día, semana, mes u hora del día) con sus arreglos de índice, y las
+métricas derivadas se calculan sobre la matriz completa con NumPy, sin
+recorrer filas en Python.
+
+El tipo de pago no está en el cubo: esa dimensión sale de
+``VentaDiariaDesglose`` (totales por factura y día), así que no tiene
+granularidad por hora y su ``cantidad`` es el número de facturas.
+"""
+import numpy as np
+from django.db import connection
+
+from backend.webapp.gestion.cubo import meses_completos
+from backend.webapp.gestion.models import Empleado, Producto, TipoPago
+
+MEDIDAS = ('cantidad', 'total')
+
+# Días desde 1970-01-01 y meses desde 1970-01, calculados por SQLite para que
+# NumPy reciba enteros
+DIA_NUM = "CAST(julianday({columna}) - 2440587.5 AS INTEGER)"
+MES_NUM = "(CAST(substr({columna}, 1, 4) AS INTEGER) - 1970) * 12 + CAST(substr({columna}, 6, 2) AS INTEGER) - 1"
+
+# Tabla del cubo, columna de fecha y expresión del periodo de cada granularidad
+GRANULARIDADES = {
+    'dia': ('gestion_cubodia', 'fecha', DIA_NUM.format(columna='fecha')),
+    'semana': ('gestion_cubodia', 'fecha', DIA_NUM.format(columna='fecha')),
+    'mes': ('gestion_cubomes', 'mes', MES_NUM.format(columna='mes')),
+    'hora': ('gestion_cubohora', 'fecha', 'hora'),
+}
+
+# Tabla y columna de cada medida para la dimensión tipo de pago
+DESGLOSE = 'gestion_ventadiariadesglose'
+MEDIDAS_DESGLOSE = {'cantidad': 'cantidad_facturas', 'total': 'total'}
+
+CONSULTA = """
+    SELECT {clave}, {periodo}, {medida}
+    FROM {tabla}
+    WHERE {columna_fecha} BETWEEN %s AND %s
+"""
+
+
+def _semana(dia_num):
+    """Semanas que empiezan el lunes; el 1970-01-01 fue jueves."""
+    return (dia_num + 3) // 7
+
+
+def _periodos(granularidad, desde, hasta):
+    """Números de periodo de ``desde`` a ``hasta`` y sus etiquetas."""
+    dia_desde, dia_hasta = (np.datetime64(d, 'D').astype(np.int64) for d in (desde, hasta))
+    if granularidad == 'dia':
+        numeros = np.arange(dia_desde, dia_hasta + 1)
+        return numeros, numeros.astype('M8[D]')
+    if granularidad == 'semana':
+        numeros = np.arange(_semana(dia_desde), _semana(dia_hasta) + 1)
+        return numeros, (numeros * 7 - 3).astype('M8[D]')  # El lunes de cada semana
+    if granularidad == 'mes':
+        mes_desde, mes_hasta = (np.datetime64(d, 'M').astype(np.int64) for d in (desde, hasta))
+        numeros = np.arange(mes_desde, mes_hasta + 1)
+        return numeros, numeros.astype('M8[M]')
+    numeros = np.arange(24)
+    return numeros, numeros
+
+
+def _nombres(dimension):
+    if dimension == 'producto':
+        return dict(Producto.objects.values_list('id', 'nombre'))
+    if dimension == 'tipo_pago':
+        return dict(TipoPago.objects.values_list('id', 'nombre'))
+    return {e['id']: f"{e['nombre']} {e['apellido']}" for e in Empleado.objects.values('id', 'nombre', 'apellido')}
+
+
+class Serie:
+    """
+    Matriz densa ``valores[clave, periodo]`` de una medida del cubo.
+
+    ``claves`` y ``nombres`` indexan las filas (solo las que vendieron en el
+    rango); ``periodos`` indexa las columnas: fechas (``datetime64[D]``, el
+    lunes para semanas), meses (``datetime64[M]``) u horas del día (0-23).
+    """
+
+    def __init__(self, valores, claves, nombres, periodos, granularidad, medida):
+        self.valores = valores
+        self.claves = claves
+        self.nombres = nombres
+        self.periodos = periodos
+        self.granularidad = granularidad
+        self.medida = medida
+
+    def totales(self):
+        """Suma de todas las claves por periodo."""
+        return self.valores.sum(axis=0)
+
+    def acumulado_movil(self, ventana):
+        """Suma de los últimos ``ventana`` periodos (incluido el actual) de cada clave."""
+        acumulado = np.cumsum(self.valores, axis=1)
+        movil = acumulado.copy()
+        movil[:, ventana:] -= acumulado[:, :-ventana]
+        return movil
+
+    def variacion(self, desfase):
+        """Diferencia con ``desfase`` periodos antes; ``nan`` donde no hay con qué comparar."""
+        variacion = np.full(self.valores.shape, np.nan)
+        variacion[:, desfase:] = self.valores[:, desfase:] - self.valores[:, :-desfase]
+        return variacion
+
+    def variacion_semanal(self):
+        """Diferencia contra la semana anterior (7 días o 1 semana atrás)."""
+        desfases = {'dia': 7, 'semana': 1}
+        if self.granularidad not in desfases:
+            raise ValueError(f"La variación semanal no aplica a la granularidad '{self.granularidad}'")
+        return self.variacion(desfases[self.granularidad])
+
+    def top(self, n):
+        """
+        Las ``n`` claves con más ventas en cada periodo, de mayor a menor.
+
+        Devuelve dos matrices ``n × periodos``: índices de fila y valores.
+        """
+        n = min(n, len(self.claves))
+        if not n:
+            return np.empty((0, len(self.periodos)), np.int64), np.empty((0, len(self.periodos)))
+        candidatos = np.argpartition(-self.valores, n - 1, axis=0)[:n]
+        valores = np.take_along_axis(self.valores, candidatos, axis=0)
+        orden = np.argsort(-valores, axis=0, kind='stable')
+        return np.take_along_axis(candidatos, orden, axis=0), np.take_along_axis(valores, orden, axis=0)
+
+    def celdas(self):
+        """Fila, columna y valor de las celdas con ventas, ordenadas por periodo."""
+        columnas, filas = np.nonzero(self.valores.T)
+        valores = self.valores[filas, columnas]
+        if self.medida == 'cantidad':
+            valores = valores.astype(np.int64)
+        return filas, columnas, valores
+
+    def registros(self, periodo, clave):
+        """
+        Celdas con ventas como dicts ``{periodo: ..., clave: nombre, 'total': valor}``,
+        ordenadas por periodo: la forma que devolvían las consultas de utils.py.
+        """
+        filas, columnas, valores = self.celdas()
+        etiquetas = self.periodos.astype('M8[D]').astype(object) if self.granularidad != 'hora' else self.periodos
+        return [
+            {periodo: etiquetas[c], clave: self.nombres[f], 'total': v}
+            for c, f, v in zip(columnas.tolist(), filas.tolist(), valores.tolist())
+        ]
+
+
+def serie(desde, hasta, granularidad='dia', medida='cantidad', dimension='producto'):
+    """
+    Ventas (``medida``) de cada producto, empleado o tipo de pago entre
+    ``desde`` y ``hasta`` (inclusivas) como una ``Serie`` densa. Con
+    ``granularidad='hora'`` las columnas son las 24 horas del día acumuladas
+    en todo el rango.
+    """
+    if medida not in MEDIDAS:
+        raise ValueError(f"Medida desconocida: {medida}")
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad desconocida: {granularidad}")
+    if dimension not in ('producto', 'empleado', 'tipo_pago'):
+        raise ValueError(f"Dimensión desconocida: {dimension}")
+    tabla, columna_fecha, expresion = GRANULARIDADES[granularidad]
+    columna_medida = medida
+    if granularidad == 'mes':
+        desde_sql, hasta_sql = desde.replace(day=1), hasta
+    else:
+        desde_sql, hasta_sql = desde, hasta
+    if dimension == 'tipo_pago':
+        if granularidad == 'hora':
+            raise ValueError("El desglose por tipo de pago es diario: no hay granularidad por hora")
+        tabla, columna_fecha, columna_medida = DESGLOSE, 'fecha', MEDIDAS_DESGLOSE[medida]
+        if granularidad == 'mes':
+            expresion = MES_NUM.format(columna='fecha')
+            desde_sql, hasta_sql = meses_completos(desde, hasta)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            CONSULTA.format(
+                clave=f'{dimension}_id', periodo=expresion, medida=columna_medida, tabla=tabla,
+                columna_fecha=columna_fecha,
+            ),
+            [desde_sql.isoformat(), hasta_sql.isoformat()],
+        )
+        filas = cursor.fetchall()
+
+    numeros, etiquetas = _periodos(granularidad, desde, hasta)
+    if filas:
+        ids, periodos, valores = zip(*filas)
+        claves, fila = np.unique(np.array(ids), return_inverse=True)
+        periodo = np.array(periodos, dtype=np.int64)
+        if granularidad == 'semana':
+            periodo = _semana(periodo)
+        columna = periodo - numeros[0]
+        celda = fila * len(numeros) + columna
+        matriz = np.bincount(
+            celda, weights=np.array(valores, dtype=np.float64), minlength=len(claves) * len(numeros),
+        ).reshape(len(claves), len(numeros))
+    else:
+        claves, matriz = np.array([], dtype=np.int64), np.zeros((0, len(numeros)))
+
+    nombres_por_id = _nombres(dimension)
+    nombres = np.array([nombres_por_id.get(c) for c in claves.tolist()], dtype=object)
+    return Serie(matriz, claves, nombres, etiquetas, granularidad, medida)
@@ -1,32 +1,52 @@
 # analytics/utils.py
-from backend.webapp.gestion.models import DetalleFactura
+import datetime
+
+from backend.webapp.gestion.analytics.series import serie
+from backend.webapp.gestion.models import VentaDiaria
 from django.db.models import Sum
-from django.db.models.functions import TruncDay, TruncMonth
+from django.db.models.functions import TruncMonth
 
 def ventas_por_dia(year):
     """
-    Devuelve las ventas por producto agrupadas por día en un año dado.
+    Devuelve las ventas (cantidad) por producto agrupadas por día en un año
+    dado, como dicts ``dia``, ``producto__nombre``, ``total``. Para la matriz
+    completa y métricas derivadas usar ``series.serie``.
     """
-    ventas = (
-        DetalleFactura.objects
-        .filter(factura__fecha_emision__year=year, factura__anulado=False)
-        .annotate(dia=TruncDay('factura__fecha_emision'))
-        .values('dia', 'producto__nombre')
-        .annotate(total=Sum('cantidad'))
-        .order_by('dia')
-    )
-    return ventas
+    return serie(datetime.date(year, 1, 1), datetime.date(year, 12, 31), 'dia').registros('dia', 'producto__nombre')
 
 def ventas_por_mes(year):
     """
-    Devuelve las ventas por producto agrupadas por mes en un año dado.
+    Devuelve las ventas (cantidad) por producto agrupadas por mes en un año
+    dado, como dicts ``mes``, ``producto__nombre``, ``total``.
+    """
+    return serie(datetime.date(year, 1, 1), datetime.date(year, 12, 31), 'mes').registros('mes', 'producto__nombre')
+
+def totales_por_dia(year):
+    """
+    Devuelve el total, número de facturas, propinas e impuestos de cada día
+    de un año, leídos del resumen diario (sin recorrer las facturas).
+    """
+    return (
+        VentaDiaria.objects
+        .filter(fecha__year=year)
+        .values('fecha', 'cantidad_facturas', 'total', 'propina', 'impuesto')
+        .order_by('fecha')
+    )
+
+def totales_por_mes(year):
+    """
+    Devuelve los mismos totales de ``totales_por_dia`` agrupados por mes.
     """
-    ventas = (
-        DetalleFactura.objects
-        .filter(factura__fecha_emision__year=year, factura__anulado=False)
-        .annotate(mes=TruncMonth('factura__fecha_emision'))
-        .values('mes', 'producto__nombre')
-        .annotate(total=Sum('cantidad'))
+    return (
+        VentaDiaria.objects
+        .filter(fecha__year=year)
+        .annotate(mes=TruncMonth('fecha'))
+        .values('mes')
+        .annotate(
+            cantidad_facturas=Sum('cantidad_facturas'),
+            total=Sum('total'),
+            propina=Sum('propina'),
+            impuesto=Sum('impuesto'),
+        )
         .order_by('mes')
     )
-    return ventas
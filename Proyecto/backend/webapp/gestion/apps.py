@@ -1,6 +1,24 @@
-from django.apps import AppConfig
-
-
+from django.apps import AppConfig
+
+
 class GestionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'backend.webapp.gestion'
+
+    def ready(self):
+        from django.contrib.auth.models import Group, User
+        from django.contrib.auth.signals import user_logged_in
+        from django.db.models.signals import m2m_changed, post_delete, post_save
+
+        from backend.webapp.gestion import roles
+        from backend.webapp.gestion.catalogo import MODELOS, al_cambiar
+
+        for modelo in MODELOS:
+            post_save.connect(al_cambiar, sender=modelo, dispatch_uid=f"catalogo_save_{modelo.__name__}")
+            post_delete.connect(al_cambiar, sender=modelo, dispatch_uid=f"catalogo_delete_{modelo.__name__}")
+
+        user_logged_in.connect(roles.al_iniciar_sesion, dispatch_uid='roles_login')
+        m2m_changed.connect(roles.al_cambiar_grupos, sender=User.groups.through, dispatch_uid='roles_grupos')
+        post_save.connect(roles.al_guardar_usuario, sender=User, dispatch_uid='roles_usuario')
+        post_save.connect(roles.al_cambiar_grupo, sender=Group, dispatch_uid='roles_grupo_save')
+        post_delete.connect(roles.al_cambiar_grupo, sender=Group, dispatch_uid='roles_grupo_delete')
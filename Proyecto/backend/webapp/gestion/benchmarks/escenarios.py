@@ -0,0 +1,147 @@
+# benchmarks/escenarios.py
+"""
+Escenarios del benchmark de vistas: las rutas calientes por el cliente de
+pruebas de Django y la consulta del tablero de Streamlit directamente.
+
+Cada escenario recibe los datos de ``preparar`` y devuelve la acción que se
+mide, ``accion(i)`` con ``i`` el número de repetición. Las vistas de
+facturas usan una factura distinta en cada repetición para medir el
+documento sin caché.
+"""
+import datetime
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.urls import reverse
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from backend.webapp.gestion.models import (
+    Cliente,
+    CuboDia,
+    DetalleImpuesto,
+    Empleado,
+    Factura,
+    Producto,
+    TipoPago,
+)
+
+MUESTRA_FACTURAS = 200
+LINEAS_VENTA = 5
+
+ESCENARIOS = {}
+
+
+def escenario(funcion):
+    ESCENARIOS[funcion.__name__] = funcion
+    return funcion
+
+
+def _ok(respuesta):
+    if respuesta.status_code >= 400:
+        raise AssertionError(f"{respuesta.request['PATH_INFO']} respondió {respuesta.status_code}")
+    return respuesta
+
+
+def preparar():
+    """
+    Deja la base (una copia desechable) lista para los escenarios: un
+    superusuario con sesión, stock de sobra y una muestra de facturas.
+    """
+    usuario = User.objects.create_superuser('benchmark', 'benchmark@localhost', None)
+    Producto.objects.update(stock=10**9)
+    client = Client()
+    client.force_login(usuario)
+    fechas = CuboDia.objects.aggregate(desde=Min('fecha'), hasta=Max('fecha'))
+    hasta = fechas['hasta'] or datetime.date.today()
+    return {
+        'client': client,
+        'facturas': list(Factura.objects.order_by('-id').values_list('id', flat=True)[:MUESTRA_FACTURAS]),
+        'desde': fechas['desde'] or hasta,
+        'hasta': hasta,
+        'empleado': Empleado.objects.order_by('pk').values_list('pk', flat=True).first(),
+    }
+
+
+def _factura(datos, i):
+    return datos['facturas'][i % len(datos['facturas'])]
+
+
+@escenario
+def registrar_venta(datos):
+    productos = list(Producto.objects.order_by('pk').values_list('pk', flat=True)[:LINEAS_VENTA])
+    # Igual que el formulario del navegador (urlencoded, no multipart)
+    cuerpo = urlencode({
+        'cliente': Cliente.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'empleado': datos['empleado'],
+        'tipo_pago': TipoPago.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'tipo_impuesto': DetalleImpuesto.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'recibido': '0',
+        'propina': '0',
+        'producto': productos,
+        'cantidad': ['1'] * len(productos),
+    }, doseq=True)
+    url = reverse('registrar_venta')
+
+    def accion(i):
+        _ok(datos['client'].post(url, cuerpo, content_type='application/x-www-form-urlencoded'))
+    return accion
+
+
+@escenario
+def ventas_panel(datos):
+    url = reverse('ventas_panel')
+    return lambda i: _ok(datos['client'].get(url))
+
+
+@escenario
+def ventas_panel_filtrado(datos):
+    hasta = datos['hasta']
+    url = reverse('ventas_panel') + '?' + urlencode({
+        'desde': hasta.replace(day=1).isoformat(), 'hasta': hasta.isoformat(), 'empleado': datos['empleado'],
+    })
+    return lambda i: _ok(datos['client'].get(url))
+
+
+@escenario
+def detalle_factura(datos):
+    return lambda i: _ok(datos['client'].get(reverse('detalle_factura', args=[_factura(datos, i)])))
+
+
+@escenario
+def factura_pdf(datos):
+    # Las facturas del final de la muestra: detalle_factura ya dejó en caché las primeras
+    return lambda i: _ok(datos['client'].get(reverse('factura_pdf', args=[_factura(datos, -1 - i)])))
+
+
+@escenario
+def panel_admin(datos):
+    url = reverse('panel_admin')
+    return lambda i: _ok(datos['client'].get(url))
+
+
+@escenario
+def dashboard(datos):
+    # Streamlit solo hace falta para este escenario
+    from backend.datapp import dashboard as tablero
+
+    # SQLAlchemy sobre la misma conexión sqlite3 de Django: así la cuentan los contadores
+    engine = create_engine('sqlite://', creator=lambda: connection.connection, poolclass=StaticPool)
+    hasta = datos['hasta']
+    anio = (datetime.date(hasta.year, 1, 1), datetime.date(hasta.year, 12, 31))
+    mes = (hasta.replace(day=1), hasta)
+    consultas = (
+        ('producto', (*anio, None, None)),
+        ('empleado', (*anio, None, None)),
+        ('dia', (datos['desde'], hasta, None, None)),
+        ('producto', (*mes, 20, 23)),
+    )
+    ventas_agrupadas = tablero.ventas_agrupadas.__wrapped__
+
+    def accion(i):
+        for agrupacion, filtro in consultas:
+            ventas_agrupadas(engine, agrupacion, filtro, ('sql',))
+    return accion
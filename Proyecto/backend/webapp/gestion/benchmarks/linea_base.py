@@ -0,0 +1,96 @@
+# benchmarks/linea_base.py
+"""
+Resultados del benchmark de vistas en JSON y su comparación con una línea base.
+
+Un resultado es ``{'maquina': ..., 'repeticiones': n, 'niveles': {nivel:
+{escenario: {metrica: valor}}}}``. Una métrica empeora cuando pasa de la
+base en más de su umbral relativo y además en más de su tolerancia
+absoluta (el ruido de un milisegundo no es una regresión). Consultas e
+instrucciones no dependen de la máquina; tiempo y memoria sí, así que solo
+se comparan cuando la línea base es de la misma máquina (``maquina`` igual).
+"""
+import datetime
+import json
+import os
+import platform
+from pathlib import Path
+
+FORMATO = 1
+RUTA = Path(__file__).resolve().parent / 'linea_base.json'
+
+# Aumento relativo permitido por métrica
+UMBRALES = {
+    'tiempo_ms': 0.25,
+    'p95_ms': 0.50,
+    'consultas': 0.0,
+    'instrucciones_sqlite': 0.10,
+    'memoria_pico_mb': 0.25,
+}
+TOLERANCIAS = {
+    'tiempo_ms': 1.0,
+    'p95_ms': 2.0,
+    'consultas': 0,
+    'instrucciones_sqlite': 0,
+    'memoria_pico_mb': 5.0,
+}
+# Las que cambian con el hardware y la carga
+DE_LA_MAQUINA = ('tiempo_ms', 'p95_ms', 'memoria_pico_mb')
+
+
+def maquina():
+    return {
+        'sistema': platform.platform(),
+        'python': platform.python_version(),
+        'procesador': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def resultado(niveles, repeticiones):
+    return {
+        'formato': FORMATO,
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'maquina': maquina(),
+        'repeticiones': repeticiones,
+        'niveles': niveles,
+    }
+
+
+def guardar(datos, ruta):
+    Path(ruta).write_text(json.dumps(datos, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+
+
+def cargar(ruta):
+    """El resultado guardado en ``ruta``, o ``None`` si no existe o es de otro formato."""
+    try:
+        datos = json.loads(Path(ruta).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return None
+    return datos if datos.get('formato') == FORMATO else None
+
+
+def misma_maquina(actual, base):
+    return actual.get('maquina') is not None and actual.get('maquina') == base.get('maquina')
+
+
+def comparar(actual, base, umbrales=None):
+    """
+    Lista de regresiones ``(nivel, escenario, metrica, base, actual)`` de
+    ``actual`` frente a ``base``. Solo se comparan los niveles, escenarios y
+    métricas que están en los dos, y las de ``DE_LA_MAQUINA`` solo si las dos
+    corridas son de la misma máquina.
+    """
+    umbrales = {**UMBRALES, **(umbrales or {})}
+    if not misma_maquina(actual, base):
+        umbrales = {metrica: umbral for metrica, umbral in umbrales.items() if metrica not in DE_LA_MAQUINA}
+    regresiones = []
+    for nivel, escenarios in actual['niveles'].items():
+        for nombre, metricas in escenarios.items():
+            anteriores = base['niveles'].get(nivel, {}).get(nombre, {})
+            for metrica, umbral in umbrales.items():
+                if metrica not in metricas or metrica not in anteriores:
+                    continue
+                antes, ahora = anteriores[metrica], metricas[metrica]
+                if ahora > antes * (1 + umbral) and ahora - antes > TOLERANCIAS.get(metrica, 0):
+                    regresiones.append((nivel, nombre, metrica, antes, ahora))
+    return regresiones
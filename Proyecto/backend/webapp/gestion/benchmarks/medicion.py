@@ -0,0 +1,121 @@
+# benchmarks/medicion.py
+"""
+Mide una acción repetida: tiempo, consultas, trabajo de SQLite y memoria.
+
+Las consultas se cuentan en Django (``execute_wrapper``) y en SQLAlchemy
+(evento de ``Engine``), así que la consulta del tablero también cuenta; las
+de los triggers no, porque las ejecuta SQLite y no la aplicación. Las
+instrucciones se toman de la conexión ``sqlite3`` de Django, que el tablero
+comparte en el benchmark (ver ``escenarios.py``). SQLite no le dice a Python
+cuántas filas leyó cada consulta; las instrucciones de su máquina virtual
+son la medida determinista más cercana: crecen con las filas recorridas y
+no dependen de la máquina ni de la carga. Se cuentan en una corrida aparte
+para que el manejador de progreso no infle los tiempos.
+
+La memoria es cuánto sube el pico de RSS del proceso (``VmHWM``) sobre el
+RSS con que empieza el escenario: lo que ya cargaron los anteriores no
+cuenta. En Linux el pico se reinicia antes de cada escenario; en otros
+sistemas solo se ve lo que el escenario suba por encima del pico previo, y
+en Windows, sin ``/proc`` ni ``resource``, la memoria queda en 0.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.db import connection
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# El manejador de progreso se llama cada tantas instrucciones de la VM
+PASO_VM = 10
+ESTADO = Path('/proc/self/status')
+
+
+def reiniciar_pico():
+    try:
+        Path('/proc/self/clear_refs').write_text('5')
+    except OSError:
+        pass
+
+
+def _memoria_mb(campo):
+    try:
+        for linea in ESTADO.read_text().splitlines():
+            if linea.startswith(campo):
+                return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _pico_getrusage_mb():
+    # Solo sin /proc; resource no existe en Windows
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def rss_mb():
+    """RSS actual, o el pico si el sistema no tiene ``/proc``."""
+    return _memoria_mb('VmRSS:') or _pico_getrusage_mb()
+
+
+def pico_rss_mb():
+    return _memoria_mb('VmHWM:') or _pico_getrusage_mb()
+
+
+@contextmanager
+def contadores():
+    """Cuenta consultas de la aplicación e instrucciones de la VM de SQLite mientras dura el bloque."""
+    connection.ensure_connection()
+    base = connection.connection
+    cuenta = {'consultas': 0, 'instrucciones_sqlite': 0}
+
+    def django(execute, sql, params, many, context):
+        cuenta['consultas'] += 1
+        return execute(sql, params, many, context)
+
+    def sqlalchemy(*args):
+        cuenta['consultas'] += 1
+
+    def progreso():
+        cuenta['instrucciones_sqlite'] += PASO_VM
+        return 0
+
+    base.set_progress_handler(progreso, PASO_VM)
+    event.listen(Engine, 'before_cursor_execute', sqlalchemy)
+    try:
+        with connection.execute_wrapper(django):
+            yield cuenta
+    finally:
+        event.remove(Engine, 'before_cursor_execute', sqlalchemy)
+        base.set_progress_handler(None, 0)
+
+
+def medir(accion, repeticiones):
+    """
+    Corre ``accion(i)`` una vez para calentar, otra con los contadores y
+    ``repeticiones`` más para el tiempo, sin contadores que lo inflen.
+    Devuelve la mediana y el p95 del tiempo, las consultas e instrucciones y
+    la memoria pico sobre la inicial.
+    """
+    accion(0)
+    reiniciar_pico()
+    inicial = rss_mb()
+    with contadores() as cuenta:
+        accion(1)
+    tiempos = []
+    for i in range(2, repeticiones + 2):
+        inicio = time.perf_counter()
+        accion(i)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        'tiempo_ms': round(statistics.median(tiempos), 3),
+        'p95_ms': round(tiempos[max(int(len(tiempos) * 0.95) - 1, 0)], 3),
+        **cuenta,
+        'memoria_pico_mb': round(max(pico_rss_mb() - inicial, 0), 1),
+    }
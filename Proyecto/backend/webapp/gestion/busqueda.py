@@ -0,0 +1,59 @@
+# busqueda.py
+"""Búsqueda de productos por nombre sobre el índice FTS5 ``gestion_producto_fts``."""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from backend.webapp.gestion.models import Producto
+
+TABLA_FTS = 'gestion_producto_fts'
+LIMITE_RESULTADOS = 20
+
+_PALABRA = re.compile(r'\w+')
+
+
+def consulta_fts(texto):
+    """
+    Convierte lo que escribe el usuario en una expresión ``MATCH``.
+
+    Cada palabra se busca como prefijo (``"pin"*``) y todas deben aparecer.
+    Las tildes no importan: el tokenizador las quita al indexar y al consultar.
+    Devuelve ``''`` si el texto no tiene ninguna palabra.
+    """
+    return ' '.join(f'"{palabra}"*' for palabra in _PALABRA.findall(texto or ''))
+
+
+def filtrar_por_nombre(queryset, texto):
+    """Restringe un queryset de ``Producto`` a los que coinciden con ``texto``."""
+    consulta = consulta_fts(texto)
+    if not consulta:
+        return queryset.none()
+    return queryset.filter(id__in=RawSQL(
+        f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s", (consulta,)
+    ))
+
+
+def buscar_productos(texto, limite=LIMITE_RESULTADOS):
+    """
+    Productos que coinciden con ``texto``, del más al menos relevante (bm25).
+
+    Devuelve una lista de diccionarios listos para serializar a JSON.
+    """
+    consulta = consulta_fts(texto)
+    if not consulta:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT p.id, p.nombre, p.precio, p.stock
+            FROM {TABLA_FTS} f
+            JOIN {Producto._meta.db_table} p ON p.id = f.rowid
+            WHERE {TABLA_FTS} MATCH %s
+            ORDER BY f.rank
+            LIMIT %s
+            """,
+            (consulta, limite),
+        )
+        columnas = [col[0] for col in cursor.description]
+        return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
@@ -0,0 +1,124 @@
+# catalogo.py
+"""
+Caché de los catálogos que llenan los desplegables de ventas y compras.
+
+Cada modelo tiene una versión guardada en la caché; las listas se guardan bajo
+una clave que incluye esa versión. Guardar o borrar un registro cambia la
+versión (ver ``GestionConfig.ready``), así que la siguiente lectura va a la
+base y las listas viejas simplemente expiran. Con una caché compartida
+(archivo o base de datos) la invalidación llega a todos los procesos.
+
+Cada cambio incrementa además un contador por modelo en ``versiones``
+(``clave_contador``), que está en la base y todos los procesos ven igual:
+es lo que usan las ETags de analytics, que no pueden depender de la caché
+de un worker.
+
+El stock cambia con cada venta y no invalida la lista de productos: se lee
+aparte en cada formulario (una consulta sobre el índice de stock) y se pone
+sobre la lista guardada.
+"""
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+from backend.webapp.gestion import versiones
+from backend.webapp.gestion.metricas import lectura_cache
+from backend.webapp.gestion.models import (
+    Cliente,
+    ConfiguracionFactura,
+    DetalleImpuesto,
+    Empleado,
+    Producto,
+    Proveedor,
+    TipoPago,
+)
+
+CATALOGOS = {
+    'productos': Producto,
+    'clientes': Cliente,
+    'empleados': Empleado,
+    'tipos_pago': TipoPago,
+    'impuestos': DetalleImpuesto,
+    'proveedores': Proveedor,
+}
+MODELOS = (*CATALOGOS.values(), ConfiguracionFactura)
+
+# Red de seguridad para cambios hechos fuera de Django (scripts de carga)
+DURACION = 300
+
+
+def _clave_version(modelo):
+    return f"catalogo:version:{modelo._meta.label_lower}"
+
+
+def clave_contador(modelo):
+    """Clave en ``versiones`` que cambia con cada registro guardado o borrado de ``modelo``."""
+    return f"catalogo:{modelo._meta.label_lower}"
+
+
+def version(modelo):
+    # Un token al azar y no un contador: si la caché pierde la clave de
+    # versión, la nueva nunca coincide con listas viejas que sigan guardadas.
+    return cache.get_or_set(_clave_version(modelo), uuid4().hex, None)
+
+
+def invalidar(modelo):
+    """Cambia la versión de ``modelo`` ahora y otra vez al confirmar la transacción."""
+    def cambiar():
+        cache.set(_clave_version(modelo), uuid4().hex, None)
+
+    # La segunda vez evita que otra petición guarde datos previos al commit
+    # bajo la versión nueva.
+    cambiar()
+    transaction.on_commit(cambiar)
+
+
+def _en_cache(modelo, nombre, cargar):
+    clave = f"catalogo:{nombre}:{version(modelo)}"
+    valor = cache.get(clave)
+    lectura_cache('catalogo', valor is not None)
+    if valor is None:
+        valor = cargar()
+        cache.set(clave, valor, DURACION)
+    return valor
+
+
+def listar(nombre):
+    """Lista completa del catálogo ``nombre`` (ver ``CATALOGOS``)."""
+    modelo = CATALOGOS[nombre]
+    return _en_cache(modelo, nombre, lambda: list(modelo.objects.all()))
+
+
+def productos_con_stock():
+    """La lista de productos de la caché con el stock actual de la base."""
+    productos = listar('productos')
+    stock = dict(Producto.objects.values_list('id', 'stock'))
+    # La caché devuelve una copia: se puede modificar sin tocar la guardada
+    for producto in productos:
+        producto.stock = stock.get(producto.pk, producto.stock)
+    return productos
+
+
+def catalogo_venta():
+    """Listas para los formularios de registrar y modificar venta."""
+    listas = {nombre: listar(nombre) for nombre in ('clientes', 'empleados', 'tipos_pago', 'impuestos')}
+    return {'productos': productos_con_stock(), **listas}
+
+
+def catalogo_compra():
+    """Listas para los formularios de registrar y modificar compra."""
+    return {'productos': productos_con_stock(), 'proveedores': listar('proveedores')}
+
+
+def configuracion_actual():
+    """``ConfiguracionFactura`` vigente (o ``None``)."""
+    # Se guarda envuelta en una tupla para poder cachear el ``None``
+    return _en_cache(ConfiguracionFactura, 'configuracion',
+                     lambda: (ConfiguracionFactura.objects.first(),))[0]
+
+
+def al_cambiar(sender, **kwargs):
+    """Receptor de ``post_save``/``post_delete`` para los modelos de ``MODELOS``."""
+    invalidar(sender)
+    versiones.incrementar(clave_contador(sender))
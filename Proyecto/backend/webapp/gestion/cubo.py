@@ -0,0 +1,64 @@
+# cubo.py
+"""
+Cubo de ventas para analytics: CuboHora (fecha, hora, empleado, producto) y
+sus agregados CuboDia y CuboMes.
+
+Los triggers de la migración 0010 lo mantienen al día con cada línea nueva,
+editada o borrada y con cada factura anulada o movida; aquí solo está la
+reconstrucción completa, para cuando se cargan datos con los triggers
+desactivados o se sospecha de una diferencia.
+"""
+import datetime
+
+from django.db import connection, transaction
+
+from backend.webapp.gestion import versiones
+from backend.webapp.gestion.models import CuboDia, CuboHora, CuboMes
+
+# Tabla de cada nivel: columnas de clave, cómo se calculan desde la factura y
+# columna de fecha por la que se filtra el rango
+NIVELES = {
+    CuboHora: (('fecha', 'hora'), ('f.fecha_emision', 'CAST(substr(f.hora_emision, 1, 2) AS INTEGER)'), 'fecha'),
+    CuboDia: (('fecha',), ('f.fecha_emision',), 'fecha'),
+    CuboMes: (('mes',), ("substr(f.fecha_emision, 1, 7) || '-01'",), 'mes'),
+}
+
+LLENAR = """
+    INSERT INTO {tabla} ({columnas}, empleado_id, producto_id, lineas, cantidad, total)
+    SELECT {valores}, f.empleado_id, d.producto_id,
+           COUNT(*), SUM(d.cantidad), ROUND(SUM(d.cantidad * d.precio_unitario), 2)
+    FROM gestion_factura f
+    JOIN gestion_detallefactura d ON d.factura_id = f.id
+    WHERE NOT f.anulado AND f.fecha_emision BETWEEN %s AND %s
+    GROUP BY {valores}, f.empleado_id, d.producto_id
+"""
+
+
+def meses_completos(desde, hasta):
+    """Extiende ``desde`` y ``hasta`` (opcionales) a meses completos."""
+    desde = (desde or datetime.date.min).replace(day=1)
+    hasta = hasta or datetime.date.max
+    if hasta.month < 12:
+        hasta = hasta.replace(month=hasta.month + 1, day=1) - datetime.timedelta(days=1)
+    else:
+        hasta = hasta.replace(day=31)
+    return desde, hasta
+
+
+@transaction.atomic
+def reconstruir(desde=None, hasta=None):
+    """
+    Recalcula los tres niveles del cubo desde las facturas entre ``desde`` y
+    ``hasta`` (opcionales, inclusivas; se extienden a meses completos para
+    que CuboMes quede entero). Devuelve el número de celdas por hora.
+    """
+    desde, hasta = meses_completos(desde, hasta)
+    rango = [desde.isoformat(), hasta.isoformat()]
+    with connection.cursor() as cursor:
+        for modelo, (claves, valores, columna_fecha) in NIVELES.items():
+            modelo.objects.filter(**{f'{columna_fecha}__range': (desde, hasta)}).delete()
+            cursor.execute(LLENAR.format(
+                tabla=modelo._meta.db_table, columnas=', '.join(claves), valores=', '.join(valores),
+            ), rango)
+    versiones.incrementar(versiones.DATOS)
+    return CuboHora.objects.filter(fecha__range=(desde, hasta)).count()
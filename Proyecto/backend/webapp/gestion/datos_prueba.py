@@ -0,0 +1,144 @@
+# datos_prueba.py
+"""
+Bases de prueba por niveles, construidas una vez y restauradas al instante.
+
+Cada nivel es una base SQLite completa (esquema migrado, catálogos, ventas
+de ``generador.py`` con semilla y fechas fijas, resumen y cubo
+reconstruidos) guardada como plantilla en ``DATOS_PRUEBA_DIR``. El nombre
+del archivo lleva una huella de las migraciones, de la receta y del
+generador: si cualquiera cambia, la plantilla vieja deja de servir y se
+construye otra.
+
+Restaurar copia la plantilla sobre la base de Django con la API de backup de
+SQLite (sin cerrar la conexión) o, para un archivo cualquiera, con una copia
+del archivo. ``vacio`` es solo el esquema: reemplaza al viejo ``clear_db.py``.
+"""
+import datetime
+import hashlib
+import os
+import shutil
+import sqlite3
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+
+from backend.webapp.gestion import cubo, generador
+from backend.webapp.gestion.resumen import reconstruir
+
+# Líneas de venta de cada nivel
+NIVELES = {
+    'vacio': 0,
+    'chico': 10_000,
+    'mediano': 1_000_000,
+    'grande': 10_000_000,
+}
+DESDE = datetime.date(2024, 1, 1)
+HASTA = datetime.date(2025, 12, 31)
+EMPLEADOS = 10
+PRODUCTOS = 60
+SEMILLA = 0
+
+# Cambiarlo obliga a reconstruir las plantillas aunque nada más cambie
+FORMATO = 1
+
+
+def huella():
+    """Resumen de las migraciones, de la receta y del código del generador."""
+    hojas = sorted(MigrationLoader(None, ignore_no_migrations=True).graph.leaf_nodes())
+    receta = (FORMATO, hojas, DESDE, HASTA, EMPLEADOS, PRODUCTOS, SEMILLA)
+    digest = hashlib.sha256(repr(receta).encode())
+    digest.update(Path(generador.__file__).read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def ruta(nivel):
+    """Archivo de la plantilla de ``nivel`` para el esquema y la receta actuales."""
+    if nivel not in NIVELES:
+        raise ValueError(f"Nivel desconocido: {nivel}")
+    return Path(settings.DATOS_PRUEBA_DIR) / f"{nivel}-{huella()}.sqlite3"
+
+
+@contextmanager
+def en_archivo(archivo):
+    """Apunta la conexión ``default`` a ``archivo`` mientras dura el bloque."""
+    anterior = connection.settings_dict['NAME']
+    connection.close()
+    connection.settings_dict['NAME'] = str(archivo)
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.settings_dict['NAME'] = anterior
+
+
+def construir(nivel, forzar=False, procesos=None):
+    """
+    Construye la plantilla de ``nivel`` si no existe (o si ``forzar``) y
+    borra las versiones viejas del mismo nivel. Devuelve ``(ruta, construida)``.
+    """
+    destino = ruta(nivel)
+    if destino.exists() and not forzar:
+        return destino, False
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporal = destino.with_suffix('.tmp')
+    temporal.unlink(missing_ok=True)
+
+    with en_archivo(temporal):
+        call_command('migrate', verbosity=0, interactive=False)
+        call_command('createcachetable', verbosity=0)
+        if NIVELES[nivel]:
+            engine = generador.engine_de_django()
+            with generador.triggers_suspendidos(engine):
+                generador.generar(
+                    engine, NIVELES[nivel], DESDE, HASTA, EMPLEADOS, PRODUCTOS, procesos, SEMILLA,
+                )
+            engine.dispose()
+            reconstruir(DESDE, HASTA)
+            cubo.reconstruir(DESDE, HASTA)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+    with closing(sqlite3.connect(temporal)) as base:
+        base.execute("VACUUM")
+
+    # Reemplazo atómico: nadie ve una plantilla a medio construir
+    os.replace(temporal, destino)
+    for vieja in destino.parent.glob(f"{nivel}-*.sqlite3"):
+        if vieja != destino:
+            vieja.unlink()
+    return destino, True
+
+
+def restaurar(nivel):
+    """
+    Copia la plantilla de ``nivel`` (la construye si falta) sobre la base
+    ``default`` con la API de backup y vacía la caché, que podría tener
+    catálogos o respuestas de los datos anteriores. Devuelve la plantilla.
+
+    Reemplaza la base entera, usuarios incluidos. No se puede usar dentro de
+    una transacción.
+    """
+    origen, _ = construir(nivel)
+    connection.ensure_connection()
+    with closing(sqlite3.connect(origen)) as fuente:
+        fuente.backup(connection.connection)
+    cache.clear()
+    return origen
+
+
+def copiar(nivel, archivo):
+    """Copia la plantilla de ``nivel`` (la construye si falta) a ``archivo``, que no debe estar abierto."""
+    origen, _ = construir(nivel)
+    shutil.copyfile(origen, archivo)
+    return origen
+
+
+def plantillas():
+    """``(nivel, ruta)`` de cada nivel para el esquema actual; ``ruta`` es None si no está construida."""
+    for nivel in NIVELES:
+        archivo = ruta(nivel)
+        yield nivel, archivo if archivo.exists() else None
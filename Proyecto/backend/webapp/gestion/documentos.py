@@ -0,0 +1,112 @@
+# documentos.py
+"""
+Caché en disco de los documentos de factura (HTML del detalle y PDF).
+
+Cada archivo se nombra con el id de la factura y una huella del contenido que
+muestra: los campos de la factura, el estado de anulación, el prefijo y las
+líneas con sus productos. Si algo de eso cambia, cambia la huella y el
+documento viejo deja de usarse; las vistas que hacen esos cambios además lo
+borran para liberar espacio. La huella sirve también de ETag.
+
+El directorio tiene un tope de tamaño: al pasarlo se borran los archivos
+usados hace más tiempo (cada lectura actualiza su fecha de modificación).
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+from backend.webapp.gestion.metricas import lectura_cache
+from backend.webapp.gestion.models import DetalleFactura, Factura
+
+# Subirlo cuando cambie cómo se dibuja un documento (plantilla o PDF)
+FORMATO = 1
+
+CAMPOS_HUELLA = (
+    'fecha_emision', 'hora_emision', 'subtotal', 'base_gravable', 'total', 'recibido', 'propina', 'anulado',
+    'cliente_id', 'cliente__nombre', 'empleado__nombre', 'empleado__apellido',
+    'tipo_pago__nombre', 'tipo_impuesto__nombre', 'tipo_impuesto__impuesto', 'configuracion__prefijo',
+)
+
+
+def directorio():
+    return Path(settings.DOCUMENTOS_CACHE_DIR)
+
+
+def huella(factura_id):
+    """Huella del contenido de la factura, o ``None`` si no existe. Dos consultas."""
+    fila = Factura.objects.filter(pk=factura_id).values_list(*CAMPOS_HUELLA).first()
+    if fila is None:
+        return None
+    lineas = list(
+        DetalleFactura.objects.filter(factura_id=factura_id)
+        .order_by('pk')
+        .values_list('producto_id', 'producto__nombre', 'cantidad', 'precio_unitario')
+    )
+    return hashlib.sha256(repr((FORMATO, fila, lineas)).encode()).hexdigest()[:32]
+
+
+def _ruta(factura_id, huella_actual, tipo):
+    return directorio() / f"{factura_id}-{huella_actual}.{tipo}"
+
+
+def leer(factura_id, huella_actual, tipo):
+    ruta = _ruta(factura_id, huella_actual, tipo)
+    try:
+        contenido = ruta.read_bytes()
+    except FileNotFoundError:
+        lectura_cache('documentos', False)
+        return None
+    lectura_cache('documentos', True)
+    try:
+        os.utime(ruta)
+    except FileNotFoundError:
+        pass
+    return contenido
+
+
+def guardar(factura_id, huella_actual, tipo, contenido):
+    carpeta = directorio()
+    carpeta.mkdir(parents=True, exist_ok=True)
+    # Escribir aparte y renombrar: un lector nunca ve un archivo a medias
+    fd, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, _ruta(factura_id, huella_actual, tipo))
+    recortar()
+
+
+def recortar():
+    """Borra los documentos menos usados hasta quedar bajo ``DOCUMENTOS_CACHE_MAX_BYTES``."""
+    archivos = []
+    total = 0
+    for entrada in os.scandir(directorio()):
+        if entrada.is_file() and not entrada.name.endswith('.tmp'):
+            estado = entrada.stat()
+            archivos.append((estado.st_mtime, estado.st_size, entrada.path))
+            total += estado.st_size
+    archivos.sort()
+    for _, tamano, ruta in archivos:
+        if total <= settings.DOCUMENTOS_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        total -= tamano
+
+
+def invalidar(factura_id):
+    """Borra todas las versiones guardadas de una factura."""
+    carpeta = directorio()
+    if carpeta.is_dir():
+        for ruta in carpeta.glob(f"{factura_id}-*"):
+            ruta.unlink(missing_ok=True)
+
+
+def invalidar_todo():
+    """Borra todos los documentos (p. ej. al cambiar el prefijo)."""
+    shutil.rmtree(directorio(), ignore_errors=True)
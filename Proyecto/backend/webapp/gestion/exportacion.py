@@ -0,0 +1,135 @@
+# exportacion.py
+"""
+Exportación en lote de facturas a PDF dentro de un ZIP.
+
+Las facturas se reparten en lotes entre un pool de procesos que las dibujan
+con el mismo diseño de ``factura_pdf``; el ZIP se va escribiendo a medida que
+llegan los lotes, en orden, y nunca hay más de unos pocos lotes en memoria.
+
+El admin exporta en su propio proceso (``procesos=1``); el pool es para el
+comando ``exportar_facturas``, que corre fuera del servidor web.
+
+Este módulo no importa modelos al cargarse: con el arranque ``spawn``
+(Windows, macOS) cada proceso hijo lo importa antes de configurar Django.
+"""
+import os
+import re
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.db import connections
+
+TAMANO_LOTE = 25
+
+_PAGINA = re.compile(rb'/Type /Page[^s]')
+
+
+def ids_facturas(desde, hasta):
+    """Ids de las facturas emitidas entre ``desde`` y ``hasta`` (inclusive), en orden."""
+    from backend.webapp.gestion.models import Factura
+
+    return list(
+        Factura.objects.filter(fecha_emision__range=(desde, hasta))
+        .order_by('fecha_emision', 'id')
+        .values_list('id', flat=True)
+    )
+
+
+def _iniciar_proceso():
+    if not apps.ready:
+        django.setup()
+
+
+def dibujar_lote(ids):
+    """Dibuja las facturas ``ids``; devuelve ``[(id, pdf, paginas)]`` en el mismo orden."""
+    from backend.webapp.gestion.models import Factura
+    from backend.webapp.gestion.pdf import dibujar_factura
+
+    facturas = Factura.objects.select_related(
+        'cliente', 'empleado', 'tipo_pago', 'tipo_impuesto', 'configuracion'
+    ).prefetch_related('detalles__producto').in_bulk(ids)
+    resultado = []
+    for factura_id in ids:
+        pdf = dibujar_factura(facturas[factura_id])
+        resultado.append((factura_id, pdf, len(_PAGINA.findall(pdf))))
+    return resultado
+
+
+class Salida:
+    """Destino de escritura sin ``seek`` ni ``tell``: ``zipfile`` escribe en modo streaming."""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+class Exportacion:
+    """
+    Genera el ZIP de ``ids`` por partes (iterar la instancia).
+
+    ``progreso(hechas, total)`` se llama después de cada lote. Al terminar,
+    ``facturas``, ``paginas`` y ``segundos`` quedan con los totales.
+    """
+
+    def __init__(self, ids, procesos=None, tamano_lote=TAMANO_LOTE, progreso=None):
+        self.ids = list(ids)
+        self.procesos = procesos or os.cpu_count() or 1
+        self.tamano_lote = tamano_lote
+        self.progreso = progreso
+        self.facturas = 0
+        self.paginas = 0
+        self.segundos = 0.0
+
+    def _lotes(self):
+        for inicio in range(0, len(self.ids), self.tamano_lote):
+            yield self.ids[inicio:inicio + self.tamano_lote]
+
+    def _resultados(self):
+        if self.procesos == 1:
+            for lote in self._lotes():
+                yield dibujar_lote(lote)
+            return
+        # Los hijos no deben heredar la conexión abierta del padre
+        connections.close_all()
+        with ProcessPoolExecutor(self.procesos, initializer=_iniciar_proceso) as pool:
+            pendientes = deque()
+            for lote in self._lotes():
+                pendientes.append(pool.submit(dibujar_lote, lote))
+                # Ventana acotada: solo dos lotes por proceso en vuelo
+                if len(pendientes) >= self.procesos * 2:
+                    yield pendientes.popleft().result()
+            while pendientes:
+                yield pendientes.popleft().result()
+
+    def __iter__(self):
+        inicio = time.perf_counter()
+        salida = Salida()
+        with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as archivo:
+            for lote in self._resultados():
+                for factura_id, pdf, paginas in lote:
+                    archivo.writestr(f"Factura_{factura_id}.pdf", pdf)
+                    self.facturas += 1
+                    self.paginas += paginas
+                if self.progreso:
+                    self.progreso(self.facturas, len(self.ids))
+                yield salida.vaciar()
+        yield salida.vaciar()
+        self.segundos = time.perf_counter() - inicio
+
+    def paginas_por_segundo(self):
+        return self.paginas / self.segundos if self.segundos else 0.0
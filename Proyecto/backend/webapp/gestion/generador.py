@@ -0,0 +1,412 @@
+# generador.py
+"""
+Generador de ventas sintéticas con la forma de un bar, a cualquier escala.
+
+Las facturas se reparten entre los días según el día de la semana y el mes,
+las horas se concentran en la noche, los productos siguen una popularidad
+tipo Zipf (unos pocos venden casi todo) y cada factura tiene pocas líneas.
+Todo se calcula con NumPy por lotes de días; los lotes se pueden repartir
+entre un pool de procesos y el proceso principal los inserta con
+``executemany`` de SQLAlchemy en una transacción por lote, en la base que
+tenga configurada Django.
+
+Los consecutivos de factura se reservan por día en ``SecuenciaFactura``
+antes de generar, como hace ``SecuenciaFactura.objects.reservar``, así que
+los ids no chocan con facturas ya existentes.
+
+Este módulo no importa modelos al cargarse: con el arranque ``spawn`` cada
+proceso hijo lo importa sin Django configurado (ver ``exportacion.py``).
+"""
+import datetime
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import URL
+
+FACTURAS_POR_LOTE = 20_000
+
+# Lunes a domingo
+PESO_DIA_SEMANA = np.array([0.55, 0.6, 0.7, 0.85, 1.35, 1.6, 1.0])
+# Enero a diciembre: enero flojo, temporada de fin de año
+PESO_MES = np.array([0.8, 0.85, 0.9, 0.95, 0.95, 1.0, 1.05, 1.0, 0.95, 1.0, 1.1, 1.35])
+# Abre a las 11:00 y cierra a medianoche; pico entre las 20:00 y las 22:00
+HORAS = np.arange(11, 24)
+PESO_HORA = np.array([1, 2, 2, 1, 1, 1, 2, 3, 5, 8, 9, 8, 5], dtype=float)
+
+# Líneas por factura: 1 + Poisson, con tope
+LINEAS_EXTRA_MEDIA = 1.2
+MAX_LINEAS = 8
+LINEAS_POR_FACTURA = 1 + LINEAS_EXTRA_MEDIA
+# Unidades por línea: geométrica (la mayoría 1 o 2)
+PROB_CANTIDAD = 0.6
+MAX_CANTIDAD = 12
+# Exponente de la popularidad de los productos
+ZIPF = 1.1
+PROB_ANULADA = 0.02
+PROB_PROPINA = 0.25
+PROPINA = 0.10
+PROB_CLIENTE_GENERAL = 0.85
+
+TIPOS_PAGO = ('Efectivo', 'Tarjeta Crédito', 'Tarjeta Débito', 'Transferencia')
+PESO_TIPO_PAGO = np.array([0.45, 0.25, 0.2, 0.1])
+
+# Tipo de producto y rango de precio (múltiplos de 100)
+CARTA = (
+    ('Cerveza', 4000, 9000), ('Coctel', 18000, 35000), ('Ron', 12000, 20000),
+    ('Aguardiente', 9000, 15000), ('Whisky', 20000, 45000), ('Vino', 15000, 30000),
+    ('Gaseosa', 3000, 5000), ('Agua', 2500, 4000), ('Jugo', 5000, 9000),
+    ('Picada', 25000, 60000), ('Alitas', 20000, 38000), ('Papas', 9000, 16000),
+    ('Hamburguesa', 22000, 35000), ('Nachos', 15000, 26000),
+)
+
+COLUMNAS_FACTURA = (
+    'id', 'configuracion_id', 'fecha_emision', 'hora_emision', 'empleado_id', 'cliente_id', 'subtotal',
+    'total', 'tipo_impuesto_id', 'base_gravable', 'tipo_pago_id', 'recibido', 'propina', 'anulado',
+)
+COLUMNAS_LINEA = ('factura_id', 'producto_id', 'cantidad', 'precio_unitario')
+
+# Tablas cuyos triggers se suspenden durante la carga (cubo y registro de cambios)
+TABLAS_CON_TRIGGERS = ('gestion_factura', 'gestion_detallefactura')
+# Copia de los triggers quitados (modelo TriggerSuspendido)
+TABLA_SUSPENDIDOS = 'gestion_triggersuspendido'
+
+DRIVERS = {'sqlite': 'sqlite', 'mysql': 'mysql+pymysql', 'postgresql': 'postgresql'}
+
+
+def engine_de_django():
+    """Engine de SQLAlchemy para la base ``default`` de Django."""
+    from django.db import connection
+
+    datos = connection.settings_dict
+    if connection.vendor == 'sqlite':
+        return create_engine(f"sqlite:///{datos['NAME']}")
+    return create_engine(URL.create(
+        DRIVERS[connection.vendor],
+        username=datos['USER'] or None,
+        password=datos['PASSWORD'] or None,
+        host=datos['HOST'] or None,
+        port=int(datos['PORT']) if datos['PORT'] else None,
+        database=datos['NAME'],
+    ))
+
+
+def _insertar(conexion, tabla, columnas, filas):
+    """``executemany`` directo al driver: sin un dict por fila."""
+    if not filas:
+        return
+    marca = '?' if conexion.dialect.paramstyle == 'qmark' else '%s'
+    sql = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join([marca] * len(columnas))})"
+    conexion.exec_driver_sql(sql, filas)
+
+
+def _ids(conexion, tabla, columna='id'):
+    return [fila[0] for fila in conexion.execute(text(f"SELECT {columna} FROM {tabla} ORDER BY {columna}"))]
+
+
+# --- Catálogos -----------------------------------------------------------------
+
+def preparar_catalogos(conexion, empleados, productos, semilla=0):
+    """
+    Completa los catálogos hasta ``empleados`` y ``productos`` (nunca borra) y
+    devuelve los arreglos que necesita ``generar_lote``.
+    """
+    from faker import Faker
+
+    fake = Faker('es_ES')
+    fake.seed_instance(semilla)
+    azar = random.Random(semilla)
+
+    if not _ids(conexion, 'gestion_tipopago'):
+        _insertar(conexion, 'gestion_tipopago', ('nombre',), [(nombre,) for nombre in TIPOS_PAGO])
+    if not _ids(conexion, 'gestion_detalleimpuesto'):
+        _insertar(conexion, 'gestion_detalleimpuesto', ('nombre', 'impuesto'), [('IVA 19%', 19.0), ('Impoconsumo 8%', 8.0)])
+    if not _ids(conexion, 'gestion_configuracionfactura'):
+        _insertar(conexion, 'gestion_configuracionfactura', ('prefijo',), [('FAC',)])
+    if 1 not in _ids(conexion, 'gestion_cliente'):
+        _insertar(conexion, 'gestion_cliente', ('id', 'nombre', 'email'), [(1, 'Cliente General', '')])
+    clientes = _ids(conexion, 'gestion_cliente')
+    if len(clientes) < 50:
+        _insertar(conexion, 'gestion_cliente', ('nombre', 'celular', 'email'), [
+            (fake.name(), fake.unique.random_int(3000000000, 3999999999), fake.unique.email())
+            for _ in range(50 - len(clientes))
+        ])
+
+    existentes = _ids(conexion, 'gestion_empleado')
+    if len(existentes) < empleados:
+        celular = conexion.execute(text("SELECT MAX(celular) FROM gestion_empleado")).scalar() or 3100000000
+        numeros = [int(e) for e in existentes if e.isdigit()]
+        siguiente = max(numeros, default=0) + 1
+        _insertar(conexion, 'gestion_empleado', ('id', 'nombre', 'apellido', 'celular', 'estado'), [
+            (f"{siguiente + i:04d}", fake.first_name(), fake.last_name(), celular + 1 + i, True)
+            for i in range(empleados - len(existentes))
+        ])
+
+    faltan = productos - len(_ids(conexion, 'gestion_producto'))
+    if faltan > 0:
+        nuevos = []
+        for _ in range(faltan):
+            tipo, minimo, maximo = azar.choice(CARTA)
+            nuevos.append((
+                f"{tipo} {fake.word()}", azar.randrange(minimo, maximo + 1, 100), 100,
+                1, 'unidad',
+            ))
+        _insertar(conexion, 'gestion_producto', ('nombre', 'precio', 'stock', 'cantidad_medida', 'unidad_medida'), nuevos)
+
+    productos = list(conexion.execute(text("SELECT id, precio FROM gestion_producto ORDER BY id")))
+    # Popularidad tipo Zipf con el puesto de cada producto al azar
+    puesto = np.random.default_rng(semilla).permutation(len(productos)) + 1
+    popularidad = 1.0 / puesto ** ZIPF
+    tipos_pago = _ids(conexion, 'gestion_tipopago')
+    peso_pago = PESO_TIPO_PAGO if len(tipos_pago) == len(PESO_TIPO_PAGO) else np.ones(len(tipos_pago))
+    impuestos = list(conexion.execute(text("SELECT id, impuesto FROM gestion_detalleimpuesto ORDER BY id")))
+    return {
+        'configuracion': _ids(conexion, 'gestion_configuracionfactura')[0],
+        'clientes': np.array(_ids(conexion, 'gestion_cliente')),
+        'empleados': np.array(_ids(conexion, 'gestion_empleado'), dtype=object),
+        'tipos_pago': np.array(tipos_pago),
+        'peso_pago': peso_pago / peso_pago.sum(),
+        'impuestos': np.array([i for i, _ in impuestos]),
+        'tasas': np.array([float(t) for _, t in impuestos]) / 100,
+        'productos': np.array([p for p, _ in productos]),
+        'precios': np.array([float(p) for _, p in productos]),
+        'popularidad': popularidad / popularidad.sum(),
+    }
+
+
+# --- Reparto y consecutivos ----------------------------------------------------
+
+def repartir(facturas, desde, hasta, azar):
+    """Número de facturas por día (arreglo desde ``desde``) según semana y mes."""
+    dias = np.arange(np.datetime64(desde, 'D'), np.datetime64(hasta, 'D') + 1)
+    dia_semana = (dias.astype(np.int64) + 3) % 7  # 0 = lunes; el 1970-01-01 fue jueves
+    mes = dias.astype('M8[M]').astype(np.int64) % 12
+    peso = PESO_DIA_SEMANA[dia_semana] * PESO_MES[mes]
+    return azar.multinomial(facturas, peso / peso.sum())
+
+
+def reservar(conexion, desde, cantidades):
+    """
+    Reserva los consecutivos de cada día en ``gestion_secuenciafactura`` y
+    devuelve el primero de cada uno (mismo criterio que ``SecuenciaFactura``).
+    """
+    fechas = [desde + datetime.timedelta(days=n) for n in range(len(cantidades))]
+    rango = {'desde': fechas[0].isoformat(), 'hasta': fechas[-1].isoformat()}
+    ultimos = {
+        str(fecha): ultimo for fecha, ultimo in conexion.execute(text(
+            "SELECT fecha, ultimo FROM gestion_secuenciafactura WHERE fecha BETWEEN :desde AND :hasta"
+        ), rango)
+    }
+    con_fila = set(ultimos)
+    # Días con facturas anteriores a la secuencia: se sigue desde la mayor
+    for fecha, mayor in conexion.execute(text(
+        "SELECT fecha_emision, MAX(id) FROM gestion_factura WHERE fecha_emision BETWEEN :desde AND :hasta "
+        "GROUP BY fecha_emision"
+    ), rango):
+        sufijo = mayor[6:]
+        if str(fecha) not in ultimos and sufijo.isdigit():
+            ultimos[str(fecha)] = int(sufijo)
+
+    primeros = np.zeros(len(fechas), dtype=np.int64)
+    nuevas, cambios = [], []
+    for n, (fecha, cantidad) in enumerate(zip(fechas, cantidades.tolist())):
+        clave = fecha.isoformat()
+        primeros[n] = ultimos.get(clave, 0) + 1
+        if not cantidad:
+            continue
+        if clave in con_fila:
+            cambios.append((ultimos[clave] + cantidad, clave))
+        else:
+            nuevas.append((clave, ultimos.get(clave, 0) + cantidad))
+    _insertar(conexion, 'gestion_secuenciafactura', ('fecha', 'ultimo'), nuevas)
+    if cambios:
+        marca = '?' if conexion.dialect.paramstyle == 'qmark' else '%s'
+        conexion.exec_driver_sql(f"UPDATE gestion_secuenciafactura SET ultimo = {marca} WHERE fecha = {marca}", cambios)
+    return primeros
+
+
+def lotes(desde, cantidades, primeros, tamano=FACTURAS_POR_LOTE):
+    """Días consecutivos agrupados hasta unas ``tamano`` facturas por lote."""
+    dia_desde = int(np.datetime64(desde, 'D').astype(np.int64))
+    inicio, acumuladas = 0, 0
+    for n, cantidad in enumerate(cantidades.tolist()):
+        acumuladas += cantidad
+        if acumuladas >= tamano or n == len(cantidades) - 1:
+            yield (
+                np.arange(dia_desde + inicio, dia_desde + n + 1),
+                cantidades[inicio:n + 1],
+                primeros[inicio:n + 1],
+            )
+            inicio, acumuladas = n + 1, 0
+
+
+# --- Generación de un lote -----------------------------------------------------
+
+def generar_lote(tarea):
+    """
+    Facturas y líneas de un lote de días como listas de tuplas listas para
+    insertar (columnas ``COLUMNAS_FACTURA`` y ``COLUMNAS_LINEA``).
+    """
+    semilla, (dias, cantidades, primeros), catalogos = tarea
+    azar = np.random.default_rng(semilla)
+    n = int(cantidades.sum())
+    if not n:
+        return [], []
+
+    # Hora de cada factura; dentro del día los consecutivos siguen la hora
+    dia = np.repeat(dias, cantidades)
+    segundos = (
+        azar.choice(HORAS, n, p=PESO_HORA / PESO_HORA.sum()) * 3600 + azar.integers(0, 3600, n)
+    )
+    orden = np.lexsort((segundos, dia))
+    segundos = segundos[orden]
+    inicio_dia = np.repeat(np.cumsum(cantidades) - cantidades, cantidades)
+    consecutivo = np.repeat(primeros, cantidades) + np.arange(n) - inicio_dia
+
+    fechas = np.datetime_as_string(dia.astype('M8[D]'))
+    ids = [f"{f[2:4]}{f[5:7]}{f[8:10]}{c:04d}" for f, c in zip(fechas.tolist(), consecutivo.tolist())]
+    horas = [f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in segundos.tolist()]
+
+    lineas = 1 + np.minimum(azar.poisson(LINEAS_EXTRA_MEDIA, n), MAX_LINEAS - 1)
+    factura_de_linea = np.repeat(np.arange(n), lineas)
+    producto = azar.choice(len(catalogos['productos']), len(factura_de_linea), p=catalogos['popularidad'])
+    cantidad = np.minimum(azar.geometric(PROB_CANTIDAD, len(factura_de_linea)), MAX_CANTIDAD)
+    precio = catalogos['precios'][producto]
+
+    subtotal = np.round(np.bincount(factura_de_linea, weights=cantidad * precio, minlength=n), 2)
+    impuesto = azar.integers(0, len(catalogos['impuestos']), n)
+    valor_impuesto = np.round(subtotal * catalogos['tasas'][impuesto], 2)
+    propina = np.where(azar.random(n) < PROB_PROPINA, np.round(subtotal * PROPINA, -2), 0.0)
+    total = subtotal + valor_impuesto + propina
+    empleados = catalogos['empleados']
+    peso_empleado = np.linspace(1.5, 0.5, len(empleados))
+    clientes = catalogos['clientes']
+    cliente = np.where(azar.random(n) < PROB_CLIENTE_GENERAL, 1, clientes[azar.integers(0, len(clientes), n)])
+    tipo_pago = catalogos['tipos_pago'][azar.choice(len(catalogos['tipos_pago']), n, p=catalogos['peso_pago'])]
+
+    facturas = list(zip(
+        ids,
+        [catalogos['configuracion']] * n,
+        fechas.tolist(),
+        horas,
+        empleados[azar.choice(len(empleados), n, p=peso_empleado / peso_empleado.sum())].tolist(),
+        cliente.tolist(),
+        subtotal.tolist(),
+        total.tolist(),
+        catalogos['impuestos'][impuesto].tolist(),
+        subtotal.tolist(),
+        tipo_pago.tolist(),
+        total.tolist(),
+        propina.tolist(),
+        (azar.random(n) < PROB_ANULADA).tolist(),
+    ))
+    lineas = list(zip(
+        np.array(ids, dtype=object)[factura_de_linea].tolist(),
+        catalogos['productos'][producto].tolist(),
+        cantidad.tolist(),
+        precio.tolist(),
+    ))
+    return facturas, lineas
+
+
+def _resultados(tareas, procesos):
+    if procesos == 1:
+        for tarea in tareas:
+            yield generar_lote(tarea)
+        return
+    with ProcessPoolExecutor(procesos) as pool:
+        pendientes = deque()
+        for tarea in tareas:
+            pendientes.append(pool.submit(generar_lote, tarea))
+            # Ventana acotada: solo dos lotes por proceso en memoria
+            if len(pendientes) >= procesos * 2:
+                yield pendientes.popleft().result()
+        while pendientes:
+            yield pendientes.popleft().result()
+
+
+def _restaurar(conexion):
+    suspendidos = list(conexion.execute(text(f"SELECT nombre, sql FROM {TABLA_SUSPENDIDOS}")))
+    existentes = {fila[0] for fila in conexion.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))}
+    for nombre, sql in suspendidos:
+        if nombre not in existentes:
+            conexion.exec_driver_sql(sql)
+    conexion.execute(text(f"DELETE FROM {TABLA_SUSPENDIDOS}"))
+    return [nombre for nombre, _ in suspendidos if nombre not in existentes]
+
+
+def restaurar_triggers(engine):
+    """
+    Vuelve a crear los triggers que quedaron suspendidos si una carga murió
+    dentro de ``triggers_suspendidos``. Devuelve los nombres recreados.
+    """
+    if engine.dialect.name != 'sqlite':
+        return []
+    with engine.begin() as conexion:
+        return _restaurar(conexion)
+
+
+@contextmanager
+def triggers_suspendidos(engine):
+    """
+    En SQLite quita los triggers de factura y líneas (cubo y registro de
+    cambios) mientras dura el bloque y los vuelve a crear con el mismo SQL.
+
+    El SQL queda guardado en ``gestion_triggersuspendido`` hasta que se
+    recrean, así que un proceso matado a mitad de la carga no los pierde.
+    """
+    if engine.dialect.name != 'sqlite':
+        yield []
+        return
+    marcas = ', '.join(f"'{tabla}'" for tabla in TABLAS_CON_TRIGGERS)
+    with engine.begin() as conexion:
+        # Los de una corrida anterior que no terminó
+        _restaurar(conexion)
+        triggers = list(conexion.execute(text(
+            f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ({marcas})"
+        )))
+        if triggers:
+            conexion.execute(
+                text(f"INSERT INTO {TABLA_SUSPENDIDOS} (nombre, sql) VALUES (:nombre, :sql)"),
+                [{'nombre': nombre, 'sql': sql} for nombre, sql in triggers],
+            )
+        for nombre, _ in triggers:
+            conexion.exec_driver_sql(f"DROP TRIGGER {nombre}")
+    try:
+        yield [nombre for nombre, _ in triggers]
+    finally:
+        with engine.begin() as conexion:
+            _restaurar(conexion)
+
+
+def generar(engine, lineas, desde, hasta, empleados=10, productos=60, procesos=None, semilla=0, progreso=None):
+    """
+    Inserta unas ``lineas`` líneas de venta (en facturas completas) entre
+    ``desde`` y ``hasta``. ``progreso(facturas, lineas)`` se llama después de
+    cada lote. Devuelve ``(facturas, lineas)`` insertadas.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    azar = np.random.default_rng(semilla)
+    with engine.begin() as conexion:
+        catalogos = preparar_catalogos(conexion, empleados, productos, semilla)
+        cantidades = repartir(round(lineas / LINEAS_POR_FACTURA), desde, hasta, azar)
+        primeros = reservar(conexion, desde, cantidades)
+
+    tareas = list(lotes(desde, cantidades, primeros))
+    semillas = np.random.SeedSequence(semilla).spawn(len(tareas))
+    hechas = [0, 0]
+    for facturas, filas in _resultados(
+        ((s, tarea, catalogos) for s, tarea in zip(semillas, tareas)), procesos
+    ):
+        with engine.begin() as conexion:
+            _insertar(conexion, 'gestion_factura', COLUMNAS_FACTURA, facturas)
+            _insertar(conexion, 'gestion_detallefactura', COLUMNAS_LINEA, filas)
+        hechas[0] += len(facturas)
+        hechas[1] += len(filas)
+        if progreso:
+            progreso(*hechas)
+    return tuple(hechas)
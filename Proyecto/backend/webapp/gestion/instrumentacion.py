@@ -0,0 +1,144 @@
+# instrumentacion.py
+"""
+Instrumentación SQL por petición.
+
+``InstrumentacionSQLMiddleware`` envuelve el cursor de la conexión mientras
+dura la petición: cuenta las consultas y su tiempo, agrupa las que tienen la
+misma forma (el SQL con los ``IN (%s, ...)`` colapsados; los valores viajan
+aparte) para marcar patrones N+1, y al terminar pide el plan
+(``EXPLAIN QUERY PLAN`` en SQLite) de las consultas que pasaron de
+``SQL_LENTA_MS``. El resultado sale como cabecera ``Server-Timing`` y como
+una línea JSON en el logger ``backend.webapp.gestion.sql``.
+
+Se activa con ``SQL_INSTRUMENTACION``; apagado, el middleware se quita solo
+de la cadena al arrancar (``MiddlewareNotUsed``) y no cuesta nada. Encendido,
+por consulta solo se mide el tiempo y se cuenta el SQL tal cual en un dict:
+las formas y los planes se calculan una vez, al final.
+
+Las respuestas en streaming (las exportaciones) consultan mientras se
+envían, después de pasar por aquí: de ellas solo cuenta lo previo.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger('backend.webapp.gestion.sql')
+
+LISTA = re.compile(r'%s(?:\s*,\s*%s)+')
+TRANSACCION = ('SAVEPOINT', 'RELEASE', 'ROLLBACK', 'BEGIN', 'COMMIT')
+MAX_PLANES = 5
+LARGO_SQL = 300
+
+
+def forma(sql):
+    """El SQL sin lo que cambia entre repeticiones de la misma consulta."""
+    return LISTA.sub('%s, ...', sql)
+
+
+class Registro:
+    """Consultas de una petición; se instala con ``connection.execute_wrapper``."""
+
+    def __init__(self, lenta_ms):
+        self.lenta = lenta_ms / 1000
+        self.consultas = 0
+        self.segundos = 0.0
+        self.sentencias = Counter()
+        self.lentas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.consultas += 1
+            self.segundos += duracion
+            self.sentencias[sql] += 1
+            if duracion >= self.lenta and not many:
+                self.lentas.append((duracion, sql, params))
+
+    def repetidas(self, minimo):
+        """``(forma, veces)`` de las formas que se repiten ``minimo`` veces o más, de más a menos."""
+        formas = Counter()
+        for sql, veces in self.sentencias.items():
+            if not sql.lstrip().upper().startswith(TRANSACCION):
+                formas[forma(sql)] += veces
+        return [(sql, veces) for sql, veces in formas.most_common() if veces >= minimo]
+
+    def planes(self):
+        """Las consultas lentas (las más lentas primero) con su plan, si se pudo pedir."""
+        prefijo = connection.ops.explain_query_prefix()
+        resultado = []
+        for duracion, sql, params in sorted(self.lentas, key=lambda lenta: lenta[0], reverse=True)[:MAX_PLANES]:
+            plan = None
+            if sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"{prefijo} {sql}", params)
+                        plan = [' '.join(str(columna) for columna in fila) for fila in cursor.fetchall()]
+                except Exception:
+                    # La consulta pudo depender de una transacción que ya terminó
+                    plan = None
+            resultado.append({'sql': sql[:LARGO_SQL], 'ms': round(duracion * 1000, 2), 'plan': plan})
+        return resultado
+
+
+def _nombre_vista(request):
+    coincidencia = getattr(request, 'resolver_match', None)
+    if coincidencia is None:
+        try:
+            coincidencia = resolve(request.path_info)
+        except Resolver404:
+            return None
+    return coincidencia.view_name
+
+
+class InstrumentacionSQLMiddleware:
+    """Mide el SQL de cada petición (ver el docstring del módulo). Va primero en ``MIDDLEWARE``."""
+
+    def __init__(self, get_response):
+        if not settings.SQL_INSTRUMENTACION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.lenta_ms = settings.SQL_LENTA_MS
+        self.minimo_n1 = settings.SQL_N1_MINIMO
+
+    def __call__(self, request):
+        registro = Registro(self.lenta_ms)
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(registro):
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - inicio) * 1000
+        db_ms = registro.segundos * 1000
+
+        repetidas = registro.repetidas(self.minimo_n1)
+        lentas = registro.planes() if registro.lentas else []
+        metricas = [f'db;dur={db_ms:.2f};desc="{registro.consultas} consultas"']
+        if repetidas:
+            metricas.append(f'n1;desc="{len(repetidas)} formas repetidas"')
+        if lentas:
+            metricas.append(f'sql-lenta;dur={lentas[0]["ms"]:.2f};desc="{len(lentas)} lentas"')
+        anterior = response.get('Server-Timing')
+        response['Server-Timing'] = ', '.join(([anterior] if anterior else []) + metricas)
+
+        linea = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'vista': _nombre_vista(request),
+            'estado': response.status_code,
+            'consultas': registro.consultas,
+            'db_ms': round(db_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'n1': [{'sql': sql[:LARGO_SQL], 'veces': veces} for sql, veces in repetidas],
+            'lentas': lentas,
+        }
+        nivel = logging.WARNING if repetidas or lentas else logging.INFO
+        logger.log(nivel, json.dumps(linea, ensure_ascii=False))
+        return response
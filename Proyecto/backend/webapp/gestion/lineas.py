@@ -0,0 +1,51 @@
+# lineas.py
+"""Conciliación de las líneas de detalle (compras y ventas) contra lo guardado."""
+from collections import defaultdict
+
+
+class Conciliacion:
+    """
+    Diferencia entre los ``detalles`` guardados y las ``nuevas`` líneas del formulario.
+
+    ``nuevas`` es una lista de dicts con ``producto_id`` y cada uno de los
+    ``campos``. Las líneas se emparejan por producto: las que no cambiaron no
+    se tocan, las que cambiaron se actualizan, las que sobran se borran y las
+    que faltan se insertan.
+    """
+
+    def __init__(self, detalles, nuevas, campos):
+        self.campos = list(campos)
+        self.crear = []
+        self.actualizar = []
+
+        # Cantidad guardada y cambio neto (nuevas - anteriores) por producto
+        self.anteriores = defaultdict(int)
+        cambios = defaultdict(int)
+        previos = defaultdict(list)
+        for detalle in detalles:
+            self.anteriores[detalle.producto_id] += detalle.cantidad
+            cambios[detalle.producto_id] -= detalle.cantidad
+            previos[detalle.producto_id].append(detalle)
+
+        for linea in nuevas:
+            cambios[linea['producto_id']] += linea['cantidad']
+            if not previos[linea['producto_id']]:
+                self.crear.append(linea)
+                continue
+            detalle = previos[linea['producto_id']].pop(0)
+            if any(getattr(detalle, campo) != linea[campo] for campo in self.campos):
+                for campo in self.campos:
+                    setattr(detalle, campo, linea[campo])
+                self.actualizar.append(detalle)
+
+        self.borrar = [detalle for sobrantes in previos.values() for detalle in sobrantes]
+        self.cambios = {pid: cambio for pid, cambio in cambios.items() if cambio}
+
+    def aplicar(self, modelo, **padre):
+        """Ejecuta los borrados, actualizaciones e inserciones en bloque."""
+        if self.borrar:
+            modelo.objects.filter(pk__in=[detalle.pk for detalle in self.borrar]).delete()
+        if self.actualizar:
+            modelo.objects.bulk_update(self.actualizar, self.campos)
+        if self.crear:
+            modelo.objects.bulk_create([modelo(**padre, **linea) for linea in self.crear])
@@ -0,0 +1,89 @@
+import datetime
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from backend.webapp.gestion.analytics.series import serie
+from backend.webapp.gestion.models import CuboDia, Empleado, Producto
+
+
+class Command(BaseCommand):
+    help = "Compara la serie densa de analytics con pivotear en Python las filas por producto y día."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=10_000)
+        parser.add_argument('--dias', type=int, default=730)
+        parser.add_argument('--densidad', type=float, default=0.1,
+                            help="Fracción de celdas producto × día con ventas")
+        parser.add_argument('--ventana', type=int, default=7)
+        parser.add_argument('--top', type=int, default=10)
+
+    def handle(self, *args, **options):
+        # Como benchmark_venta: todo se revierte al final
+        with transaction.atomic():
+            desde, hasta, celdas = self._preparar(options)
+            self.stdout.write(
+                f"{options['productos']:,} productos × {options['dias']} días, {celdas:,} celdas del cubo"
+            )
+            for nombre, funcion in (('filas + Python', self._legado), ('serie densa', self._serie)):
+                inicio = time.perf_counter()
+                funcion(desde, hasta, options['ventana'], options['top'])
+                self.stdout.write(f"{nombre:>16}: {(time.perf_counter() - inicio) * 1000:>9.0f} ms")
+            transaction.set_rollback(True)
+
+    def _preparar(self, options):
+        empleado = Empleado.objects.create(id='BENCH', nombre='Benchmark', apellido='Series', celular=1)
+        Producto.objects.bulk_create([
+            Producto(nombre=f"Benchmark {i}", precio=Decimal('1000.00'), stock=0, cantidad_medida=1, unidad_medida='UND')
+            for i in range(options['productos'])
+        ])
+        productos = np.array(Producto.objects.filter(nombre__startswith='Benchmark ').values_list('pk', flat=True))
+        desde = datetime.date(2024, 1, 1)
+        hasta = desde + datetime.timedelta(days=options['dias'] - 1)
+
+        azar = np.random.default_rng(0)
+        total = len(productos) * options['dias']
+        elegidas = np.sort(azar.choice(total, int(total * options['densidad']), replace=False))
+        fechas = (np.datetime64(desde) + elegidas % options['dias']).astype(str)
+        cantidades = azar.integers(1, 20, len(elegidas))
+        CuboDia.objects.filter(fecha__range=(desde, hasta)).delete()
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO gestion_cubodia (fecha, empleado_id, producto_id, lineas, cantidad, total)"
+                " VALUES (%s, %s, %s, 1, %s, %s)",
+                [
+                    (f, empleado.pk, p, c, c * 1000)
+                    for f, p, c in zip(fechas.tolist(), productos[elegidas // options['dias']].tolist(),
+                                       cantidades.tolist())
+                ],
+            )
+        return desde, hasta, len(elegidas)
+
+    def _legado(self, desde, hasta, ventana, top):
+        """Filas producto-día del ORM pivoteadas y recorridas en Python."""
+        filas = (
+            CuboDia.objects.filter(fecha__range=(desde, hasta))
+            .values('fecha', 'producto__nombre').annotate(total=Sum('cantidad'))
+        )
+        dias = [desde + datetime.timedelta(days=n) for n in range((hasta - desde).days + 1)]
+        tabla = {}
+        for fila in filas:
+            tabla.setdefault(fila['producto__nombre'], {})[fila['fecha']] = fila['total']
+        movil, semanal = {}, {}
+        for producto, por_dia in tabla.items():
+            valores = [por_dia.get(d, 0) for d in dias]
+            movil[producto] = [sum(valores[max(0, i - ventana + 1):i + 1]) for i in range(len(valores))]
+            semanal[producto] = [valores[i] - valores[i - 7] for i in range(7, len(valores))]
+        mejores = [
+            sorted(tabla, key=lambda p: tabla[p].get(d, 0), reverse=True)[:top]
+            for d in dias
+        ]
+        return movil, semanal, mejores
+
+    def _serie(self, desde, hasta, ventana, top):
+        datos = serie(desde, hasta)
+        return datos.acumulado_movil(ventana), datos.variacion_semanal(), datos.top(top)
@@ -0,0 +1,80 @@
+import statistics
+import time
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from backend.webapp.gestion.models import (
+    Cliente,
+    ConfiguracionFactura,
+    DetalleImpuesto,
+    Empleado,
+    Producto,
+    TipoPago,
+)
+
+
+class Command(BaseCommand):
+    help = "Mide consultas y latencia de registrar_venta según el número de líneas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lineas', nargs='+', type=int, default=[1, 5, 12, 25, 50])
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        # Todo corre dentro de una transacción que se revierte al final,
+        # así que se puede ejecutar contra la base real sin dejar rastro.
+        with transaction.atomic():
+            datos = self._preparar(max(options['lineas']))
+            client = Client(HTTP_HOST='localhost')
+            url = reverse('registrar_venta')
+            client.post(url, self._venta(datos, 1))  # Calienta la secuencia del día
+
+            self.stdout.write(f"{'lineas':>6} {'consultas':>9} {'mediana ms':>10} {'p95 ms':>8}")
+            for n in options['lineas']:
+                # Igual que el formulario del navegador (urlencoded, no multipart)
+                post = urlencode(self._venta(datos, n), doseq=True)
+                tiempos = []
+                for _ in range(options['repeticiones']):
+                    with CaptureQueriesContext(connection) as ctx:
+                        inicio = time.perf_counter()
+                        client.post(url, post, content_type='application/x-www-form-urlencoded')
+                        tiempos.append((time.perf_counter() - inicio) * 1000)
+                tiempos.sort()
+                p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+                self.stdout.write(
+                    f"{n:>6} {len(ctx.captured_queries):>9} {statistics.median(tiempos):>10.2f} {p95:>8.2f}"
+                )
+            transaction.set_rollback(True)
+
+    def _preparar(self, n):
+        ConfiguracionFactura.objects.get_or_create(pk=1)
+        Cliente.objects.get_or_create(pk=1)
+        Producto.objects.bulk_create([
+            Producto(nombre=f"Benchmark {i}", precio=Decimal('1000.00'), stock=10**6,
+                     cantidad_medida=1, unidad_medida='UND')
+            for i in range(n)
+        ])
+        return {
+            'empleado': Empleado.objects.create(id='BENCH', nombre='Benchmark', apellido='Venta', celular=1),
+            'tipo_pago': TipoPago.objects.create(nombre='Benchmark'),
+            'impuesto': DetalleImpuesto.objects.create(nombre='Benchmark', impuesto=Decimal('19.000')),
+            'productos': list(Producto.objects.filter(nombre__startswith='Benchmark ').values_list('pk', flat=True)),
+        }
+
+    def _venta(self, datos, n):
+        return {
+            'cliente': '1',
+            'empleado': datos['empleado'].pk,
+            'tipo_pago': datos['tipo_pago'].pk,
+            'tipo_impuesto': datos['impuesto'].pk,
+            'recibido': '0',
+            'propina': '0',
+            'producto': datos['productos'][:n],
+            'cantidad': ['1'] * n,
+        }
@@ -0,0 +1,90 @@
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from backend.webapp.gestion import datos_prueba
+from backend.webapp.gestion.benchmarks import linea_base
+from backend.webapp.gestion.benchmarks.escenarios import ESCENARIOS, preparar
+from backend.webapp.gestion.benchmarks.medicion import medir
+
+COLUMNAS = (('tiempo_ms', 'mediana ms', '.2f'), ('p95_ms', 'p95 ms', '.2f'), ('consultas', 'consultas', 'g'),
+            ('instrucciones_sqlite', 'instr. SQLite', ',.0f'), ('memoria_pico_mb', 'memoria MB', '.1f'))
+
+
+def _umbral(texto):
+    metrica, _, valor = texto.partition('=')
+    if metrica not in linea_base.UMBRALES:
+        raise ValueError(metrica)
+    return metrica, float(valor)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide las vistas calientes y la consulta del tablero sobre las bases de prueba por niveles "
+        "y compara con la línea base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--niveles', nargs='+', default=['chico'], choices=list(datos_prueba.NIVELES))
+        parser.add_argument('--escenarios', nargs='+', default=list(ESCENARIOS), choices=list(ESCENARIOS))
+        parser.add_argument('--repeticiones', type=int, default=10)
+        parser.add_argument('--resultados', help="Guardar los resultados en este archivo JSON")
+        parser.add_argument('--linea-base', default=str(linea_base.RUTA), help="Archivo JSON de la línea base")
+        parser.add_argument('--guardar-linea-base', action='store_true',
+                            help="Guardar estos resultados como línea base en vez de comparar")
+        parser.add_argument('--umbral', type=_umbral, action='append', default=[], metavar='METRICA=VALOR',
+                            help="Aumento relativo permitido, p. ej. tiempo_ms=0.1 (ver linea_base.UMBRALES)")
+
+    def handle(self, *args, **options):
+        niveles = {}
+        for nivel in options['niveles']:
+            self.stdout.write(f"Nivel {nivel} ({datos_prueba.NIVELES[nivel]:,} líneas)")
+            niveles[nivel] = self._nivel(nivel, options['escenarios'], options['repeticiones'])
+        datos = linea_base.resultado(niveles, options['repeticiones'])
+        if options['resultados']:
+            linea_base.guardar(datos, options['resultados'])
+
+        ruta = options['linea_base']
+        if options['guardar_linea_base']:
+            linea_base.guardar(datos, ruta)
+            self.stdout.write(self.style.SUCCESS(f"Línea base guardada en {ruta}"))
+            return
+        base = linea_base.cargar(ruta)
+        if base is None:
+            self.stdout.write(f"No hay línea base en {ruta}: guárdala con --guardar-linea-base")
+            return
+        if not linea_base.misma_maquina(datos, base):
+            self.stdout.write(
+                "La línea base es de otra máquina: solo se comparan consultas e instrucciones. "
+                "Guarda una propia con --guardar-linea-base para comparar tiempos y memoria."
+            )
+        regresiones = linea_base.comparar(datos, base, dict(options['umbral']))
+        for nivel, escenario, metrica, antes, ahora in regresiones:
+            self.stdout.write(self.style.ERROR(f"{nivel}/{escenario}: {metrica} {antes:g} → {ahora:g}"))
+        if regresiones:
+            raise CommandError(f"{len(regresiones)} regresiones frente a {ruta}")
+        self.stdout.write(self.style.SUCCESS(f"Sin regresiones frente a {ruta}"))
+
+    def _nivel(self, nivel, escenarios, repeticiones):
+        # Sobre una copia desechable de la plantilla, con caché y documentos propios:
+        # la base y la caché reales no se tocan
+        datos_prueba.construir(nivel)
+        resultados = {}
+        with tempfile.TemporaryDirectory() as directorio:
+            copia = Path(directorio) / 'base.sqlite3'
+            datos_prueba.copiar(nivel, copia)
+            cache = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}}
+            ajustes = override_settings(
+                CACHES=cache, DOCUMENTOS_CACHE_DIR=Path(directorio) / 'documentos', ALLOWED_HOSTS=['testserver'],
+            )
+            with ajustes, datos_prueba.en_archivo(copia):
+                datos = preparar()
+                self.stdout.write(f"{'escenario':>22} " + ' '.join(f"{titulo:>13}" for _, titulo, _ in COLUMNAS))
+                for nombre in escenarios:
+                    resultados[nombre] = medir(ESCENARIOS[nombre](datos), repeticiones)
+                    self.stdout.write(f"{nombre:>22} " + ' '.join(
+                        f"{resultados[nombre][clave]:>13{formato}}" for clave, _, formato in COLUMNAS
+                    ))
+        return resultados
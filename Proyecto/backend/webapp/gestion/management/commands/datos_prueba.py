@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.webapp.gestion import datos_prueba
+
+
+class Command(BaseCommand):
+    help = "Construye, restaura o lista las bases de prueba por niveles (vacio, chico, mediano, grande)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('accion', choices=('construir', 'restaurar', 'listar'))
+        parser.add_argument('niveles', nargs='*', help="Niveles a construir o el nivel a restaurar")
+        parser.add_argument('--forzar', action='store_true', help="Reconstruir aunque la plantilla exista")
+        parser.add_argument('--procesos', type=int, help="Procesos para generar (por defecto, uno por núcleo)")
+        parser.add_argument('--archivo', help="Restaurar copiando la plantilla a este archivo y no sobre la base de Django")
+
+    def handle(self, *args, **options):
+        niveles = options['niveles']
+        desconocidos = set(niveles) - set(datos_prueba.NIVELES)
+        if desconocidos:
+            raise CommandError(f"Niveles desconocidos: {', '.join(sorted(desconocidos))}")
+
+        if options['accion'] == 'listar':
+            for nivel, archivo in datos_prueba.plantillas():
+                estado = f"{archivo} ({archivo.stat().st_size / 2**20:,.1f} MB)" if archivo else "sin construir"
+                self.stdout.write(f"{nivel:8} {datos_prueba.NIVELES[nivel]:>12,} líneas  {estado}")
+            return
+
+        if options['accion'] == 'construir':
+            for nivel in niveles or datos_prueba.NIVELES:
+                inicio = time.perf_counter()
+                archivo, construida = datos_prueba.construir(nivel, options['forzar'], options['procesos'])
+                if construida:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{nivel}: {archivo} en {time.perf_counter() - inicio:.1f} s"
+                    ))
+                else:
+                    self.stdout.write(f"{nivel}: ya estaba construida ({archivo})")
+            return
+
+        if len(niveles) != 1:
+            raise CommandError("Indica un solo nivel para restaurar")
+        nivel = niveles[0]
+        inicio = time.perf_counter()
+        if options['archivo']:
+            datos_prueba.copiar(nivel, options['archivo'])
+            destino = options['archivo']
+        else:
+            datos_prueba.restaurar(nivel)
+            destino = "la base de Django"
+        self.stdout.write(self.style.SUCCESS(
+            f"{nivel} restaurado en {destino} en {(time.perf_counter() - inicio) * 1000:,.0f} ms"
+        ))
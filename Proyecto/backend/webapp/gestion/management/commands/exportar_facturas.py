@@ -0,0 +1,45 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.webapp.gestion.exportacion import TAMANO_LOTE, Exportacion, ids_facturas
+
+
+class Command(BaseCommand):
+    help = "Exporta a un ZIP los PDF de las facturas de un rango de fechas e informa el rendimiento."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=datetime.date.fromisoformat, required=True, help="Fecha inicial AAAA-MM-DD")
+        parser.add_argument('--hasta', type=datetime.date.fromisoformat, help="Fecha final AAAA-MM-DD (por defecto, --desde)")
+        parser.add_argument('--salida', default='facturas.zip', help="Archivo ZIP a escribir")
+        parser.add_argument('--procesos', type=int, help="Procesos para dibujar (por defecto, uno por núcleo)")
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Facturas por tarea")
+
+    def handle(self, *args, **options):
+        desde = options['desde']
+        hasta = options['hasta'] or desde
+        if hasta < desde:
+            raise CommandError("--hasta no puede ser anterior a --desde")
+
+        ids = ids_facturas(desde, hasta)
+        if not ids:
+            self.stdout.write(f"No hay facturas entre {desde} y {hasta}.")
+            return
+
+        def progreso(hechas, total):
+            self.stderr.write(f"\r{hechas}/{total} facturas", ending='')
+
+        exportacion = Exportacion(ids, options['procesos'], options['lote'], progreso)
+        with open(options['salida'], 'wb') as archivo:
+            for parte in exportacion:
+                archivo.write(parte)
+        self.stderr.write('')
+
+        por_segundo = exportacion.paginas_por_segundo()
+        self.stdout.write(self.style.SUCCESS(
+            f"{exportacion.facturas} facturas ({exportacion.paginas} páginas) en {options['salida']}"
+        ))
+        self.stdout.write(
+            f"{exportacion.segundos:.2f} s con {exportacion.procesos} procesos: "
+            f"{por_segundo:.1f} páginas/s, {por_segundo / exportacion.procesos:.1f} páginas/s por núcleo"
+        )
@@ -0,0 +1,82 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.webapp.gestion import cubo, generador, versiones
+from backend.webapp.gestion.resumen import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Genera ventas sintéticas de un bar (picos nocturnos, fines de semana, productos estrella) a cualquier escala."
+
+    def add_arguments(self, parser):
+        hoy = datetime.date.today()
+        parser.add_argument('--lineas', type=int, default=10_000, help="Líneas de venta aproximadas a generar")
+        parser.add_argument('--desde', type=datetime.date.fromisoformat, default=hoy - datetime.timedelta(days=364),
+                            help="Fecha inicial AAAA-MM-DD (por defecto, hace un año)")
+        parser.add_argument('--hasta', type=datetime.date.fromisoformat, default=hoy,
+                            help="Fecha final AAAA-MM-DD (por defecto, hoy)")
+        parser.add_argument('--empleados', type=int, default=10, help="Empleados mínimos en el catálogo")
+        parser.add_argument('--productos', type=int, default=60, help="Productos mínimos en el catálogo")
+        parser.add_argument('--procesos', type=int, help="Procesos para generar (por defecto, uno por núcleo)")
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--con-triggers', action='store_true',
+                            help="No suspender los triggers del cubo y del registro de cambios (más lento)")
+        parser.add_argument('--restaurar-triggers', action='store_true',
+                            help="Solo recrear los triggers que dejó suspendidos una carga interrumpida")
+
+    def handle(self, *args, **options):
+        if options['restaurar_triggers']:
+            return self.restaurar_triggers()
+        desde, hasta = options['desde'], options['hasta']
+        if hasta < desde:
+            raise CommandError("--hasta no puede ser anterior a --desde")
+        if options['productos'] < 1 or options['empleados'] < 1:
+            raise CommandError("Se necesita al menos un producto y un empleado")
+
+        def progreso(facturas, lineas):
+            self.stderr.write(f"\r{facturas:,} facturas, {lineas:,} líneas", ending='')
+
+        engine = generador.engine_de_django()
+        inicio = time.perf_counter()
+        argumentos = dict(
+            empleados=options['empleados'], productos=options['productos'], procesos=options['procesos'],
+            semilla=options['semilla'], progreso=progreso,
+        )
+        if options['con_triggers']:
+            suspendidos = []
+            facturas, lineas = generador.generar(engine, options['lineas'], desde, hasta, **argumentos)
+        else:
+            with generador.triggers_suspendidos(engine) as suspendidos:
+                facturas, lineas = generador.generar(engine, options['lineas'], desde, hasta, **argumentos)
+        engine.dispose()
+        # La ETag de analytics no ve la carga si no pasó por el registro de cambios
+        versiones.incrementar(versiones.DATOS)
+        self.stderr.write('')
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{facturas:,} facturas y {lineas:,} líneas en {segundos:.1f} s ({lineas / segundos:,.0f} líneas/s)"
+        ))
+
+        # Resumen y cubo se mantienen con triggers, salvo que se hayan suspendido
+        if suspendidos:
+            reconstruir(desde, hasta)
+            cubo.reconstruir(desde, hasta)
+            self.stdout.write(
+                "Resumen y cubo reconstruidos. Los cambios no quedaron en el registro: "
+                "actualiza los snapshots con `python main.py --app snapshot --completo`."
+            )
+
+    def restaurar_triggers(self):
+        engine = generador.engine_de_django()
+        recreados = generador.restaurar_triggers(engine)
+        engine.dispose()
+        if not recreados:
+            self.stdout.write("No había triggers suspendidos.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Triggers recreados: {', '.join(recreados)}."))
+        self.stdout.write(
+            "La carga interrumpida no quedó en el resumen ni en el cubo: "
+            "reconstrúyelos con `manage.py reconstruir_resumen`."
+        )
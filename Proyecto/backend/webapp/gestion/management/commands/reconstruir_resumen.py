@@ -0,0 +1,20 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from backend.webapp.gestion import cubo
+from backend.webapp.gestion.resumen import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el resumen diario de ventas (VentaDiaria) y el cubo de analytics desde las facturas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=datetime.date.fromisoformat, help="Fecha inicial AAAA-MM-DD")
+        parser.add_argument('--hasta', type=datetime.date.fromisoformat, help="Fecha final AAAA-MM-DD")
+
+    def handle(self, *args, **options):
+        dias = reconstruir(options['desde'], options['hasta'])
+        self.stdout.write(self.style.SUCCESS(f"Resumen reconstruido para {dias} días."))
+        celdas = cubo.reconstruir(options['desde'], options['hasta'])
+        self.stdout.write(self.style.SUCCESS(f"Cubo reconstruido: {celdas} celdas por hora."))
@@ -0,0 +1,371 @@
+# metricas.py
+"""
+Métricas en el formato de exposición de Prometheus, servidas en ``/metrics``.
+
+Cada proceso suma sus valores en su propio archivo de ``METRICAS_DIR``
+(``<pid>-<token>.bin``) mapeado en memoria, y la vista lee y suma los
+archivos de todos: con un servidor de varios procesos (preforked) cualquier
+worker responde con el total. Al arrancar, cada proceso pliega los archivos
+de los procesos que ya terminaron en ``acumulado.json`` y los borra, así sus
+contadores siguen en el total sin que el directorio crezca con cada worker
+reciclado.
+
+Solo hay contadores e histogramas, que se suman entre procesos sin
+ambigüedad; la tasa de aciertos de caché sale de dividir contadores en
+Prometheus. Sumar es tomar el lock del proceso y escribir un double en el
+mapa: no hay E/S ni llamadas al sistema en el camino de la venta.
+
+Archivo: 8 bytes con los bytes usados y luego entradas ``[largo u32][clave
+utf-8, rellena hasta múltiplo de 8][valor f64]``. Los bytes usados se
+escriben después de la entrada, así que un lector nunca ve una a medias.
+"""
+import bisect
+import json
+import math
+import mmap
+import os
+import secrets
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+CABECERA = struct.Struct('Q')
+LARGO = struct.Struct('I')
+VALOR = struct.Struct('d')
+TAMANO_INICIAL = 1 << 16
+ACUMULADO = 'acumulado.json'
+
+# Segundos; los mismos que usa por defecto el cliente oficial de Prometheus
+LIMITES = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+METODOS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+
+def _alineado(n):
+    return (n + 7) // 8 * 8
+
+
+def _entradas(datos, usados):
+    """``(clave, posición del valor)`` de cada entrada de ``datos`` hasta ``usados``."""
+    posicion = CABECERA.size
+    while posicion < usados:
+        largo = LARGO.unpack_from(datos, posicion)[0]
+        clave = bytes(datos[posicion + LARGO.size:posicion + LARGO.size + largo]).decode()
+        valor = posicion + _alineado(LARGO.size + largo)
+        yield clave, valor
+        posicion = valor + VALOR.size
+
+
+class Almacen:
+    """Valores de este proceso en un archivo mapeado en memoria."""
+
+    def __init__(self, ruta):
+        self.lock = threading.Lock()
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.archivo = open(ruta, 'a+b')
+        tamano = max(os.fstat(self.archivo.fileno()).st_size, TAMANO_INICIAL)
+        self.archivo.truncate(tamano)
+        self.mapa = mmap.mmap(self.archivo.fileno(), tamano)
+        self.usados = CABECERA.unpack_from(self.mapa, 0)[0] or CABECERA.size
+        self.posiciones = dict(_entradas(self.mapa, self.usados))
+
+    def sumar(self, clave, valor):
+        with self.lock:
+            posicion = self.posiciones.get(clave)
+            if posicion is None:
+                posicion = self._agregar(clave)
+            VALOR.pack_into(self.mapa, posicion, VALOR.unpack_from(self.mapa, posicion)[0] + valor)
+
+    def _agregar(self, clave):
+        datos = clave.encode()
+        posicion = self.usados + _alineado(LARGO.size + len(datos))
+        fin = posicion + VALOR.size
+        if fin > len(self.mapa):
+            tamano = max(2 * len(self.mapa), _alineado(fin))
+            self.archivo.truncate(tamano)
+            self.mapa.close()
+            self.mapa = mmap.mmap(self.archivo.fileno(), tamano)
+        LARGO.pack_into(self.mapa, self.usados, len(datos))
+        self.mapa[self.usados + LARGO.size:self.usados + LARGO.size + len(datos)] = datos
+        VALOR.pack_into(self.mapa, posicion, 0.0)
+        self.usados = fin
+        CABECERA.pack_into(self.mapa, 0, fin)
+        self.posiciones[clave] = posicion
+        return posicion
+
+
+_almacenes = {}
+_creando = threading.Lock()
+
+
+def almacen():
+    """El almacén de este proceso; un hijo de ``fork`` abre el suyo."""
+    clave = (os.getpid(), str(settings.METRICAS_DIR))
+    actual = _almacenes.get(clave)
+    if actual is None:
+        with _creando:
+            actual = _almacenes.get(clave)
+            if actual is None:
+                plegar(clave[1])
+                # El token evita sumar sobre el archivo de un pid reutilizado
+                nombre = f"{clave[0]}-{secrets.token_hex(4)}.bin"
+                actual = _almacenes[clave] = Almacen(Path(clave[1]) / nombre)
+    return actual
+
+
+def _valores(ruta):
+    datos = ruta.read_bytes()
+    if len(datos) < CABECERA.size:
+        return
+    usados = CABECERA.unpack_from(datos, 0)[0]
+    for clave, posicion in _entradas(datos, usados):
+        yield clave, VALOR.unpack_from(datos, posicion)[0]
+
+
+def _acumulado(directorio):
+    """Totales plegados y los archivos que ya están en ellos (y no se deben volver a sumar)."""
+    try:
+        datos = json.loads((directorio / ACUMULADO).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return {}, set()
+    return datos['valores'], set(datos['plegados'])
+
+
+def leer(directorio):
+    """Suma por clave de los archivos de todos los procesos y de los ya plegados."""
+    directorio = Path(directorio)
+    while True:
+        archivos = sorted(directorio.glob('*.bin'))
+        valores, plegados = _acumulado(directorio)
+        totales = dict(valores)
+        try:
+            for ruta in archivos:
+                if ruta.name not in plegados:
+                    for clave, valor in _valores(ruta):
+                        totales[clave] = totales.get(clave, 0.0) + valor
+        except FileNotFoundError:
+            # Se plegó después de leer el acumulado: el nuevo ya lo tiene
+            continue
+        return totales
+
+
+def _vivo(nombre):
+    try:
+        pid = int(nombre.split('-', 1)[0].removesuffix('.bin'))
+    except ValueError:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def plegar(directorio):
+    """
+    Suma en ``acumulado.json`` los archivos de los procesos que ya terminaron
+    y los borra; devuelve cuántos plegó.
+
+    El acumulado nuevo reemplaza al viejo de una vez y lista los archivos que
+    contiene: un lector que todavía los ve no los cuenta dos veces. Solo en
+    POSIX, donde están los servidores preforked y ``os.kill(pid, 0)`` no mata.
+    """
+    if os.name != 'posix':
+        return 0
+    import fcntl
+
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    with open(directorio / 'acumulado.lock', 'a') as cerrojo:
+        fcntl.flock(cerrojo, fcntl.LOCK_EX)
+        valores, plegados = _acumulado(directorio)
+        archivos = {ruta.name: ruta for ruta in directorio.glob('*.bin')}
+        # Plegados que no se llegaron a borrar: ya están en los valores
+        sobrantes = [archivos.pop(nombre) for nombre in plegados if nombre in archivos]
+        muertos = [ruta for nombre, ruta in archivos.items() if not _vivo(nombre)]
+        if muertos:
+            for ruta in muertos:
+                for clave, valor in _valores(ruta):
+                    valores[clave] = valores.get(clave, 0.0) + valor
+            datos = {'valores': valores, 'plegados': sorted(ruta.name for ruta in sobrantes + muertos)}
+            temporal = directorio / f"{ACUMULADO}.tmp"
+            temporal.write_text(json.dumps(datos), encoding='utf-8')
+            os.replace(temporal, directorio / ACUMULADO)
+        for ruta in sobrantes + muertos:
+            ruta.unlink()
+    return len(muertos)
+
+
+# --- Familias ------------------------------------------------------------------
+
+FAMILIAS = {}
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _etiquetas(pares):
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in pares]
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _numero(valor):
+    if math.isinf(valor):
+        return '+Inf'
+    return repr(int(valor)) if valor == int(valor) else repr(valor)
+
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._series = {}
+        FAMILIAS[nombre] = self
+
+    def _serie(self, sufijo, valores):
+        clave = (sufijo, valores)
+        serie = self._series.get(clave)
+        if serie is None:
+            serie = self._series[clave] = f"{self.nombre}{sufijo}{_etiquetas(zip(self.etiquetas, valores))}"
+        return serie
+
+    def _valores(self, etiquetas):
+        return tuple(etiquetas[nombre] for nombre in self.etiquetas)
+
+    def inc(self, valor=1, **etiquetas):
+        almacen().sumar(self._serie('', self._valores(etiquetas)), valor)
+
+    def lineas(self, totales):
+        for clave in sorted(totales):
+            if clave == self.nombre or clave.startswith(self.nombre + '{'):
+                yield f"{clave} {_numero(totales[clave])}"
+
+
+class Histograma(Contador):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(limites)
+
+    def observar(self, valor, **etiquetas):
+        # Cada cubeta guarda solo lo suyo; se acumulan al exponer
+        valores = self._valores(etiquetas)
+        indice = bisect.bisect_left(self.limites, valor)
+        limite = self.limites[indice] if indice < len(self.limites) else math.inf
+        destino = almacen()
+        destino.sumar(self._serie('_bucket', valores) + f"\t{_numero(limite)}", 1)
+        destino.sumar(self._serie('_sum', valores), valor)
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def lineas(self, totales):
+        prefijo = self.nombre + '_bucket'
+        cubetas = {}
+        for clave, valor in totales.items():
+            base, separador, limite = clave.partition('\t')
+            if separador and (base == prefijo or base.startswith(prefijo + '{')):
+                cubetas.setdefault(base[len(prefijo):], {})[float(limite)] = valor
+        for etiquetas in sorted(cubetas):
+            acumulado = 0.0
+            for limite in (*self.limites, math.inf):
+                acumulado += cubetas[etiquetas].get(limite, 0.0)
+                con_le = f'le="{_numero(limite)}"'
+                con_le = etiquetas[:-1] + ',' + con_le + '}' if etiquetas else '{' + con_le + '}'
+                yield f"{prefijo}{con_le} {_numero(acumulado)}"
+            suma = totales.get(f"{self.nombre}_sum{etiquetas}", 0.0)
+            yield f"{self.nombre}_sum{etiquetas} {_numero(suma)}"
+            yield f"{self.nombre}_count{etiquetas} {_numero(acumulado)}"
+
+
+def exposicion(directorio=None):
+    """Texto de todas las familias con los totales de todos los procesos."""
+    totales = leer(directorio or settings.METRICAS_DIR)
+    lineas = []
+    for nombre, familia in FAMILIAS.items():
+        lineas.append(f"# HELP {nombre} {familia.ayuda}")
+        lineas.append(f"# TYPE {nombre} {familia.tipo}")
+        lineas.extend(familia.lineas(totales))
+    return '\n'.join(lineas) + '\n'
+
+
+PETICIONES = Histograma('bar_http_peticion_segundos', "Latencia de las peticiones por vista.", ('vista', 'metodo'))
+TIEMPO_DB = Histograma('bar_http_db_segundos', "Tiempo en la base de datos por petición.", ('vista',))
+CACHE = Contador('bar_cache_lecturas_total', "Lecturas de caché por resultado (acierto o fallo).", ('cache', 'resultado'))
+PDF = Histograma('bar_pdf_dibujo_segundos', "Tiempo de dibujo del PDF de una factura.")
+FACTURAS_CREADAS = Contador('bar_facturas_creadas_total', "Facturas registradas.")
+FACTURAS_ANULADAS = Contador('bar_facturas_anuladas_total', "Facturas anuladas.")
+UNIDADES_VENDIDAS = Contador('bar_unidades_vendidas_total', "Unidades de producto en las facturas registradas.")
+
+
+def lectura_cache(cache, acierto):
+    if settings.METRICAS:
+        CACHE.inc(cache=cache, resultado='acierto' if acierto else 'fallo')
+
+
+def venta_registrada(unidades):
+    if settings.METRICAS:
+        FACTURAS_CREADAS.inc()
+        UNIDADES_VENDIDAS.inc(unidades)
+
+
+def factura_anulada():
+    if settings.METRICAS:
+        FACTURAS_ANULADAS.inc()
+
+
+@contextmanager
+def dibujo_pdf():
+    if not settings.METRICAS:
+        yield
+        return
+    with PDF.medir():
+        yield
+
+
+class MetricasMiddleware:
+    """Latencia y tiempo en la base de cada petición, por nombre de URL."""
+
+    def __init__(self, get_response):
+        if not settings.METRICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        en_db = [0.0]
+
+        def medir_db(execute, sql, params, many, context):
+            inicio = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                en_db[0] += time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(medir_db):
+            response = self.get_response(request)
+        duracion = time.perf_counter() - inicio
+
+        coincidencia = request.resolver_match
+        vista = (coincidencia and coincidencia.url_name) or 'sin_ruta'
+        metodo = request.method if request.method in METODOS else 'otro'
+        PETICIONES.observar(duracion, vista=vista, metodo=metodo)
+        TIEMPO_DB.observar(en_db[0], vista=vista)
+        return response
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0003_factura_anulado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaFactura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('ultimo', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0004_secuenciafactura'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('cantidad_facturas', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('propina', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('impuesto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VentaDiariaDesglose',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('cantidad_facturas', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('propina', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('impuesto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='gestion.empleado')),
+                ('tipo_pago', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='gestion.tipopago')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'tipo_pago', 'empleado'), name='venta_diaria_desglose_unica')],
+            },
+        ),
+    ]
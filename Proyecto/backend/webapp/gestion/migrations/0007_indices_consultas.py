@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0006_indices_paneles'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='detallefactura',
+            index=models.Index(fields=['factura', 'producto', 'cantidad', 'precio_unitario'], name='detallefactura_cubriente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(condition=models.Q(('anulado', False)), fields=['fecha_emision'], name='factura_fecha_activa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['stock'], name='producto_stock_idx'),
+        ),
+    ]
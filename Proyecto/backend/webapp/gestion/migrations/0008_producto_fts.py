@@ -0,0 +1,53 @@
+from django.db import migrations
+
+# Índice de texto completo sobre Producto.nombre. Es una tabla de contenido
+# externo: guarda solo el índice y los triggers la mantienen al día con
+# gestion_producto, también para inserciones hechas fuera del ORM (scripts de
+# carga). remove_diacritics pliega tildes y eñes ("Piña" == "pina"); prefix
+# precalcula prefijos cortos para las búsquedas mientras se escribe.
+CREAR = [
+    """
+    CREATE VIRTUAL TABLE gestion_producto_fts USING fts5(
+        nombre,
+        content='gestion_producto',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='1 2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER gestion_producto_fts_ai AFTER INSERT ON gestion_producto BEGIN
+        INSERT INTO gestion_producto_fts(rowid, nombre) VALUES (new.id, new.nombre);
+    END
+    """,
+    """
+    CREATE TRIGGER gestion_producto_fts_ad AFTER DELETE ON gestion_producto BEGIN
+        INSERT INTO gestion_producto_fts(gestion_producto_fts, rowid, nombre) VALUES ('delete', old.id, old.nombre);
+    END
+    """,
+    """
+    CREATE TRIGGER gestion_producto_fts_au AFTER UPDATE OF nombre ON gestion_producto BEGIN
+        INSERT INTO gestion_producto_fts(gestion_producto_fts, rowid, nombre) VALUES ('delete', old.id, old.nombre);
+        INSERT INTO gestion_producto_fts(rowid, nombre) VALUES (new.id, new.nombre);
+    END
+    """,
+    "INSERT INTO gestion_producto_fts(gestion_producto_fts) VALUES ('rebuild')",
+]
+
+BORRAR = [
+    "DROP TRIGGER IF EXISTS gestion_producto_fts_au",
+    "DROP TRIGGER IF EXISTS gestion_producto_fts_ad",
+    "DROP TRIGGER IF EXISTS gestion_producto_fts_ai",
+    "DROP TABLE IF EXISTS gestion_producto_fts",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0007_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREAR, reverse_sql=BORRAR),
+    ]
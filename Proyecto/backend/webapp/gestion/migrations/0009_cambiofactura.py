@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:48
+
+from django.db import migrations, models
+
+# Cada escritura sobre una factura o sus líneas deja el id de la factura en
+# gestion_cambiofactura. Triggers y no señales: así también quedan registradas
+# las cargas hechas con SQL directo (bulk_create, scripts de datapp).
+TABLAS = {
+    'gestion_factura': ('new.id', 'old.id'),
+    'gestion_detallefactura': ('new.factura_id', 'old.factura_id'),
+}
+EVENTOS = {'insert': 'new', 'update': 'new', 'delete': 'old'}
+
+CREAR = [
+    f"""
+    CREATE TRIGGER {tabla}_cambio_{evento} AFTER {evento.upper()} ON {tabla} BEGIN
+        INSERT INTO gestion_cambiofactura(factura_id) VALUES ({nuevo if fila == 'new' else viejo});
+    END
+    """
+    for tabla, (nuevo, viejo) in TABLAS.items()
+    for evento, fila in EVENTOS.items()
+]
+BORRAR = [
+    f"DROP TRIGGER IF EXISTS {tabla}_cambio_{evento}"
+    for tabla in TABLAS
+    for evento in EVENTOS
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0008_producto_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioFactura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('factura_id', models.CharField(max_length=10)),
+            ],
+        ),
+        migrations.RunSQL(CREAR, reverse_sql=BORRAR),
+    ]
@@ -0,0 +1,161 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# El cubo se mantiene con triggers, igual que gestion_cambiofactura: así
+# también lo actualizan los scripts de carga y el admin. Cada nivel es una
+# tabla con sus columnas de clave y cómo se calculan desde una factura.
+NIVELES = {
+    'gestion_cubohora': (('fecha', 'hora'), ('{f}.fecha_emision', 'CAST(substr({f}.hora_emision, 1, 2) AS INTEGER)')),
+    'gestion_cubodia': (('fecha',), ('{f}.fecha_emision',)),
+    'gestion_cubomes': (('mes',), ("substr({f}.fecha_emision, 1, 7) || '-01'",)),
+}
+
+
+def sumar(tabla, f, d, origen, condicion, signo=''):
+    """
+    Suma (o resta, con ``signo='-'``) a ``tabla`` las líneas ``d`` de la
+    factura ``f`` que cumplen ``condicion``. Luego borra las celdas vacías.
+    """
+    claves, expresiones = NIVELES[tabla]
+    columnas = ', '.join(claves)
+    valores = ', '.join(e.format(f=f) for e in expresiones)
+    seleccion = f"SELECT {valores}, {f}.empleado_id, {d}.producto_id"
+    sentencias = [
+        f"""
+        INSERT INTO {tabla} ({columnas}, empleado_id, producto_id, lineas, cantidad, total)
+        {seleccion}, {signo}COUNT(*), {signo}SUM({d}.cantidad), {signo}SUM({d}.cantidad * {d}.precio_unitario)
+        FROM {origen} WHERE {condicion}
+        GROUP BY {valores}, {f}.empleado_id, {d}.producto_id
+        ON CONFLICT ({columnas}, empleado_id, producto_id) DO UPDATE SET
+            lineas = lineas + excluded.lineas,
+            cantidad = cantidad + excluded.cantidad,
+            total = ROUND(total + excluded.total, 2);
+        """
+    ]
+    if signo:
+        sentencias.append(f"""
+        DELETE FROM {tabla} WHERE lineas <= 0
+          AND ({columnas}, empleado_id, producto_id) IN ({seleccion} FROM {origen} WHERE {condicion});
+        """)
+    return sentencias
+
+
+def linea(fila, signo=''):
+    """Una línea (``NEW`` u ``OLD``) entra o sale de su factura, si no está anulada."""
+    condicion = f"f.id = {fila}.factura_id AND NOT f.anulado"
+    return [s for tabla in NIVELES for s in sumar(tabla, 'f', fila, 'gestion_factura f', condicion, signo)]
+
+
+def factura(fila, signo=''):
+    """Todas las líneas de una factura (con sus valores ``NEW`` u ``OLD``) entran o salen."""
+    condicion = f"d.factura_id = {fila}.id AND NOT {fila}.anulado"
+    return [s for tabla in NIVELES for s in sumar(tabla, fila, 'd', 'gestion_detallefactura d', condicion, signo)]
+
+
+TRIGGERS = {
+    'gestion_detallefactura_cubo_insert': (
+        "AFTER INSERT ON gestion_detallefactura", linea('NEW'),
+    ),
+    'gestion_detallefactura_cubo_delete': (
+        "AFTER DELETE ON gestion_detallefactura", linea('OLD', '-'),
+    ),
+    'gestion_detallefactura_cubo_update': (
+        """AFTER UPDATE ON gestion_detallefactura
+        WHEN OLD.factura_id IS NOT NEW.factura_id OR OLD.producto_id IS NOT NEW.producto_id
+          OR OLD.cantidad IS NOT NEW.cantidad OR OLD.precio_unitario IS NOT NEW.precio_unitario""",
+        linea('OLD', '-') + linea('NEW'),
+    ),
+    # Factura.save() escribe todas las columnas: solo cuenta lo que cambió de verdad
+    'gestion_factura_cubo_update': (
+        """AFTER UPDATE ON gestion_factura
+        WHEN OLD.anulado IS NOT NEW.anulado OR OLD.fecha_emision IS NOT NEW.fecha_emision
+          OR OLD.empleado_id IS NOT NEW.empleado_id
+          OR substr(OLD.hora_emision, 1, 2) IS NOT substr(NEW.hora_emision, 1, 2)""",
+        factura('OLD', '-') + factura('NEW'),
+    ),
+}
+
+CREAR = [
+    f"CREATE TRIGGER {nombre} {evento} BEGIN {''.join(sentencias)} END"
+    for nombre, (evento, sentencias) in TRIGGERS.items()
+]
+BORRAR = [f"DROP TRIGGER IF EXISTS {nombre}" for nombre in TRIGGERS]
+
+# Carga inicial con las facturas que ya existen
+LLENAR = [
+    s for tabla in NIVELES
+    for s in sumar(tabla, 'f', 'd', 'gestion_factura f JOIN gestion_detallefactura d ON d.factura_id = f.id', 'NOT f.anulado')
+]
+
+# Tablas WITHOUT ROWID: las celdas quedan guardadas en el orden de la clave
+# (fecha primero), así un rango de fechas se lee contiguo y sin un índice aparte.
+TABLAS = [
+    """CREATE TABLE "gestion_cubodia" ("lineas" integer NOT NULL, "cantidad" integer NOT NULL, "total" decimal NOT NULL, "fecha" date NOT NULL, "empleado_id" varchar(20) NOT NULL REFERENCES "gestion_empleado" ("id") DEFERRABLE INITIALLY DEFERRED, "producto_id" bigint NOT NULL REFERENCES "gestion_producto" ("id") DEFERRABLE INITIALLY DEFERRED, PRIMARY KEY ("fecha", "empleado_id", "producto_id")) WITHOUT ROWID""",
+    """CREATE TABLE "gestion_cubohora" ("lineas" integer NOT NULL, "cantidad" integer NOT NULL, "total" decimal NOT NULL, "fecha" date NOT NULL, "hora" smallint unsigned NOT NULL CHECK ("hora" >= 0), "empleado_id" varchar(20) NOT NULL REFERENCES "gestion_empleado" ("id") DEFERRABLE INITIALLY DEFERRED, "producto_id" bigint NOT NULL REFERENCES "gestion_producto" ("id") DEFERRABLE INITIALLY DEFERRED, PRIMARY KEY ("fecha", "hora", "empleado_id", "producto_id")) WITHOUT ROWID""",
+    """CREATE TABLE "gestion_cubomes" ("lineas" integer NOT NULL, "cantidad" integer NOT NULL, "total" decimal NOT NULL, "mes" date NOT NULL, "empleado_id" varchar(20) NOT NULL REFERENCES "gestion_empleado" ("id") DEFERRABLE INITIALLY DEFERRED, "producto_id" bigint NOT NULL REFERENCES "gestion_producto" ("id") DEFERRABLE INITIALLY DEFERRED, PRIMARY KEY ("mes", "empleado_id", "producto_id")) WITHOUT ROWID""",
+]
+BORRAR_TABLAS = ['DROP TABLE "gestion_cubodia"', 'DROP TABLE "gestion_cubohora"', 'DROP TABLE "gestion_cubomes"']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0009_cambiofactura'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunSQL(TABLAS, reverse_sql=BORRAR_TABLAS)],
+            state_operations=[
+                migrations.CreateModel(
+                    name='CuboDia',
+                    fields=[
+                        ('lineas', models.IntegerField(default=0)),
+                        ('cantidad', models.IntegerField(default=0)),
+                        ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                        ('pk', models.CompositePrimaryKey('fecha', 'empleado', 'producto', blank=True, editable=False, primary_key=True, serialize=False)),
+                        ('fecha', models.DateField()),
+                        ('empleado', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='gestion.empleado')),
+                        ('producto', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='gestion.producto')),
+                    ],
+                    options={
+                        'abstract': False,
+                    },
+                ),
+                migrations.CreateModel(
+                    name='CuboHora',
+                    fields=[
+                        ('lineas', models.IntegerField(default=0)),
+                        ('cantidad', models.IntegerField(default=0)),
+                        ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                        ('pk', models.CompositePrimaryKey('fecha', 'hora', 'empleado', 'producto', blank=True, editable=False, primary_key=True, serialize=False)),
+                        ('fecha', models.DateField()),
+                        ('hora', models.PositiveSmallIntegerField()),
+                        ('empleado', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='gestion.empleado')),
+                        ('producto', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='gestion.producto')),
+                    ],
+                    options={
+                        'abstract': False,
+                    },
+                ),
+                migrations.CreateModel(
+                    name='CuboMes',
+                    fields=[
+                        ('lineas', models.IntegerField(default=0)),
+                        ('cantidad', models.IntegerField(default=0)),
+                        ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                        ('pk', models.CompositePrimaryKey('mes', 'empleado', 'producto', blank=True, editable=False, primary_key=True, serialize=False)),
+                        ('mes', models.DateField()),
+                        ('empleado', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='gestion.empleado')),
+                        ('producto', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='gestion.producto')),
+                    ],
+                    options={
+                        'abstract': False,
+                    },
+                ),
+            ],
+        ),
+        migrations.RunSQL(CREAR + LLENAR, reverse_sql=BORRAR),
+    ]
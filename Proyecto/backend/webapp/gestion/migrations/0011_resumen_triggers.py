@@ -0,0 +1,86 @@
+from django.db import migrations
+
+# El resumen diario pasa a mantenerse con triggers, como el cubo (0010) y el
+# registro de cambios (0009): así también lo actualizan el admin, los
+# borrados y las cargas con SQL directo, no solo las vistas de ventas.
+RESUMENES = {
+    'gestion_ventadiaria': ('fecha',),
+    'gestion_ventadiariadesglose': ('fecha', 'tipo_pago_id', 'empleado_id'),
+}
+COLUMNAS = {'fecha': 'fecha_emision', 'tipo_pago_id': 'tipo_pago_id', 'empleado_id': 'empleado_id'}
+
+
+def sumar(fila, signo=''):
+    """
+    Suma (o resta, con ``signo='-'``) la factura ``fila`` a su día si no está
+    anulada. Al restar borra las filas que quedan sin facturas, como
+    ``resumen.reconstruir``, que solo crea los días con ventas.
+    """
+    sentencias = []
+    for tabla, claves in RESUMENES.items():
+        columnas = ', '.join(claves)
+        valores = ', '.join(f"{fila}.{COLUMNAS[clave]}" for clave in claves)
+        sentencias.append(f"""
+        INSERT INTO {tabla} ({columnas}, cantidad_facturas, total, propina, impuesto)
+        SELECT {valores}, {signo}1, {signo}{fila}.total, {signo}{fila}.propina,
+               {signo}({fila}.total - {fila}.base_gravable - {fila}.propina)
+        WHERE NOT {fila}.anulado
+        ON CONFLICT ({columnas}) DO UPDATE SET
+            cantidad_facturas = cantidad_facturas + excluded.cantidad_facturas,
+            total = ROUND(total + excluded.total, 2),
+            propina = ROUND(propina + excluded.propina, 2),
+            impuesto = ROUND(impuesto + excluded.impuesto, 2);
+        """)
+        if signo:
+            sentencias.append(f"""
+            DELETE FROM {tabla} WHERE cantidad_facturas <= 0 AND ({columnas}) = ({valores});
+            """)
+    return sentencias
+
+
+TRIGGERS = {
+    'gestion_factura_resumen_insert': ("AFTER INSERT ON gestion_factura", sumar('NEW')),
+    'gestion_factura_resumen_delete': ("AFTER DELETE ON gestion_factura", sumar('OLD', '-')),
+    # Factura.save() escribe todas las columnas: solo cuenta lo que cambió de verdad
+    'gestion_factura_resumen_update': (
+        """AFTER UPDATE ON gestion_factura
+        WHEN OLD.anulado IS NOT NEW.anulado OR OLD.fecha_emision IS NOT NEW.fecha_emision
+          OR OLD.tipo_pago_id IS NOT NEW.tipo_pago_id OR OLD.empleado_id IS NOT NEW.empleado_id
+          OR OLD.total IS NOT NEW.total OR OLD.propina IS NOT NEW.propina
+          OR OLD.base_gravable IS NOT NEW.base_gravable""",
+        sumar('OLD', '-') + sumar('NEW'),
+    ),
+}
+
+CREAR = [
+    f"CREATE TRIGGER {nombre} {evento} BEGIN {''.join(sentencias)} END"
+    for nombre, (evento, sentencias) in TRIGGERS.items()
+]
+BORRAR = [f"DROP TRIGGER IF EXISTS {nombre}" for nombre in TRIGGERS]
+
+
+# Lo que el resumen haya perdido antes de los triggers (ediciones en el admin, cargas)
+RECONSTRUIR = [
+    s for tabla, claves in RESUMENES.items()
+    for s in (
+        f"DELETE FROM {tabla}",
+        f"""
+        INSERT INTO {tabla} ({', '.join(claves)}, cantidad_facturas, total, propina, impuesto)
+        SELECT {', '.join(COLUMNAS[clave] for clave in claves)}, COUNT(*), ROUND(SUM(total), 2), ROUND(SUM(propina), 2),
+               ROUND(SUM(total - base_gravable - propina), 2)
+        FROM gestion_factura WHERE NOT anulado
+        GROUP BY {', '.join(COLUMNAS[clave] for clave in claves)}
+        """,
+    )
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0010_cubo_ventas'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREAR + RECONSTRUIR, reverse_sql=BORRAR),
+    ]
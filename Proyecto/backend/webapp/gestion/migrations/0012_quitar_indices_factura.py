@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:54
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0011_resumen_triggers'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='factura',
+            name='factura_anulado_fecha_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='factura',
+            name='factura_fecha_activa_idx',
+        ),
+    ]
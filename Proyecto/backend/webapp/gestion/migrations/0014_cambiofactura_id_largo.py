@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:10
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# SQLite rehace la tabla para cambiar la columna y los triggers de 0009 que
+# escriben en ella fallarían: se quitan antes y se vuelven a crear después.
+registro = import_module('backend.webapp.gestion.migrations.0009_cambiofactura')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0013_version'),
+    ]
+
+    operations = [
+        migrations.RunSQL(registro.BORRAR, reverse_sql=registro.CREAR),
+        migrations.AlterField(
+            model_name='cambiofactura',
+            name='factura_id',
+            field=models.CharField(max_length=20),
+        ),
+        migrations.RunSQL(registro.CREAR, reverse_sql=registro.BORRAR),
+    ]
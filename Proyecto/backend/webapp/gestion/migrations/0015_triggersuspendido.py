@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0014_cambiofactura_id_largo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TriggerSuspendido',
+            fields=[
+                ('nombre', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('sql', models.TextField()),
+            ],
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.contrib.auth.models import User
 import datetime
 
@@ -16,6 +17,12 @@ class Producto(models.Model):
     cantidad_medida = models.IntegerField()
     unidad_medida = models.CharField(max_length=45)
 
+    class Meta:
+        indexes = [
+            # Alerta de stock bajo de panel_admin (stock__lt=10)
+            models.Index(fields=['stock'], name='producto_stock_idx'),
+        ]
+
     def __str__(self):
         return self.nombre
 
@@ -50,6 +57,12 @@ class Compra(models.Model):
     proveedor = models.ForeignKey(Proveedor, null=True, blank=True, on_delete=models.PROTECT, related_name='compras')
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
+    class Meta:
+        indexes = [
+            # Orden y cursor de compras_panel
+            models.Index(fields=['fecha', 'id'], name='compra_fecha_id_idx'),
+        ]
+
     def __str__(self):
         return f"Compra #{self.pk} - {self.fecha.date()}"
 
@@ -74,6 +87,47 @@ class TipoPago(models.Model):
     def __str__(self):
         return self.nombre
 
+class SecuenciaFacturaManager(models.Manager):
+    def reservar(self, fecha, cantidad=1):
+        """
+        Reserva ``cantidad`` consecutivos del día ``fecha`` y devuelve el primero.
+
+        El incremento es un UPDATE sobre una sola fila, por lo que dos cajas
+        que facturan a la vez nunca reciben el mismo número.
+        """
+        with transaction.atomic(using=self.db):
+            secuencia = self.filter(fecha=fecha)
+            if not secuencia.update(ultimo=F('ultimo') + cantidad):
+                self._crear(fecha)
+                secuencia.update(ultimo=F('ultimo') + cantidad)
+            ultimo = secuencia.values_list('ultimo', flat=True).get()
+        return ultimo - cantidad + 1
+
+    def _crear(self, fecha):
+        # Arranca desde las facturas que ya existan ese día (datos anteriores
+        # a la secuencia). Es un rango sobre la PK y solo ocurre una vez por día.
+        fecha_str = fecha.strftime("%y%m%d")
+        ids = Factura.objects.filter(id__gt=fecha_str, id__lt=f"{fecha_str}:").values_list('id', flat=True)
+        inicial = max((int(i[len(fecha_str):]) for i in ids if i[len(fecha_str):].isdigit()), default=0)
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(fecha=fecha, ultimo=inicial)
+        except IntegrityError:
+            pass  # Otra caja creó la fila primero
+
+class SecuenciaFactura(models.Model):
+    fecha = models.DateField(unique=True)
+    ultimo = models.PositiveIntegerField(default=0)
+
+    objects = SecuenciaFacturaManager()
+
+    def __str__(self):
+        return f"Secuencia {self.fecha}: {self.ultimo}"
+
+def formatear_id_factura(fecha, numero):
+    """Construye el ID de factura: fecha ``yymmdd`` + consecutivo de 4 dígitos."""
+    return f"{fecha.strftime('%y%m%d')}{numero:04d}"
+
 class Factura(models.Model):
     id = models.CharField(primary_key=True, max_length=20, editable=False)  # Nuevo ID personalizado
     configuracion = models.ForeignKey('ConfiguracionFactura', on_delete=models.PROTECT, default=1)
@@ -90,6 +144,14 @@ class Factura(models.Model):
     propina = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     anulado = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Orden y cursor de ventas_panel, y sus filtros combinados con la fecha
+            models.Index(fields=['fecha_emision', 'id'], name='factura_fecha_id_idx'),
+            models.Index(fields=['empleado', 'fecha_emision'], name='factura_empleado_fecha_idx'),
+            models.Index(fields=['cliente', 'fecha_emision'], name='factura_cliente_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"Factura #{self.id}"
     def __str__(self):
@@ -98,16 +160,133 @@ class Factura(models.Model):
     def save(self, *args, **kwargs):
         if not self.id:
             hoy = datetime.date.today()
-            fecha_str = hoy.strftime("%y%m%d")  # Ej: 250407
-            cantidad = Factura.objects.filter(fecha_emision=hoy).count() + 1
-            self.id = f"{fecha_str}{cantidad:04d}"
+            self.id = formatear_id_factura(hoy, SecuenciaFactura.objects.reservar(hoy))  # Ej: 2504070001
         super().save(*args, **kwargs)
 
+class VentaDiaria(models.Model):
+    """Totales de facturas no anuladas por día, mantenidos por triggers (migración 0011)."""
+    fecha = models.DateField(unique=True)
+    cantidad_facturas = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    propina = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    impuesto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"Ventas {self.fecha}: {self.total}"
+
+class VentaDiariaDesglose(models.Model):
+    """Los mismos totales de ``VentaDiaria`` separados por tipo de pago y empleado."""
+    fecha = models.DateField()
+    tipo_pago = models.ForeignKey('TipoPago', on_delete=models.PROTECT)
+    empleado = models.ForeignKey('Empleado', on_delete=models.PROTECT)
+    cantidad_facturas = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    propina = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    impuesto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'tipo_pago', 'empleado'], name='venta_diaria_desglose_unica'),
+        ]
+
+    def __str__(self):
+        return f"Ventas {self.fecha} - {self.empleado_id} - {self.tipo_pago_id}: {self.total}"
+
+class CambioFactura(models.Model):
+    """
+    Facturas tocadas (creadas, editadas, anuladas o borradas), en orden.
+
+    Lo llenan triggers de SQLite sobre factura y detalle (migración 0009), así
+    que también registra lo que hacen los scripts de carga. Lo consume el ETL
+    de snapshots de analytics (``backend/datapp/snapshot.py``).
+    """
+    # Sin FK: el registro debe sobrevivir al borrado de la factura
+    factura_id = models.CharField(max_length=20)
+
+    def __str__(self):
+        return f"Cambio {self.pk}: {self.factura_id}"
+
+class Version(models.Model):
+    """
+    Contadores que se incrementan cuando cambia algo que otros procesos
+    tienen en caché (ver ``versiones.py``). Viven en la base para que todos
+    los workers vean el mismo valor.
+    """
+    clave = models.CharField(max_length=50, primary_key=True)
+    valor = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.clave}: {self.valor}"
+
+class TriggerSuspendido(models.Model):
+    """
+    Copia del SQL de los triggers que ``generador.triggers_suspendidos`` quitó.
+
+    Se guarda en la misma transacción que los borra: si la carga muere antes
+    de volver a crearlos, la siguiente corrida o ``generar_datos
+    --restaurar-triggers`` los recrea desde aquí.
+    """
+    nombre = models.CharField(max_length=100, primary_key=True)
+    sql = models.TextField()
+
+    def __str__(self):
+        return self.nombre
+
+class CeldaCubo(models.Model):
+    """
+    Ventas activas (no anuladas) de un empleado y un producto dentro de una
+    celda del cubo de analytics. Las mantienen triggers (migración 0010), como
+    ``CambioFactura``; ``cubo.reconstruir`` las recalcula desde las facturas.
+    """
+    # Sin índice propio: todas las consultas entran por la fecha
+    empleado = models.ForeignKey('Empleado', on_delete=models.PROTECT, related_name='+', db_index=False)
+    producto = models.ForeignKey('Producto', on_delete=models.PROTECT, related_name='+', db_index=False)
+    lineas = models.IntegerField(default=0)
+    cantidad = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+class CuboHora(CeldaCubo):
+    """Grano del cubo: una celda por fecha, hora de emisión, empleado y producto."""
+    pk = models.CompositePrimaryKey('fecha', 'hora', 'empleado', 'producto')
+    fecha = models.DateField()
+    hora = models.PositiveSmallIntegerField()
+
+    def __str__(self):
+        return f"{self.fecha} {self.hora:02d}h - {self.empleado_id} - {self.producto_id}: {self.total}"
+
+class CuboDia(CeldaCubo):
+    """Agregado de ``CuboHora`` por día."""
+    pk = models.CompositePrimaryKey('fecha', 'empleado', 'producto')
+    fecha = models.DateField()
+
+    def __str__(self):
+        return f"{self.fecha} - {self.empleado_id} - {self.producto_id}: {self.total}"
+
+class CuboMes(CeldaCubo):
+    """Agregado de ``CuboHora`` por mes; ``mes`` es el primer día del mes."""
+    pk = models.CompositePrimaryKey('mes', 'empleado', 'producto')
+    mes = models.DateField()
+
+    def __str__(self):
+        return f"{self.mes:%Y-%m} - {self.empleado_id} - {self.producto_id}: {self.total}"
+
 class DetalleFactura(models.Model):
     factura = models.ForeignKey(Factura, on_delete=models.CASCADE, related_name='detalles')
     producto = models.ForeignKey(Producto, on_delete=models.PROTECT)
     cantidad = models.IntegerField()
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Cubre el join del dashboard y de analytics sin leer la tabla
+            models.Index(
+                fields=['factura', 'producto', 'cantidad', 'precio_unitario'],
+                name='detallefactura_cubriente_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.producto} x{self.cantidad}"
@@ -0,0 +1,132 @@
+# paginacion.py
+"""Paginación por cursor (keyset) y filtros de los paneles de listado."""
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+TAMANO_PAGINA = 50
+TAMANO_MAXIMO = 200
+
+
+def _a_json(valor):
+    # isoformat completo: DjangoJSONEncoder corta las horas a milisegundos y el
+    # cursor saltaría las filas que comparten ese milisegundo
+    if isinstance(valor, (datetime.date, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f"{type(valor).__name__} no va en un cursor")
+
+
+def codificar_cursor(valores):
+    return base64.urlsafe_b64encode(json.dumps(valores, default=_a_json).encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        return None
+
+
+def tamano_pagina(params):
+    try:
+        return max(1, min(int(params.get('tamano', TAMANO_PAGINA)), TAMANO_MAXIMO))
+    except ValueError:
+        return TAMANO_PAGINA
+
+
+def _valores_cursor(modelo, orden, valores):
+    """
+    Los ``valores`` de un cursor convertidos al tipo de cada campo de ``orden``,
+    o ``None`` si no corresponden (un cursor manipulado o de otra vista).
+    """
+    if not isinstance(valores, list) or len(valores) != len(orden):
+        return None
+    convertidos = []
+    for campo, valor in zip(orden, valores):
+        if not isinstance(valor, (str, int, float)) or isinstance(valor, bool):
+            return None
+        try:
+            convertidos.append(modelo._meta.get_field(campo.lstrip('-')).to_python(valor))
+        except (ValidationError, TypeError, ValueError):
+            return None
+    return convertidos
+
+
+def _despues_de(orden, valores):
+    """Condición "fila posterior al cursor" para un ``order_by`` de varios campos."""
+    condicion = Q()
+    iguales = {}
+    for campo, valor in zip(orden, valores):
+        nombre = campo.lstrip('-')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        condicion |= Q(**iguales, **{f'{nombre}__{operador}': valor})
+        iguales[nombre] = valor
+    return condicion
+
+
+def paginar(queryset, orden, params):
+    """
+    Devuelve ``(filas, siguiente_cursor)`` de la página pedida en ``params``.
+
+    ``orden`` es como en ``order_by`` y su último campo debe ser único (la PK),
+    así la página siguiente se busca con un rango sobre el índice en lugar de
+    un OFFSET. Funciona con querysets de modelos o de ``values()``.
+    """
+    tamano = tamano_pagina(params)
+    queryset = queryset.order_by(*orden)
+    valores = _valores_cursor(queryset.model, orden, decodificar_cursor(params.get('cursor') or ''))
+    if valores is not None:
+        queryset = queryset.filter(_despues_de(orden, valores))
+
+    filas = list(queryset[:tamano + 1])
+    siguiente = None
+    if len(filas) > tamano:
+        filas = filas[:tamano]
+        ultima = filas[-1]
+        siguiente = codificar_cursor([
+            ultima[campo.lstrip('-')] if isinstance(ultima, dict) else getattr(ultima, campo.lstrip('-'))
+            for campo in orden
+        ])
+    return filas, siguiente
+
+
+def pide_json(request):
+    return request.GET.get('formato') == 'json'
+
+
+def respuesta_json(filas, siguiente):
+    return JsonResponse({'resultados': filas, 'siguiente': siguiente})
+
+
+def filtrar_por_fecha(queryset, params, campo):
+    """
+    Aplica ``desde``/``hasta`` (AAAA-MM-DD, inclusivas) sobre ``campo``; ignora
+    fechas inválidas. Con ``campo`` terminado en ``__date`` (un DateTimeField)
+    filtra por un rango de fecha y hora sobre la columna, que sí usa su
+    índice: ``fecha__date`` envuelve la columna en una función.
+    """
+    columna = campo.removesuffix('__date')
+    for clave, operador in (('desde', 'gte'), ('hasta', 'lte')):
+        try:
+            fecha = parse_date(params.get(clave) or '')
+        except ValueError:
+            fecha = None
+        if not fecha:
+            continue
+        if columna == campo:
+            queryset = queryset.filter(**{f'{campo}__{operador}': fecha})
+            continue
+        if clave == 'hasta':
+            fecha, operador = fecha + datetime.timedelta(days=1), 'lt'
+        inicio = timezone.make_aware(datetime.datetime.combine(fecha, datetime.time.min))
+        queryset = queryset.filter(**{f'{columna}__{operador}': inicio})
+    return queryset
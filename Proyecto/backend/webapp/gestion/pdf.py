@@ -0,0 +1,78 @@
+# pdf.py
+"""Dibujo del PDF de una factura con ReportLab."""
+from io import BytesIO
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+
+def dibujar_factura(factura):
+    """
+    Devuelve los bytes del PDF de ``factura``.
+
+    Conviene traerla con ``detalles__producto`` precargado.
+    """
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+    y = height - 40
+
+    # Cabecera
+    p.setFont("Helvetica-Bold", 16)
+    prefijo = factura.configuracion.prefijo  # Asegúrate que existe ese campo
+    p.drawCentredString(width / 2, y, f"Factura {prefijo}{factura.id}")
+    y -= 30
+
+    # Datos básicos
+    p.setFont("Helvetica", 12)
+    p.drawString(50, y, f"Fecha: {factura.fecha_emision} {factura.hora_emision.strftime('%H:%M')}")
+    y -= 20
+    p.drawString(50, y, f"Cliente: {factura.cliente}")
+    y -= 20
+    p.drawString(50, y, f"Empleado: {factura.empleado}")
+    y -= 20
+    p.drawString(50, y, f"Método de Pago: {factura.tipo_pago}")
+    y -= 40
+
+    # Encabezados de tabla
+    p.setFont("Helvetica-Bold", 11)
+    p.drawString(50, y, "Producto")
+    p.drawString(250, y, "Cantidad")
+    p.drawString(350, y, "Precio Unit.")
+    p.drawString(450, y, "Total")
+    y -= 20
+
+    p.setFont("Helvetica", 10)
+    for item in factura.detalles.all():
+        if y < 100:  # Salto de página si estamos muy abajo
+            p.showPage()
+            y = height - 40
+        total_item = item.precio_unitario * item.cantidad
+        p.drawString(50, y, str(item.producto.nombre))
+        p.drawString(250, y, str(item.cantidad))
+        p.drawString(350, y, f"${item.precio_unitario:.2f}")
+        p.drawString(450, y, f"${total_item:.2f}")
+        y -= 18
+
+    # Totales
+    y -= 30
+    p.setFont("Helvetica-Bold", 11)
+    p.drawString(50, y, f"Subtotal: ${factura.subtotal:.2f}")
+    y -= 18
+    p.drawString(50, y, f"Base Gravable: ${factura.base_gravable:.2f}")
+    y -= 18
+    impuesto = factura.total - factura.base_gravable
+    p.drawString(50, y, f"Impuesto ({factura.tipo_impuesto.nombre}): ${impuesto:.2f}")
+    y -= 18
+    p.drawString(50, y, f"Propina: ${factura.propina:.2f}")
+    y -= 18
+    p.drawString(50, y, f"Total: ${factura.total:.2f}")
+    y -= 18
+    p.drawString(50, y, f"Recibido: ${factura.recibido:.2f}")
+    y -= 18
+    cambio = factura.recibido - factura.total
+    p.drawString(50, y, f"Cambio: ${cambio:.2f}")
+
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
@@ -0,0 +1,196 @@
+# perfilado.py
+"""
+Perfilado de peticiones a pedido, para ver en producción por qué una vista
+es lenta.
+
+``PerfiladoMiddleware`` perfila una petición cuando un administrador la pide
+(cabecera ``X-Perfilar: 1`` o ``?perfilar=1``) o cuando le toca por muestreo
+(``PERFILADO_MUESTREO``, una fracción de todas las peticiones).
+
+Mientras corre la vista, un hilo toma su pila cada ``PERFILADO_INTERVALO``
+segundos y las cuenta: son las pilas colapsadas (``.folded``, una línea
+``a;b;c muestras`` por pila) que leen flamegraph.pl y speedscope. Con
+``PERFILADO_MODO='cprofile'`` la vista corre además bajo cProfile y se
+guarda el ``.prof`` (se abre con ``pstats`` o snakeviz), que cuenta
+llamadas y tiempos exactos pero hace más lenta la petición; con
+``'muestreo'`` solo se toman las pilas. Las pilas no salen del grafo de
+cProfile: en Django todas las capas de middleware pasan por la misma
+función ``inner`` y el grafo no distingue unas de otras. El hilo necesita
+el GIL para mirar, así que en la práctica toma una pila cada
+``sys.getswitchinterval()`` (5 ms) como mucho; una petición más corta
+puede quedar sin muestras.
+
+Cada captura son sus archivos y un ``.json`` con los datos de la petición en
+``PERFILADO_DIR``; se guardan las últimas ``PERFILADO_MAX``. Las respuestas
+en streaming (las exportaciones) se generan después de pasar por aquí y no
+quedan en el perfil.
+"""
+import cProfile
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from backend.webapp.gestion.roles import es_admin
+
+CABECERA = 'HTTP_X_PERFILAR'
+PARAMETRO = 'perfilar'
+MODOS = ('cprofile', 'muestreo')
+# Archivos que se pueden descargar de una captura
+ARCHIVO = re.compile(r'^[0-9a-f-]+\.(prof|folded)$')
+
+
+def _etiqueta(archivo, linea, funcion):
+    partes = Path(archivo).parts[-2:]
+    return f"{funcion} ({'/'.join(partes)}:{linea})".replace(';', ',')
+
+
+class Muestreador(threading.Thread):
+    """Cuenta las pilas de un hilo tomándolas cada ``intervalo`` segundos."""
+
+    def __init__(self, hilo, intervalo, topes=()):
+        super().__init__(daemon=True)
+        self.hilo = hilo
+        self.intervalo = intervalo
+        # Códigos de las funciones donde se cortan las pilas (lo de más arriba es el servidor)
+        self.topes = frozenset(topes)
+        self.pilas = Counter()
+        self.parar = threading.Event()
+
+    def run(self):
+        while not self.parar.wait(self.intervalo):
+            marco = sys._current_frames().get(self.hilo)
+            pila = []
+            while marco is not None and marco.f_code not in self.topes:
+                codigo = marco.f_code
+                pila.append(_etiqueta(codigo.co_filename, codigo.co_firstlineno, codigo.co_name))
+                marco = marco.f_back
+            if pila:
+                self.pilas[';'.join(reversed(pila))] += 1
+
+    def detener(self):
+        self.parar.set()
+        self.join()
+        return dict(self.pilas)
+
+
+def _escribir(ruta, escribir):
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+
+def guardar(directorio, datos, pilas, profiler=None):
+    """Guarda una captura; el ``.json`` va al final, así la lista nunca ve una a medias."""
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    captura = f"{int(time.time() * 1000):013d}-{os.getpid()}-{secrets.token_hex(3)}"
+    archivos = []
+    if profiler is not None:
+        _escribir(directorio / f"{captura}.prof", lambda ruta: profiler.dump_stats(str(ruta)))
+        archivos.append(f"{captura}.prof")
+    lineas = ''.join(f"{pila} {valor}\n" for pila, valor in sorted(pilas.items()))
+    _escribir(directorio / f"{captura}.folded", lambda ruta: ruta.write_text(lineas, encoding='utf-8'))
+    archivos.append(f"{captura}.folded")
+    datos = {**datos, 'captura': captura, 'archivos': archivos}
+    _escribir(directorio / f"{captura}.json",
+              lambda ruta: ruta.write_text(json.dumps(datos, ensure_ascii=False), encoding='utf-8'))
+    rotar(directorio, settings.PERFILADO_MAX)
+    return captura
+
+
+def rotar(directorio, maximo):
+    """Borra las capturas más viejas hasta dejar ``maximo``."""
+    indices = sorted(Path(directorio).glob('*.json'))
+    for indice in indices[:max(len(indices) - maximo, 0)]:
+        for ruta in Path(directorio).glob(f"{indice.stem}.*"):
+            # Otro proceso pudo borrarla primero
+            ruta.unlink(missing_ok=True)
+
+
+def capturas(directorio=None):
+    """Las capturas guardadas, de la más lenta a la más rápida."""
+    resultado = []
+    for indice in Path(directorio or settings.PERFILADO_DIR).glob('*.json'):
+        try:
+            resultado.append(json.loads(indice.read_text(encoding='utf-8')))
+        except (FileNotFoundError, ValueError):
+            continue
+    return sorted(resultado, key=lambda captura: captura['ms'], reverse=True)
+
+
+def ruta_archivo(nombre):
+    """Ruta de un archivo descargable de una captura, o ``None`` si el nombre no es válido o no existe."""
+    if not ARCHIVO.match(nombre):
+        return None
+    ruta = Path(settings.PERFILADO_DIR) / nombre
+    return ruta if ruta.is_file() else None
+
+
+class PerfiladoMiddleware:
+    """Perfila las peticiones pedidas o muestreadas (ver el docstring del módulo). Va después de ``RolesMiddleware``."""
+
+    def __init__(self, get_response):
+        if not settings.PERFILADO:
+            raise MiddlewareNotUsed
+        if settings.PERFILADO_MODO not in MODOS:
+            raise ValueError(f"PERFILADO_MODO debe ser uno de {MODOS}")
+        self.get_response = get_response
+
+    def motivo(self, request):
+        if request.META.get(CABECERA) == '1' or request.GET.get(PARAMETRO) == '1':
+            usuario = request.user
+            if usuario.is_authenticated and es_admin(usuario):
+                return 'pedido'
+        muestreo = settings.PERFILADO_MUESTREO
+        if muestreo and random.random() < muestreo:
+            return 'muestreo'
+        return None
+
+    def __call__(self, request):
+        motivo = self.motivo(request)
+        if motivo is None:
+            return self.get_response(request)
+
+        modo = settings.PERFILADO_MODO
+        profiler = cProfile.Profile() if modo == 'cprofile' else None
+        muestreador = Muestreador(threading.get_ident(), settings.PERFILADO_INTERVALO, TOPES)
+        muestreador.start()
+        inicio = time.perf_counter()
+        try:
+            if profiler is None:
+                response = self.get_response(request)
+            else:
+                response = profiler.runcall(self.get_response, request)
+        finally:
+            duracion = time.perf_counter() - inicio
+            pilas = muestreador.detener()
+
+        coincidencia = request.resolver_match
+        usuario = request.user
+        datos = {
+            'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'metodo': request.method,
+            'ruta': request.get_full_path(),
+            'vista': coincidencia.view_name if coincidencia else None,
+            'estado': response.status_code,
+            'ms': round(duracion * 1000, 2),
+            'usuario': usuario.get_username() if usuario.is_authenticated else None,
+            'motivo': motivo,
+            'modo': modo,
+            'muestras': sum(pilas.values()),
+        }
+        response['X-Perfil'] = guardar(settings.PERFILADO_DIR, datos, pilas, profiler)
+        return response
+
+
+TOPES = (PerfiladoMiddleware.__call__.__code__, cProfile.Profile.runcall.__code__)
@@ -0,0 +1,222 @@
+# planillas.py
+"""
+Exportación de ventas, compras e inventario a CSV o XLSX en streaming.
+
+Las filas salen de un ``values_list`` recorrido con ``.iterator()`` en bloques
+de ``TAMANO_BLOQUE`` y se escriben y entregan bloque a bloque, así que la
+memoria no crece con el número de filas. El XLSX se arma a mano (una hoja con
+textos en línea, sin tabla de cadenas compartidas) dentro de un ZIP escrito
+en modo streaming, como el ZIP de PDF de ``exportacion.py``.
+"""
+import csv
+import datetime
+import io
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from backend.webapp.gestion.exportacion import Salida
+from backend.webapp.gestion.models import DetalleCompra, DetalleFactura, Producto
+from backend.webapp.gestion.paginacion import filtrar_por_fecha
+
+TAMANO_BLOQUE = 2000
+
+# Modelo, columnas (campo, encabezado), orden, campo de fecha, campo de
+# empleado y campo de la fila padre (lo que se selecciona en el admin).
+# El orden sigue el índice de la FK: SQLite recorre las líneas sin ordenarlas.
+TABLAS = {
+    'ventas': (
+        DetalleFactura,
+        (
+            ('factura_id', 'Factura'),
+            ('factura__fecha_emision', 'Fecha'),
+            ('factura__hora_emision', 'Hora'),
+            ('factura__empleado_id', 'Empleado'),
+            ('factura__tipo_pago__nombre', 'Tipo de pago'),
+            ('factura__anulado', 'Anulada'),
+            ('producto_id', 'Id producto'),
+            ('producto__nombre', 'Producto'),
+            ('cantidad', 'Cantidad'),
+            ('precio_unitario', 'Precio unitario'),
+        ),
+        ('factura_id', 'id'),
+        'factura__fecha_emision',
+        'factura__empleado_id',
+        'factura',
+    ),
+    'compras': (
+        DetalleCompra,
+        (
+            ('compra_id', 'Compra'),
+            ('compra__fecha', 'Fecha'),
+            ('compra__proveedor__nombre', 'Proveedor'),
+            ('producto_id', 'Id producto'),
+            ('producto__nombre', 'Producto'),
+            ('cantidad', 'Cantidad'),
+            ('costo_producto', 'Costo'),
+        ),
+        ('compra_id', 'id'),
+        'compra__fecha__date',
+        None,
+        'compra',
+    ),
+    'inventario': (
+        Producto,
+        (
+            ('id', 'Id'),
+            ('nombre', 'Producto'),
+            ('precio', 'Precio'),
+            ('stock', 'Stock'),
+            ('cantidad_medida', 'Cantidad medida'),
+            ('unidad_medida', 'Unidad medida'),
+        ),
+        ('id',),
+        None,
+        None,
+        'pk',
+    ),
+}
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def filas(tabla, params=None, seleccion=None):
+    """
+    ``values_list`` de ``tabla`` filtrado por ``params`` (``desde``, ``hasta``
+    y ``empleado``; las fechas inválidas se ignoran) o por las filas padre de
+    ``seleccion`` (un queryset de la acción del admin).
+    """
+    modelo, columnas, orden, campo_fecha, campo_empleado, campo_padre = TABLAS[tabla]
+    queryset = modelo.objects.all()
+    if seleccion is not None:
+        queryset = queryset.filter(**{f'{campo_padre}__in': seleccion.values('pk')})
+    params = params or {}
+    if campo_fecha:
+        queryset = filtrar_por_fecha(queryset, params, campo_fecha)
+    if campo_empleado and params.get('empleado'):
+        queryset = queryset.filter(**{campo_empleado: params['empleado']})
+    return queryset.order_by(*orden).values_list(*(campo for campo, _ in columnas))
+
+
+def encabezados(tabla):
+    return [titulo for _, titulo in TABLAS[tabla][1]]
+
+
+def _fecha_hora(valor):
+    """Fechas con hora en la zona local y sin microsegundos, como en los paneles."""
+    if not isinstance(valor, datetime.datetime):
+        return valor
+    if timezone.is_aware(valor):
+        valor = timezone.localtime(valor)
+    return valor.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def bloques_csv(tabla, queryset):
+    """El CSV (UTF-8 con BOM, para que Excel lea las tildes) en bloques de bytes."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')
+    escritor.writerow(encabezados(tabla))
+    for n, fila in enumerate(queryset.iterator(chunk_size=TAMANO_BLOQUE), 1):
+        escritor.writerow([_fecha_hora(v) for v in fila])
+        if n % TAMANO_BLOQUE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+RELACIONES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{nombre}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+RELACIONES_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+INICIO_HOJA = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+FIN_HOJA = '</sheetData></worksheet>'
+
+
+def _celda(valor):
+    # Sin atributo de referencia: cada celda ocupa la columna siguiente, por
+    # eso los vacíos se escriben igual
+    if valor is None:
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c><v>{valor}</v></c>'
+    if isinstance(valor, datetime.datetime):
+        valor = _fecha_hora(valor)
+    elif isinstance(valor, (datetime.date, datetime.time)):
+        # Sin hoja de estilos no hay formato de fecha: van como texto ISO
+        valor = valor.isoformat()
+    return f'<c t="inlineStr"><is><t>{escape(str(valor))}</t></is></c>'
+
+
+def _fila(valores):
+    return '<row>' + ''.join(_celda(v) for v in valores) + '</row>'
+
+
+def bloques_xlsx(tabla, queryset):
+    """El libro XLSX en bloques de bytes."""
+    salida = Salida()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        libro.writestr('[Content_Types].xml', CONTENT_TYPES)
+        libro.writestr('_rels/.rels', RELACIONES)
+        libro.writestr('xl/workbook.xml', LIBRO.format(nombre=tabla.capitalize()))
+        libro.writestr('xl/_rels/workbook.xml.rels', RELACIONES_LIBRO)
+        with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja:
+            partes = [INICIO_HOJA, _fila(encabezados(tabla))]
+            for n, fila in enumerate(queryset.iterator(chunk_size=TAMANO_BLOQUE), 1):
+                partes.append(_fila(fila))
+                if n % TAMANO_BLOQUE == 0:
+                    hoja.write(''.join(partes).encode())
+                    partes.clear()
+                    yield salida.vaciar()
+            partes.append(FIN_HOJA)
+            hoja.write(''.join(partes).encode())
+    yield salida.vaciar()
+
+
+def respuesta(tabla, formato, queryset, nombre=None):
+    """``StreamingHttpResponse`` con la descarga de ``queryset`` (ver ``filas``)."""
+    bloques = bloques_csv if formato == 'csv' else bloques_xlsx
+    response = StreamingHttpResponse(bloques(tabla, queryset), content_type=FORMATOS[formato])
+    response['Content-Disposition'] = f'attachment; filename="{nombre or tabla}.{formato}"'
+    return response
@@ -0,0 +1,22 @@
+# pruebas.py
+"""Ejecutor de las pruebas: lo que escriben en disco va a directorios temporales."""
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class EjecutorPruebas(DiscoverRunner):
+    """``DiscoverRunner`` con ``METRICAS_DIR`` en un directorio temporal para toda la corrida."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.directorio = tempfile.mkdtemp(prefix='metricas-')
+        self.ajustes = override_settings(METRICAS_DIR=self.directorio)
+        self.ajustes.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.ajustes.disable()
+        shutil.rmtree(self.directorio, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,66 @@
+# resumen.py
+"""
+Resumen diario de ventas (VentaDiaria y su desglose).
+
+Lo mantienen triggers sobre ``gestion_factura`` (migración 0011), así que
+cualquier escritura lo actualiza: las vistas, el admin y las cargas con SQL
+directo. ``reconstruir`` lo recalcula para cuando se suspenden los triggers.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from backend.webapp.gestion import versiones
+from backend.webapp.gestion.models import Factura, VentaDiaria, VentaDiariaDesglose
+
+CAMPOS = ('cantidad_facturas', 'total', 'propina', 'impuesto')
+
+
+def total_del_dia(fecha):
+    """Total vendido (sin anuladas) en ``fecha``, leído de una sola fila."""
+    total = VentaDiaria.objects.filter(fecha=fecha).values_list('total', flat=True).first()
+    return total if total is not None else Decimal('0.00')
+
+
+@transaction.atomic
+def reconstruir(desde=None, hasta=None):
+    """
+    Recalcula el resumen a partir de las facturas entre ``desde`` y ``hasta``
+    (ambas opcionales e inclusivas). Devuelve el número de días reconstruidos.
+    """
+    rango, rango_facturas = {}, {}
+    if desde:
+        rango['fecha__gte'] = rango_facturas['fecha_emision__gte'] = desde
+    if hasta:
+        rango['fecha__lte'] = rango_facturas['fecha_emision__lte'] = hasta
+    facturas = Factura.objects.filter(anulado=False, **rango_facturas)
+    # Alias distintos a los campos para que F('total') no apunte a la suma
+    sumas = dict(
+        suma_cantidad_facturas=Count('id'),
+        suma_total=Sum('total'),
+        suma_propina=Sum('propina'),
+        suma_impuesto=Sum(F('total') - F('base_gravable') - F('propina')),
+    )
+
+    VentaDiaria.objects.filter(**rango).delete()
+    VentaDiariaDesglose.objects.filter(**rango).delete()
+
+    dias = facturas.values('fecha_emision').annotate(**sumas).order_by()
+    VentaDiaria.objects.bulk_create(
+        [VentaDiaria(fecha=d['fecha_emision'], **{c: d[f'suma_{c}'] for c in CAMPOS}) for d in dias],
+        batch_size=500,
+    )
+    desglose = facturas.values('fecha_emision', 'tipo_pago_id', 'empleado_id').annotate(**sumas).order_by()
+    VentaDiariaDesglose.objects.bulk_create(
+        [
+            VentaDiariaDesglose(
+                fecha=d['fecha_emision'], tipo_pago_id=d['tipo_pago_id'], empleado_id=d['empleado_id'],
+                **{c: d[f'suma_{c}'] for c in CAMPOS},
+            )
+            for d in desglose
+        ],
+        batch_size=500,
+    )
+    versiones.incrementar(versiones.DATOS)
+    return len(dias)
@@ -0,0 +1,128 @@
+# roles.py
+"""
+Roles del usuario resueltos una vez y guardados en la sesión.
+
+Los roles son los nombres de sus grupos; el superusuario además cuenta como
+``Administrador``. La sesión guarda los roles junto con la versión con que
+se leyeron: cambiar los grupos de un usuario (o renombrar/borrar un grupo)
+incrementa su contador en ``versiones`` y la siguiente petición los vuelve a
+leer. Los contadores están en la base y no en la caché, así que un cambio
+hecho en un worker llega a todos; mientras no cambien, comprobar permisos es
+una consulta por clave primaria y ninguna a los grupos.
+"""
+from django.utils.functional import SimpleLazyObject
+
+from backend.webapp.gestion import versiones
+
+ROL_ADMIN = 'Administrador'
+CLAVE_SESION = 'roles'
+VERSION_GLOBAL = 'roles'
+
+
+def _clave_usuario(usuario_id):
+    return f"roles:{usuario_id}"
+
+
+def version(usuario_id):
+    # Combina el contador global (grupos) con el del usuario (su membresía)
+    return ':'.join(map(str, versiones.leer(VERSION_GLOBAL, _clave_usuario(usuario_id))))
+
+
+def invalidar_usuarios(ids):
+    versiones.incrementar(*map(_clave_usuario, ids))
+
+
+def invalidar_todos():
+    versiones.incrementar(VERSION_GLOBAL)
+
+
+def calcular_roles(usuario):
+    """Lee los grupos de ``usuario`` en la base (una consulta)."""
+    roles = set(usuario.groups.values_list('name', flat=True))
+    if usuario.is_superuser:
+        roles.add(ROL_ADMIN)
+    return frozenset(roles)
+
+
+def roles_de(request, usuario=None):
+    """Roles del usuario de ``request``, desde la sesión si siguen vigentes."""
+    usuario = usuario or request.user
+    if not usuario.is_authenticated:
+        return frozenset()
+    vigente = version(usuario.pk)
+    guardado = request.session.get(CLAVE_SESION)
+    if guardado and guardado['usuario'] == usuario.pk and guardado['version'] == vigente:
+        return frozenset(guardado['roles'])
+    roles = calcular_roles(usuario)
+    request.session[CLAVE_SESION] = {'usuario': usuario.pk, 'version': vigente, 'roles': sorted(roles)}
+    return roles
+
+
+def es_admin(user):
+    roles = getattr(user, 'roles', None)
+    if roles is None:
+        roles = calcular_roles(user)
+    return ROL_ADMIN in roles
+
+
+def es_user(user):
+    return not es_admin(user)
+
+
+class RolesMiddleware:
+    """
+    Cuelga ``roles`` de ``request.user`` al primer acceso.
+
+    Va después de ``AuthenticationMiddleware``; mantiene al usuario perezoso
+    para que las vistas que no lo miran no paguen ni la sesión.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        usuario = request.user
+
+        def con_roles():
+            usuario.roles = roles_de(request, usuario)
+            return usuario
+
+        request.user = SimpleLazyObject(con_roles)
+        return self.get_response(request)
+
+
+def contexto_roles(request):
+    """Procesador de contexto: ``roles`` y ``es_admin`` para las plantillas."""
+    # Perezoso: las páginas que no los usan no cargan la sesión
+    def roles():
+        return getattr(request.user, 'roles', frozenset())
+
+    return {'roles': SimpleLazyObject(roles), 'es_admin': lambda: ROL_ADMIN in roles()}
+
+
+def al_iniciar_sesion(sender, request, user, **kwargs):
+    roles_de(request, user)
+
+
+def al_cambiar_grupos(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # Se cambiaron los usuarios de un grupo: pk_set son usuarios
+        if pk_set is None:
+            invalidar_todos()
+        else:
+            invalidar_usuarios(pk_set)
+    else:
+        invalidar_usuarios([instance.pk])
+
+
+def al_guardar_usuario(sender, instance, update_fields=None, **kwargs):
+    # Cada inicio de sesión guarda last_login; eso no cambia los roles
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    invalidar_usuarios([instance.pk])
+
+
+def al_cambiar_grupo(sender, **kwargs):
+    invalidar_todos()
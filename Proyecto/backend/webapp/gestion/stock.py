@@ -0,0 +1,41 @@
+# stock.py
+"""Operaciones de inventario en bloque compartidas por ventas y compras."""
+from django.db import connection
+
+from backend.webapp.gestion.models import Producto
+
+
+def obtener_productos(ids):
+    """
+    Trae todos los productos de ``ids`` en una sola consulta.
+
+    Lanza ``Producto.DoesNotExist`` si falta alguno, igual que ``objects.get``.
+    """
+    ids = {int(pid) for pid in ids}
+    productos = Producto.objects.in_bulk(ids)
+    faltantes = ids - productos.keys()
+    if faltantes:
+        raise Producto.DoesNotExist(f"Productos inexistentes: {sorted(faltantes)}")
+    return productos
+
+
+def ajustar_stock(cambios):
+    """
+    Aplica ``{producto_id: delta}`` al stock con un único UPDATE.
+
+    Los deltas negativos descuentan (ventas) y los positivos suman (compras).
+    Se arma el ``CASE`` en SQL directo porque construirlo con ``When`` del ORM
+    cuesta más que la propia consulta cuando hay decenas de líneas.
+    """
+    cambios = {int(pid): int(delta) for pid, delta in cambios.items() if delta}
+    if not cambios:
+        return
+    tabla = connection.ops.quote_name(Producto._meta.db_table)
+    casos = ' '.join(['WHEN %s THEN %s'] * len(cambios))
+    marcadores = ', '.join(['%s'] * len(cambios))
+    params = [valor for par in cambios.items() for valor in par] + list(cambios)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {tabla} SET stock = stock + CASE id {casos} ELSE 0 END WHERE id IN ({marcadores})",
+            params,
+        )
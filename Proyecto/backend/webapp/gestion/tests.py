@@ -1,3 +1,1758 @@
-from django.test import TestCase
+import base64
+import datetime
+import json
+import multiprocessing
+import os
+import pstats
+import re
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pyarrow.compute as pc
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from sqlalchemy import create_engine
+
+from backend.webapp.gestion.models import (
+    CambioFactura,
+    Cliente,
+    Compra,
+    ConfiguracionFactura,
+    CuboDia,
+    CuboHora,
+    CuboMes,
+    DetalleCompra,
+    DetalleFactura,
+    DetalleImpuesto,
+    Empleado,
+    Factura,
+    Producto,
+    Proveedor,
+    SecuenciaFactura,
+    TipoPago,
+    TriggerSuspendido,
+    VentaDiaria,
+    VentaDiariaDesglose,
+    formatear_id_factura,
+)
+from backend.webapp.gestion.analytics import api as analytics_api
+from backend.webapp.gestion.analytics.series import serie
+from backend.webapp.gestion.analytics.utils import totales_por_dia, totales_por_mes, ventas_por_dia, ventas_por_mes
+from backend.webapp.gestion.benchmarks import linea_base
+from backend.webapp.gestion.benchmarks.escenarios import ESCENARIOS
+from backend.webapp.gestion.busqueda import buscar_productos, consulta_fts
+from backend.datapp import dashboard, preprocesamiento, snapshot
+from backend.webapp.gestion import (
+    cubo, datos_prueba, documentos, generador, metricas, perfilado, planillas, versiones,
+)
+from backend.webapp.gestion.catalogo import configuracion_actual, listar, productos_con_stock
+from backend.webapp.gestion.exportacion import Exportacion, ids_facturas
+from backend.webapp.gestion.instrumentacion import InstrumentacionSQLMiddleware
+from backend.webapp.gestion.paginacion import filtrar_por_fecha
+from backend.webapp.gestion.resumen import total_del_dia
+
+
+def crear_basicos():
+    """Crea los registros mínimos que necesita una factura."""
+    ConfiguracionFactura.objects.create(pk=1, prefijo='RC')
+    Cliente.objects.create(pk=1, nombre='Cliente General')
+    return {
+        'empleado': Empleado.objects.create(id='E001', nombre='Ana', apellido='Bar', celular=3100000001),
+        'tipo_pago': TipoPago.objects.create(nombre='Efectivo'),
+        'tipo_impuesto': DetalleImpuesto.objects.create(nombre='IVA', impuesto=Decimal('19.000')),
+    }
+
+
+def crear_productos(n, stock=100, precio=Decimal('1000.00')):
+    Producto.objects.bulk_create([
+        Producto(nombre=f"Producto {i}", precio=precio, stock=stock, cantidad_medida=1, unidad_medida='UND')
+        for i in range(n)
+    ])
+    return list(Producto.objects.order_by('pk'))
+
+
+def datos_venta(basicos, lineas):
+    """POST de registrar_venta con ``lineas`` = [(producto, cantidad), ...]."""
+    return {
+        'cliente': '1',
+        'empleado': basicos['empleado'].pk,
+        'tipo_pago': basicos['tipo_pago'].pk,
+        'tipo_impuesto': basicos['tipo_impuesto'].pk,
+        'recibido': '0',
+        'propina': '0',
+        'producto': [str(p.pk) for p, _ in lineas],
+        'cantidad': [str(c) for _, c in lineas],
+    }
+
+
+def crear_factura(basicos, **extra):
+    datos = dict(
+        subtotal=Decimal('10.00'), total=Decimal('10.00'), base_gravable=Decimal('10.00'),
+        recibido=Decimal('10.00'), **basicos,
+    )
+    datos.update(extra)
+    return Factura.objects.create(**datos)
+
+
+class SecuenciaFacturaTests(TestCase):
+    def setUp(self):
+        self.basicos = crear_basicos()
+        self.hoy = datetime.date.today()
+
+    def test_ids_consecutivos_por_dia(self):
+        ids = [crear_factura(self.basicos).id for _ in range(3)]
+        self.assertEqual(ids, [formatear_id_factura(self.hoy, n) for n in (1, 2, 3)])
+
+    def test_reservar_bloque(self):
+        self.assertEqual(SecuenciaFactura.objects.reservar(self.hoy, cantidad=50), 1)
+        self.assertEqual(SecuenciaFactura.objects.reservar(self.hoy), 51)
+        otro_dia = self.hoy - datetime.timedelta(days=1)
+        self.assertEqual(SecuenciaFactura.objects.reservar(otro_dia, cantidad=5), 1)
+
+    def test_continua_desde_facturas_existentes(self):
+        # Facturas creadas antes de que existiera la secuencia
+        Factura.objects.bulk_create([
+            Factura(id=formatear_id_factura(self.hoy, n), subtotal=1, total=1, base_gravable=1, recibido=1, **self.basicos)
+            for n in (1, 2, 7)
+        ])
+        self.assertEqual(crear_factura(self.basicos).id, formatear_id_factura(self.hoy, 8))
+
+    def test_asignacion_no_consulta_facturas(self):
+        SecuenciaFactura.objects.reservar(self.hoy)
+        with CaptureQueriesContext(connection) as ctx:
+            SecuenciaFactura.objects.reservar(self.hoy)
+        sql = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('gestion_factura', sql)
+        self.assertLessEqual(len(ctx.captured_queries), 4)
+
+
+class SecuenciaFacturaConcurrenciaTests(TransactionTestCase):
+    HILOS = 8
+    POR_HILO = 25
+
+    def test_sin_duplicados_con_cajas_simultaneas(self):
+        hoy = datetime.date.today()
+        SecuenciaFactura.objects.reservar(hoy, cantidad=0)
+        numeros, errores = [], []
+        inicio = threading.Barrier(self.HILOS)
+
+        def caja():
+            try:
+                inicio.wait()
+                for _ in range(self.POR_HILO):
+                    numeros.append(SecuenciaFactura.objects.reservar(hoy))
+            except Exception as exc:  # pragma: no cover - se reporta abajo
+                errores.append(exc)
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=caja) for _ in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        total = self.HILOS * self.POR_HILO
+        self.assertEqual(sorted(numeros), list(range(1, total + 1)))
+
+
+class RegistrarVentaTests(TestCase):
+    def setUp(self):
+        self.basicos = crear_basicos()
+        self.productos = crear_productos(50, stock=10)
+
+    def test_registra_detalles_y_descuenta_stock(self):
+        a, b = self.productos[:2]
+        respuesta = self.client.post(reverse('registrar_venta'), datos_venta(self.basicos, [(a, 2), (b, 3), (a, 1)]))
+        self.assertRedirects(respuesta, reverse('ventas_panel'), fetch_redirect_response=False)
+        factura = Factura.objects.get()
+        self.assertEqual(factura.detalles.count(), 3)
+        self.assertEqual(factura.subtotal, Decimal('6000.00'))
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual((a.stock, b.stock), (7, 7))
+
+    def test_stock_insuficiente_vuelve_a_mostrar_el_formulario(self):
+        a, b = self.productos[:2]
+        respuesta = self.client.post(reverse('registrar_venta'), datos_venta(self.basicos, [(a, 11), (b, 1)]))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(
+            respuesta.context['errores'],
+            [f"Stock insuficiente para el producto: {a.nombre} (stock disponible: 10)"],
+        )
+        self.assertFalse(Factura.objects.exists())
+        self.assertEqual(Producto.objects.get(pk=b.pk).stock, 10)
+
+    def test_consultas_constantes_segun_lineas(self):
+        # La primera venta del día crea la secuencia y las filas del resumen
+        self.client.post(reverse('registrar_venta'), datos_venta(self.basicos, [(self.productos[0], 1)]))
+        consultas = {}
+        for n in (1, 12, 50):
+            lineas = [(p, 1) for p in self.productos[:n]]
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(reverse('registrar_venta'), datos_venta(self.basicos, lineas))
+            consultas[n] = len(ctx.captured_queries)
+        self.assertEqual(len(set(consultas.values())), 1, consultas)
+        self.assertEqual(DetalleFactura.objects.count(), 64)
+        self.assertLessEqual(consultas[50], 16)
+
+
+def datos_compra(lineas):
+    """POST de compras con ``lineas`` = [(producto, cantidad, costo), ...]."""
+    return {
+        'proveedor': '',
+        'producto': [str(p.pk) for p, _, _ in lineas],
+        'cantidad': [str(c) for _, c, _ in lineas],
+        'costo': [str(costo) for _, _, costo in lineas],
+    }
+
+
+class ComprasTests(TestCase):
+    def setUp(self):
+        self.productos = crear_productos(90, stock=0)
+
+    def registrar(self, lineas):
+        self.client.post(reverse('registrar_compra'), datos_compra(lineas))
+        return Compra.objects.latest('pk')
+
+    def stock(self, producto):
+        return Producto.objects.get(pk=producto.pk).stock
+
+    def test_registrar_compra_suma_stock(self):
+        a, b = self.productos[:2]
+        compra = self.registrar([(a, 5, '2.50'), (b, 3, '1.00'), (a, 1, '2.50')])
+        self.assertEqual(compra.detalles.count(), 3)
+        self.assertEqual(compra.total, Decimal('18.00'))
+        self.assertEqual((self.stock(a), self.stock(b)), (6, 3))
+
+    def test_modificar_compra_aplica_solo_la_diferencia(self):
+        lineas = [(p, 10, '1.00') for p in self.productos[:80]]
+        compra = self.registrar(lineas)
+        sin_cambios = set(compra.detalles.values_list('pk', flat=True)[1:79])
+
+        nuevo = self.productos[85]
+        lineas_editadas = [(self.productos[0], 4, '1.00')] + lineas[1:79] + [(nuevo, 7, '3.00')]
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('modificar_compra', args=[compra.pk]), datos_compra(lineas_editadas))
+        self.assertLessEqual(len(ctx.captured_queries), 12)
+
+        escrituras = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))]
+        self.assertEqual(len(escrituras), 5)  # detalle editado, borrado, insertado, stock y compra
+
+        self.assertTrue(sin_cambios <= set(compra.detalles.values_list('pk', flat=True)))
+        self.assertEqual(compra.detalles.count(), 80)
+        self.assertEqual(
+            (self.stock(self.productos[0]), self.stock(self.productos[79]), self.stock(nuevo), self.stock(self.productos[1])),
+            (4, 0, 7, 10),
+        )
+        compra.refresh_from_db()
+        self.assertEqual(compra.total, Decimal('805.00'))
+
+
+class ModificarVentaTests(TestCase):
+    def setUp(self):
+        self.basicos = crear_basicos()
+        self.productos = crear_productos(110, stock=5)
+        respuesta = self.client.post(
+            reverse('registrar_venta'), datos_venta(self.basicos, [(p, 2) for p in self.productos[:100]])
+        )
+        self.assertEqual(respuesta.status_code, 302)
+        self.factura = Factura.objects.get()
+
+    def stock(self, producto):
+        return Producto.objects.get(pk=producto.pk).stock
+
+    def test_editar_factura_de_100_lineas_con_presupuesto_de_consultas(self):
+        lineas = [(p, 2) for p in self.productos[1:99]] + [(self.productos[0], 5), (self.productos[105], 1)]
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.post(
+                reverse('modificar_venta', args=[self.factura.pk]), datos_venta(self.basicos, lineas)
+            )
+        self.assertRedirects(respuesta, reverse('ventas_panel'), fetch_redirect_response=False)
+        self.assertLessEqual(len(ctx.captured_queries), 16)
+
+        # 0: 2 -> 5 (usa los 3 que quedaban), 99: se quita (devuelve 2), 105: nuevo
+        self.assertEqual(
+            (self.stock(self.productos[0]), self.stock(self.productos[99]), self.stock(self.productos[105]),
+             self.stock(self.productos[50])),
+            (0, 5, 4, 3),
+        )
+        self.factura.refresh_from_db()
+        self.assertEqual(self.factura.detalles.count(), 100)
+        self.assertEqual(self.factura.subtotal, Decimal('1000.00') * (98 * 2 + 5 + 1))
+
+    def test_valida_solo_el_cambio_neto(self):
+        # Reducir una línea no exige stock aunque el producto esté agotado
+        Producto.objects.filter(pk=self.productos[0].pk).update(stock=0)
+        lineas = [(self.productos[0], 1)] + [(p, 2) for p in self.productos[1:100]]
+        respuesta = self.client.post(reverse('modificar_venta', args=[self.factura.pk]), datos_venta(self.basicos, lineas))
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(self.stock(self.productos[0]), 1)
+
+        lineas = [(self.productos[1], 8)] + [(p, 2) for p in self.productos[2:100]]
+        respuesta = self.client.post(reverse('modificar_venta', args=[self.factura.pk]), datos_venta(self.basicos, lineas))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(
+            respuesta.context['errores'],
+            [f"Stock insuficiente para el producto: {self.productos[1].nombre} (stock disponible: 5)"],
+        )
+        self.assertEqual(self.stock(self.productos[1]), 3)
+
+    def test_formulario_de_edicion(self):
+        respuesta = self.client.get(reverse('modificar_venta', args=[self.factura.pk]))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.context['detalles']), 100)
+
+
+class VentaDiariaTests(TestCase):
+    def setUp(self):
+        self.basicos = crear_basicos()
+        self.productos = crear_productos(3, stock=100)
+        self.hoy = datetime.date.today()
+
+    def vender(self, lineas, **extra):
+        datos = datos_venta(self.basicos, lineas)
+        datos.update(extra)
+        self.client.post(reverse('registrar_venta'), datos)
+        return Factura.objects.latest('pk')
+
+    def resumen(self):
+        return VentaDiaria.objects.values('cantidad_facturas', 'total', 'propina', 'impuesto').get(fecha=self.hoy)
+
+    def test_registrar_y_anular_actualizan_el_resumen(self):
+        a, b = self.productos[:2]
+        self.vender([(a, 1)], propina='500')
+        factura = self.vender([(b, 2)])
+        self.assertEqual(self.resumen(), {
+            'cantidad_facturas': 2,
+            'total': Decimal('4070.00'),
+            'propina': Decimal('500.00'),
+            'impuesto': Decimal('570.00'),
+        })
+        desglose = VentaDiariaDesglose.objects.get(fecha=self.hoy)
+        self.assertEqual((desglose.empleado_id, desglose.cantidad_facturas), ('E001', 2))
+
+        self.client.post(reverse('ventas_panel'), {'venta_id': factura.pk})
+        self.assertEqual(self.resumen()['total'], Decimal('1690.00'))
+        self.client.post(reverse('ventas_panel'), {'venta_id': factura.pk})
+        self.assertEqual(self.resumen()['total'], Decimal('4070.00'))
+
+    def test_modificar_venta_reemplaza_los_totales(self):
+        a, b = self.productos[:2]
+        factura = self.vender([(a, 1)])
+        self.client.post(reverse('modificar_venta', args=[factura.pk]), datos_venta(self.basicos, [(a, 1), (b, 1)]))
+        self.assertEqual(self.resumen()['cantidad_facturas'], 1)
+        self.assertEqual(self.resumen()['total'], Decimal('2380.00'))
+
+    def test_reconstruir_coincide_con_lo_incremental(self):
+        a, b = self.productos[:2]
+        self.vender([(a, 3)])
+        anulada = self.vender([(b, 1)])
+        self.client.post(reverse('ventas_panel'), {'venta_id': anulada.pk})
+        incremental = self.resumen()
+        VentaDiaria.objects.update(total=0)
+        VentaDiariaDesglose.objects.all().delete()
+
+        call_command('reconstruir_resumen', stdout=StringIO())
+        self.assertEqual(self.resumen(), incremental)
+        self.assertEqual(VentaDiariaDesglose.objects.get().total, incremental['total'])
+
+    def test_el_admin_y_el_sql_directo_actualizan_el_resumen(self):
+        a, b = self.productos[:2]
+        self.vender([(a, 1)])
+        factura = self.vender([(b, 2)])
+        otro_pago = TipoPago.objects.create(nombre='Tarjeta')
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+
+        formulario = {
+            'configuracion': 1, 'empleado': factura.empleado_id, 'cliente': 1, 'subtotal': factura.subtotal,
+            'total': '3000.00', 'tipo_impuesto': factura.tipo_impuesto_id, 'base_gravable': factura.base_gravable,
+            'tipo_pago': otro_pago.pk, 'recibido': '0', 'propina': '0',
+        }
+        respuesta = self.client.post(reverse('admin:gestion_factura_change', args=[factura.pk]), formulario)
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(self.resumen()['total'], Decimal('4190.00'))
+        self.assertEqual(VentaDiariaDesglose.objects.get(tipo_pago=otro_pago).total, Decimal('3000.00'))
+
+        # Anulada desde el admin (la casilla sin marcar no viaja en el POST)
+        respuesta = self.client.post(reverse('admin:gestion_factura_change', args=[factura.pk]),
+                                     {**formulario, 'anulado': 'on'})
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(self.resumen()['cantidad_facturas'], 1)
+        self.assertFalse(VentaDiariaDesglose.objects.filter(tipo_pago=otro_pago).exists())
+
+        primera = Factura.objects.exclude(pk=factura.pk).get()
+        self.client.post(reverse('admin:gestion_factura_changelist'),
+                         {'action': 'delete_selected', '_selected_action': [primera.pk], 'post': 'yes'})
+        self.assertFalse(Factura.objects.filter(pk=primera.pk).exists())
+        # Sin facturas activas el día sale del resumen, igual que al reconstruirlo
+        self.assertFalse(VentaDiaria.objects.exists())
+        self.assertFalse(VentaDiariaDesglose.objects.exists())
+
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE gestion_factura SET anulado = 0 WHERE id = %s", [factura.pk])
+        self.assertEqual(self.resumen()['total'], Decimal('3000.00'))
+
+    def test_paneles_leen_el_resumen(self):
+        self.vender([(self.productos[0], 1)])
+        admin = User.objects.create_superuser('admin', password='x')
+        self.client.force_login(admin)
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(reverse('panel_admin'))
+        self.assertEqual(respuesta.context['ventas_hoy_admin'], total_del_dia(self.hoy))
+        self.assertEqual(respuesta.context['ventas_hoy_admin'], Decimal('1190.00'))
+        self.assertFalse(any('"gestion_factura"' in q['sql'] for q in ctx.captured_queries))
+
+
+class PaginacionPanelesTests(TestCase):
+    def setUp(self):
+        self.basicos = crear_basicos()
+        self.otro = Empleado.objects.create(id='E002', nombre='Luis', apellido='Bar', celular=3100000002)
+        inicio = datetime.date(2025, 1, 1)
+        facturas = []
+        for n in range(120):
+            fecha = inicio + datetime.timedelta(days=n // 10)
+            facturas.append(Factura(
+                id=formatear_id_factura(fecha, n % 10 + 1), fecha_emision=fecha, hora_emision=datetime.time(20),
+                subtotal=1, total=1, base_gravable=1, recibido=1, anulado=n % 7 == 0,
+                **dict(self.basicos, empleado=self.otro if n % 3 == 0 else self.basicos['empleado']),
+            ))
+        Factura.objects.bulk_create(facturas)
+        # auto_now_add pisa la fecha al insertar
+        for n in range(12):
+            fecha = inicio + datetime.timedelta(days=n)
+            Factura.objects.filter(id__startswith=fecha.strftime('%y%m%d')).update(fecha_emision=fecha)
+
+    def recorrer(self, **params):
+        ids, cursor, paginas = [], None, 0
+        while True:
+            consulta = dict(params, formato='json', tamano=25)
+            if cursor:
+                consulta['cursor'] = cursor
+            datos = self.client.get(reverse('ventas_panel'), consulta).json()
+            ids += [fila['id'] for fila in datos['resultados']]
+            paginas += 1
+            cursor = datos['siguiente']
+            if not cursor:
+                return ids, paginas
+
+    def test_recorre_todas_las_ventas_sin_repetir(self):
+        ids, paginas = self.recorrer()
+        self.assertEqual(paginas, 5)
+        esperado = list(Factura.objects.order_by('-fecha_emision', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+
+    def test_filtros(self):
+        ids, _ = self.recorrer(desde='2025-01-03', hasta='2025-01-04', empleado='E002', estado='activo')
+        esperado = Factura.objects.filter(
+            fecha_emision__range=(datetime.date(2025, 1, 3), datetime.date(2025, 1, 4)),
+            empleado_id='E002', anulado=False,
+        ).order_by('-fecha_emision', '-id')
+        self.assertEqual(ids, list(esperado.values_list('id', flat=True)))
+        self.assertTrue(ids)
+
+    def test_pagina_html_con_enlace_siguiente(self):
+        respuesta = self.client.get(reverse('ventas_panel'), {'tamano': 30, 'estado': 'activo'})
+        self.assertEqual(len(respuesta.context['ventas']), 30)
+        self.assertContains(respuesta, 'Siguiente página')
+        self.assertContains(respuesta, 'estado=activo&amp;cursor=')
+
+    def test_paneles_de_inventario_y_empleados(self):
+        crear_productos(60)
+        datos = self.client.get(reverse('inventario_panel'), {'formato': 'json'}).json()
+        self.assertEqual(len(datos['resultados']), 50)
+        siguiente = self.client.get(reverse('inventario_panel'), {'formato': 'json', 'cursor': datos['siguiente']}).json()
+        self.assertEqual(len(siguiente['resultados']), 10)
+        self.assertIsNone(siguiente['siguiente'])
+
+        empleados = self.client.get(reverse('empleados_panel'), {'formato': 'json'}).json()
+        self.assertEqual([e['id'] for e in empleados['resultados']], ['E001', 'E002'])
+
+    def test_compras_en_el_mismo_milisegundo_y_rango_de_fechas(self):
+        base = datetime.datetime(2025, 3, 1, 22, 30, 0, 123000, tzinfo=datetime.timezone.utc)
+        horas = [base + datetime.timedelta(microseconds=n * 100) for n in range(5)]
+        horas += [datetime.datetime(2025, 2, 28, 23, 59, 59, 999999, tzinfo=datetime.timezone.utc),
+                  datetime.datetime(2025, 3, 2, tzinfo=datetime.timezone.utc)]
+        for hora in horas:
+            Compra.objects.filter(pk=Compra.objects.create().pk).update(fecha=hora)
+
+        ids, cursor = [], None
+        while True:
+            consulta = {'formato': 'json', 'tamano': 2, 'desde': '2025-03-01', 'hasta': '2025-03-01'}
+            if cursor:
+                consulta['cursor'] = cursor
+            datos = self.client.get(reverse('compras_panel'), consulta).json()
+            ids += [fila['id'] for fila in datos['resultados']]
+            cursor = datos['siguiente']
+            if not cursor:
+                break
+        esperado = Compra.objects.filter(fecha__date=datetime.date(2025, 3, 1)).order_by('-fecha', '-id')
+        self.assertEqual(ids, list(esperado.values_list('id', flat=True)))
+        self.assertEqual(len(ids), 5)
+
+        # El rango va sobre la columna, así usa el índice
+        compras = filtrar_por_fecha(Compra.objects.order_by('-fecha', '-id'), {'desde': '2025-03-01'}, 'fecha__date')
+        self.assertIn('USING INDEX compra_fecha_id_idx (fecha>?)', compras.explain())
+
+    def test_cursor_manipulado_se_ignora(self):
+        crear_productos(3)
+        for valores in (['abc'], [None], [[1]], {'id': 1}, [1, 2]):
+            cursor = base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+            respuesta = self.client.get(reverse('inventario_panel'), {'formato': 'json', 'cursor': cursor})
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertEqual(len(respuesta.json()['resultados']), 3)
+
+
+class PlanesDeConsultaTests(TestCase):
+    """
+    Ejecuta cada vista y cada consulta de analytics, y pasa por EXPLAIN QUERY
+    PLAN todas las consultas que filtran o paginan sobre tablas de ``gestion``.
+    """
+
+    # Recorrido completo de una tabla sin índice (los "SCAN ... USING INDEX" sí valen)
+    ESCANEO = re.compile(r'^SCAN (gestion_\w+)$')
+    # Ordenar toda la tabla para devolver solo unas filas (LIMIT) también es un escaneo
+    ORDEN_SIN_INDICE = 'USE TEMP B-TREE FOR ORDER BY'
+    # ...salvo que la búsqueda sea por clave primaria: ordena una sola fila
+    POR_CLAVE = re.compile(r'^SEARCH gestion_\w+ USING (INTEGER PRIMARY KEY \(rowid=\?\)|INDEX sqlite_autoindex_\w+ \(id=\?\))$')
+
+    def setUp(self):
+        self.basicos = crear_basicos()
+        self.productos = crear_productos(5, stock=50)
+        Proveedor.objects.create(nombre='Proveedor')
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+
+    def recorrer_vistas(self):
+        a, b = self.productos[:2]
+        get = self.client.get
+        post = self.client.post
+
+        post(reverse('registrar_venta'), datos_venta(self.basicos, [(a, 1), (b, 2)]))
+        factura = Factura.objects.latest('pk')
+        post(reverse('registrar_compra'), datos_compra([(a, 3, '1.00')]))
+        compra = Compra.objects.latest('pk')
+        hoy = datetime.date.today().isoformat()
+
+        for nombre, params in [
+            ('panel_admin', {}),
+            ('ventas_panel', {}),
+            ('ventas_panel', {'formato': 'json', 'tamano': 1}),
+            ('ventas_panel', {'desde': hoy, 'hasta': hoy, 'estado': 'activo'}),
+            ('ventas_panel', {'empleado': 'E001', 'cliente': '1'}),
+            ('ventas_panel', {'id': factura.pk}),
+            ('compras_panel', {'tamano': 1}),
+            ('compras_panel', {'id': compra.pk, 'desde': hoy}),
+            ('empleados_panel', {'tamano': 1}),
+            ('empleados_panel', {'id': 'E001', 'formato': 'json'}),
+            ('inventario_panel', {'tamano': 1}),
+            ('inventario_panel', {'nombre': 'Producto'}),
+            ('opciones_panel', {}),
+            ('registrar_venta', {}),
+            ('registrar_compra', {}),
+        ]:
+            get(reverse(nombre), params)
+        get(reverse('busqueda_productos'), {'q': 'prod'})
+        get(reverse('detalle_factura', args=[factura.pk]))
+        get(reverse('factura_pdf', args=[factura.pk]))
+        get(reverse('modificar_venta', args=[factura.pk]))
+        get(reverse('modificar_compra', args=[compra.pk]))
+        get(reverse('modificar_producto', args=[a.pk]))
+        get(reverse('modificar_empleado', args=['E001']))
+
+        post(reverse('ventas_panel'), {'venta_id': factura.pk})
+        post(reverse('modificar_venta', args=[factura.pk]), datos_venta(self.basicos, [(a, 2)]))
+        post(reverse('modificar_compra', args=[compra.pk]), datos_compra([(a, 1, '1.00'), (b, 1, '2.00')]))
+        post(reverse('opciones_panel'), {'prefijo': 'RC'})
+
+        year = datetime.date.today().year
+        for consulta in (ventas_por_dia, ventas_por_mes, totales_por_dia, totales_por_mes):
+            list(consulta(year))
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [fila[-1] for fila in cursor.fetchall()]
+
+    def test_ninguna_consulta_recorre_tablas_completas(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.recorrer_vistas()
+
+        revisadas, escaneos = 0, []
+        for consulta in ctx.captured_queries:
+            sql = consulta['sql']
+            if not sql.startswith(('SELECT', 'UPDATE', 'DELETE')) or 'gestion_' not in sql:
+                continue
+            filtra, pagina = ' WHERE ' in sql, ' LIMIT ' in sql
+            # Listar un catálogo completo (desplegables) es intencional
+            if not filtra and not pagina:
+                continue
+            revisadas += 1
+            plan = self.plan(sql)
+            por_clave = any(self.POR_CLAVE.match(paso) for paso in plan)
+            for paso in plan:
+                # Sin WHERE, "SCAN" con LIMIT recorre la tabla en orden y se detiene pronto
+                if filtra and self.ESCANEO.match(paso):
+                    escaneos.append(f"{paso}: {sql}")
+                elif pagina and paso == self.ORDEN_SIN_INDICE and not por_clave:
+                    escaneos.append(f"{paso}: {sql}")
+
+        self.assertGreater(revisadas, 30)
+        self.assertEqual(escaneos, [], "\n".join(escaneos))
+
+    def test_cada_indice_de_factura_se_usa(self):
+        # Cada índice cuesta en cada venta: solo quedan los que usa alguna consulta
+        hoy = datetime.date.today()
+        with CaptureQueriesContext(connection) as ctx:
+            self.recorrer_vistas()
+            for params in ({'empleado': 'E001'}, {'cliente': '1'}, {'estado': 'activo', 'desde': hoy.isoformat()}):
+                self.client.get(reverse('ventas_panel'), params)
+        usados = set()
+        for consulta in ctx.captured_queries:
+            if consulta['sql'].startswith('SELECT') and 'gestion_factura' in consulta['sql']:
+                usados.update(re.findall(r'INDEX (factura_\w+)', ' '.join(self.plan(consulta['sql']))))
+        self.assertEqual(usados, {indice.name for indice in Factura._meta.indexes})
+
+
+class BusquedaProductosTests(TestCase):
+
+    def setUp(self):
+        for nombre in ('Piña Colada', 'Cerveza Águila', 'Cerveza Club Colombia', 'Agua'):
+            Producto.objects.create(nombre=nombre, precio=Decimal('1000.00'), stock=5,
+                                    cantidad_medida=1, unidad_medida='UND')
+
+    def nombres(self, texto):
+        return [p['nombre'] for p in buscar_productos(texto)]
+
+    def test_ignora_tildes_y_busca_por_prefijo(self):
+        self.assertEqual(self.nombres('pina colada'), ['Piña Colada'])
+        self.assertEqual(self.nombres('PIÑA'), ['Piña Colada'])
+        self.assertEqual(self.nombres('cerv agu'), ['Cerveza Águila'])
+        self.assertCountEqual(self.nombres('cerveza'), ['Cerveza Águila', 'Cerveza Club Colombia'])
+
+    def test_texto_sin_palabras_no_devuelve_nada(self):
+        self.assertEqual(consulta_fts('"*) OR ('), '"OR"*')
+        self.assertEqual(buscar_productos('  ()*" '), [])
+
+    def test_indice_sigue_los_cambios_de_producto(self):
+        agua = Producto.objects.get(nombre='Agua')
+        agua.nombre = 'Agua con gas'
+        agua.save()
+        self.assertEqual(self.nombres('gas'), ['Agua con gas'])
+        # Cambiar solo el stock no toca el índice
+        Producto.objects.filter(pk=agua.pk).update(stock=0)
+        self.assertEqual(self.nombres('gas'), ['Agua con gas'])
+        agua.delete()
+        self.assertEqual(self.nombres('agua'), [])
+
+    def test_panel_y_api_usan_el_indice(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        respuesta = self.client.get(reverse('inventario_panel'), {'nombre': 'pina', 'formato': 'json'})
+        self.assertEqual([p['nombre'] for p in respuesta.json()['resultados']], ['Piña Colada'])
+        respuesta = self.client.get(reverse('busqueda_productos'), {'q': 'club'})
+        self.assertEqual([p['nombre'] for p in respuesta.json()['resultados']], ['Cerveza Club Colombia'])
+
+    def test_latencia_con_50k_productos(self):
+        Producto.objects.bulk_create([
+            Producto(nombre=f"Producto {i} sabor {i % 97}", precio=Decimal('1.00'), stock=1,
+                     cantidad_medida=1, unidad_medida='UND')
+            for i in range(50_000)
+        ], batch_size=5000)
+        tiempos = []
+        for _ in range(50):
+            inicio = time.perf_counter()
+            resultados = buscar_productos('pina col')
+            tiempos.append(time.perf_counter() - inicio)
+        self.assertEqual([p['nombre'] for p in resultados], ['Piña Colada'])
+        # Objetivo: submilisegundo; se deja margen para máquinas de CI lentas
+        self.assertLess(statistics.median(tiempos), 0.005)
+
+
+class CatalogoCacheTests(TestCase):
+    TABLAS = ('gestion_producto', 'gestion_cliente', 'gestion_empleado', 'gestion_tipopago', 'gestion_detalleimpuesto')
+
+    def setUp(self):
+        cache.clear()
+        self.basicos = crear_basicos()
+        self.productos = crear_productos(3, stock=10)
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+
+    def consultas_de_catalogo(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        return [q['sql'] for q in ctx.captured_queries if any(f'FROM "{t}"' in q['sql'] for t in self.TABLAS)]
+
+    def test_formularios_reusan_los_catalogos(self):
+        self.assertTrue(self.consultas_de_catalogo(reverse('registrar_venta')))
+        # Solo se vuelve a leer el stock
+        stock = 'SELECT "gestion_producto"."id" AS "id", "gestion_producto"."stock" AS "stock" FROM "gestion_producto"'
+        self.assertEqual(self.consultas_de_catalogo(reverse('registrar_venta')), [stock])
+        # Compras comparte la lista de productos ya cargada por ventas
+        self.assertEqual(self.consultas_de_catalogo(reverse('registrar_compra')), [stock])
+
+    def test_guardar_o_borrar_invalida(self):
+        listar('productos')
+        nuevo = Producto.objects.create(nombre='Nuevo', precio=Decimal('1.00'), stock=1,
+                                        cantidad_medida=1, unidad_medida='UND')
+        self.assertIn(nuevo, listar('productos'))
+        nuevo.delete()
+        self.assertNotIn('Nuevo', [p.nombre for p in listar('productos')])
+
+    def test_venta_no_invalida_la_lista_y_el_stock_esta_al_dia(self):
+        listar('productos')
+        producto = self.productos[0]
+        self.client.post(reverse('registrar_venta'), datos_venta(self.basicos, [(producto, 4)]))
+        with self.assertNumQueries(0):
+            listar('productos')
+        stock = {p.pk: p.stock for p in productos_con_stock()}
+        self.assertEqual(stock[producto.pk], 6)
+        self.assertContains(self.client.get(reverse('registrar_venta')), 'data-stock="6"')
+
+    def test_configuracion_en_cache(self):
+        self.assertEqual(configuracion_actual().prefijo, 'RC')
+        with self.assertNumQueries(0):
+            configuracion_actual()
+        self.client.post(reverse('opciones_panel'), {'prefijo': 'XY'})
+        self.assertEqual(configuracion_actual().prefijo, 'XY')
+
+
+class RolesTests(TestCase):
+    PANELES = ('panel_admin', 'ventas_panel', 'compras_panel', 'empleados_panel', 'inventario_panel')
+
+    def setUp(self):
+        cache.clear()
+        crear_basicos()
+        self.usuario = User.objects.create_user('cajero', password='x')
+        self.admins = Group.objects.create(name='Administrador')
+
+    def consultas_de_permisos(self, nombre):
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(reverse(nombre))
+        return respuesta, [q['sql'] for q in ctx.captured_queries if 'auth_group' in q['sql'] or 'auth_user_groups' in q['sql']]
+
+    def test_paneles_no_consultan_grupos_despues_de_iniciar_sesion(self):
+        self.usuario.groups.add(self.admins)
+        self.client.post(reverse('login'), {'username': 'cajero', 'password': 'x'})
+        for nombre in self.PANELES:
+            respuesta, consultas = self.consultas_de_permisos(nombre)
+            self.assertEqual(respuesta.status_code, 200, nombre)
+            self.assertEqual(consultas, [], nombre)
+
+    def test_cambiar_grupos_invalida_la_sesion(self):
+        self.client.force_login(self.usuario)
+        respuesta, _ = self.consultas_de_permisos('panel_user')
+        self.assertEqual(respuesta.status_code, 200)
+
+        self.usuario.groups.add(self.admins)
+        respuesta, consultas = self.consultas_de_permisos('panel_admin')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(self.consultas_de_permisos('panel_user')[0].status_code, 302)
+
+        self.admins.user_set.remove(self.usuario)
+        self.assertEqual(self.consultas_de_permisos('panel_admin')[0].status_code, 302)
+
+    def test_la_revocacion_llega_a_los_demas_workers(self):
+        # Cada worker con su propia caché en memoria
+        worker = lambda nombre: override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': nombre}})
+        self.usuario.groups.add(self.admins)
+        self.client.force_login(self.usuario)
+        with worker('b'):
+            self.assertEqual(self.consultas_de_permisos('panel_admin')[0].status_code, 200)
+        with worker('a'):
+            self.admins.user_set.remove(self.usuario)
+        with worker('b'):
+            self.assertEqual(self.consultas_de_permisos('panel_admin')[0].status_code, 302)
+
+    def test_plantillas_reciben_los_roles(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        respuesta = self.client.get(reverse('panel_admin'))
+        self.assertIn('Administrador', respuesta.context['roles'])
+        self.assertTrue(respuesta.context['es_admin']())
+
+
+class DocumentosFacturaTests(TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        ajustes = override_settings(DOCUMENTOS_CACHE_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        cache.clear()
+        self.basicos = crear_basicos()
+        a, b = crear_productos(2)
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        self.client.post(reverse('registrar_venta'), datos_venta(self.basicos, [(a, 1), (b, 2)]))
+        self.factura = Factura.objects.get()
+
+    def pdf(self, **cabeceras):
+        return self.client.get(reverse('factura_pdf', args=[self.factura.pk]), headers=cabeceras)
+
+    def archivos(self):
+        return sorted(p.name for p in Path(self.directorio).iterdir())
+
+    def test_segunda_descarga_no_redibuja(self):
+        primera = self.pdf()
+        self.assertEqual(primera['Content-Type'], 'application/pdf')
+        with mock.patch('backend.webapp.gestion.views.dibujar_factura_pdf') as dibujar:
+            segunda = self.pdf()
+        dibujar.assert_not_called()
+        self.assertEqual(primera.content, segunda.content)
+        self.assertEqual(primera['ETag'], segunda['ETag'])
+
+    def test_etag_responde_304(self):
+        etag = self.pdf()['ETag']
+        with self.assertNumQueries(2):
+            respuesta = self.pdf(if_none_match=etag)
+        self.assertEqual(respuesta.status_code, 304)
+
+        detalle = self.client.get(reverse('detalle_factura', args=[self.factura.pk]))
+        self.assertContains(detalle, 'Detalle de Productos')
+        respuesta = self.client.get(reverse('detalle_factura', args=[self.factura.pk]),
+                                    headers={'if_none_match': detalle['ETag']})
+        self.assertEqual(respuesta.status_code, 304)
+
+    def test_anular_y_cambiar_prefijo_invalidan(self):
+        etag = self.pdf()['ETag']
+        self.assertEqual(len(self.archivos()), 1)
+
+        self.client.post(reverse('ventas_panel'), {'venta_id': self.factura.pk})
+        self.assertEqual(self.archivos(), [])
+        anulada = self.pdf(if_none_match=etag)
+        self.assertEqual(anulada.status_code, 200)
+        self.assertNotEqual(anulada['ETag'], etag)
+
+        self.client.post(reverse('opciones_panel'), {'prefijo': 'XY'})
+        self.assertFalse(Path(self.directorio).exists())
+        self.assertNotEqual(self.pdf()['ETag'], anulada['ETag'])
+
+    def test_factura_inexistente(self):
+        self.assertEqual(self.client.get(reverse('factura_pdf', args=['0000000000'])).status_code, 404)
+
+    def test_recorta_los_menos_usados(self):
+        for numero in range(3):
+            documentos.guardar(f"F{numero}", 'h', 'pdf', b'x' * 100)
+            # Fechas de uso distintas y crecientes
+            os.utime(Path(self.directorio) / f"F{numero}-h.pdf", (numero, numero))
+        documentos.leer('F0', 'h', 'pdf')
+        with override_settings(DOCUMENTOS_CACHE_MAX_BYTES=250):
+            documentos.guardar('F3', 'h', 'pdf', b'x' * 100)
+        self.assertEqual(self.archivos(), ['F0-h.pdf', 'F3-h.pdf'])
+
+
+def crear_facturas_exportacion(n, lineas=3):
+    basicos = crear_basicos()
+    productos = crear_productos(lineas)
+    for _ in range(n):
+        factura = crear_factura(basicos)
+        DetalleFactura.objects.bulk_create([
+            DetalleFactura(factura=factura, producto=p, cantidad=1, precio_unitario=p.precio) for p in productos
+        ])
+
+
+class ExportacionFacturasTests(TestCase):
+
+    def test_zip_con_un_pdf_por_factura(self):
+        crear_facturas_exportacion(5)
+        hoy = datetime.date.today()
+        ids = ids_facturas(hoy, hoy)
+        avances = []
+        exportacion = Exportacion(ids, procesos=1, tamano_lote=2, progreso=lambda h, t: avances.append((h, t)))
+        contenido = b''.join(exportacion)
+
+        with zipfile.ZipFile(BytesIO(contenido)) as archivo:
+            self.assertEqual(archivo.namelist(), [f"Factura_{i}.pdf" for i in ids])
+            self.assertTrue(archivo.read(f"Factura_{ids[0]}.pdf").startswith(b'%PDF'))
+        self.assertEqual(avances, [(2, 5), (4, 5), (5, 5)])
+        self.assertEqual(exportacion.paginas, 5)
+
+    def test_comando_informa_rendimiento(self):
+        crear_facturas_exportacion(2)
+        salida = Path(tempfile.mkdtemp()) / 'facturas.zip'
+        self.addCleanup(shutil.rmtree, salida.parent)
+        texto = StringIO()
+        call_command('exportar_facturas', desde=datetime.date.today().isoformat(), salida=str(salida),
+                     procesos=1, stdout=texto, stderr=StringIO())
+        self.assertIn('2 facturas (2 páginas)', texto.getvalue())
+        self.assertIn('páginas/s por núcleo', texto.getvalue())
+        self.assertEqual(len(zipfile.ZipFile(salida).namelist()), 2)
+
+    def test_admin_descarga_zip_sin_pool_de_procesos(self):
+        crear_facturas_exportacion(3)
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        url = reverse('admin:gestion_factura_exportar_pdf')
+        self.assertContains(self.client.get(url), 'Exportar facturas a PDF')
+
+        hoy = datetime.date.today().isoformat()
+        with mock.patch('backend.webapp.gestion.exportacion.ProcessPoolExecutor') as pool:
+            respuesta = self.client.get(url, {'desde': hoy, 'hasta': hoy})
+            self.assertEqual(respuesta['Content-Type'], 'application/zip')
+            with zipfile.ZipFile(BytesIO(b''.join(respuesta.streaming_content))) as archivo:
+                self.assertEqual(len(archivo.namelist()), 3)
+        pool.assert_not_called()
+
+
+class ExportacionParalelaTests(TransactionTestCase):
+
+    def test_comando_reparte_los_lotes_entre_procesos(self):
+        crear_facturas_exportacion(30)
+        salida = Path(tempfile.mkdtemp()) / 'facturas.zip'
+        self.addCleanup(shutil.rmtree, salida.parent)
+        texto = StringIO()
+        call_command('exportar_facturas', desde=datetime.date.today().isoformat(), salida=str(salida),
+                     procesos=2, lote=5, stdout=texto, stderr=StringIO())
+        self.assertIn('con 2 procesos', texto.getvalue())
+        self.assertEqual(len(zipfile.ZipFile(salida).namelist()), 30)
+
+
+class SnapshotAnalyticsTests(TransactionTestCase):
+
+    def setUp(self):
+        self.directorio = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        self.engine = create_engine(f"sqlite:///{connection.settings_dict['NAME']}")
+        self.addCleanup(self.engine.dispose)
+        self.basicos = crear_basicos()
+        self.productos = crear_productos(2)
+
+    def vender(self, *cantidades):
+        factura = crear_factura(self.basicos)
+        DetalleFactura.objects.bulk_create([
+            DetalleFactura(factura=factura, producto=p, cantidad=c, precio_unitario=p.precio)
+            for p, c in zip(self.productos, cantidades)
+        ])
+        return factura
+
+    def activas(self):
+        tabla = snapshot.lineas(columnas=['factura_id', 'cantidad'], directorio=self.directorio)
+        return sorted(zip(tabla['factura_id'].to_pylist(), tabla['cantidad'].to_pylist()))
+
+    def test_triggers_registran_cada_factura_tocada(self):
+        factura = self.vender(1, 2)
+        Factura.objects.filter(pk=factura.pk).update(anulado=True)
+        self.assertEqual(set(CambioFactura.objects.values_list('factura_id', flat=True)), {factura.pk})
+
+    def test_etl_incremental_refleja_ventas_anulaciones_y_borrados(self):
+        primera = self.vender(1)
+        snapshot.actualizar(self.engine, self.directorio)
+        self.assertEqual(self.activas(), [(primera.pk, 1)])
+        self.assertFalse(CambioFactura.objects.exists())
+
+        segunda = self.vender(2, 3)
+        Factura.objects.filter(pk=primera.pk).update(anulado=True)
+        resumen = snapshot.actualizar(self.engine, self.directorio)
+        self.assertEqual(resumen['facturas'], 2)
+        self.assertEqual(self.activas(), [(segunda.pk, 2), (segunda.pk, 3)])
+
+        segunda.delete()
+        snapshot.actualizar(self.engine, self.directorio)
+        self.assertEqual(self.activas(), [])
+        self.assertEqual(snapshot.meses_disponibles(self.directorio), [datetime.date.today().strftime('%Y-%m')])
+
+        # Reconstruir desde cero da lo mismo que el camino incremental
+        snapshot.actualizar(self.engine, self.directorio, completo=True)
+        tabla = snapshot.abrir(next((self.directorio / 'ventas').iterdir()))
+        self.assertEqual(tabla['factura_id'].to_pylist(), [primera.pk])
+        self.assertEqual(tabla['anulado'].to_pylist(), [True])
+
+
+    def test_factura_cambiada_de_fecha_dos_veces_queda_en_un_solo_mes(self):
+        factura = self.vender(1)
+        snapshot.actualizar(self.engine, self.directorio)
+        for fecha in (datetime.date(2024, 2, 10), datetime.date(2024, 3, 10)):
+            Factura.objects.filter(pk=factura.pk).update(fecha_emision=fecha)
+            snapshot.actualizar(self.engine, self.directorio)
+        self.assertEqual(snapshot.meses_disponibles(self.directorio), ['2024-03'])
+        self.assertEqual(self.activas(), [(factura.pk, 1)])
+
+class PreprocesamientoTests(TransactionTestCase):
+    """``preprocesamiento.agrupar`` sobre el snapshot contra la consulta SQL del tablero."""
+
+    def setUp(self):
+        self.directorio = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        self.engine = create_engine(f"sqlite:///{connection.settings_dict['NAME']}")
+        self.addCleanup(self.engine.dispose)
+        basicos = crear_basicos()
+        otro = Empleado.objects.create(id='E002', nombre='Beto', apellido='Caja', celular=3100000002)
+        self.productos = crear_productos(3)
+        a, b, c = self.productos
+        ventas = [
+            ('2024-05-01', '09:15:00', basicos['empleado'], [(a, 2), (b, 1)]),
+            ('2024-05-01', '14:30:00.250000', otro, [(a, 1), (c, 4)]),
+            ('2024-05-20', '10:00:00', otro, [(b, 3)]),
+            ('2024-05-31', '14:59:59', basicos['empleado'], [(c, 1), (a, 5)]),
+            ('2024-06-02', '22:05:00', otro, [(a, 1)]),
+        ]
+        for fecha, hora, empleado, lineas in ventas:
+            factura = crear_factura({**basicos, 'empleado': empleado})
+            # La fecha y la hora de emisión son auto_now_add
+            Factura.objects.filter(pk=factura.pk).update(fecha_emision=fecha, hora_emision=hora)
+            DetalleFactura.objects.bulk_create([
+                DetalleFactura(factura=factura, producto=p, cantidad=n, precio_unitario=p.precio + p.pk)
+                for p, n in lineas
+            ])
+        Factura.objects.filter(fecha_emision='2024-05-20').update(anulado=True)
+
+    def test_agrupar_coincide_con_sql(self):
+        snapshot.actualizar(self.engine, self.directorio)
+        tabla = snapshot.lineas(
+            columnas=['fecha', 'hora', 'empleado_id', 'producto_id', 'cantidad', 'total'], directorio=self.directorio
+        )
+        # Un producto que la dimensión todavía no tiene: queda fuera, como en el JOIN
+        faltante = self.productos[2]
+        productos = snapshot.dimension('productos', self.directorio)
+        productos = productos.filter(pc.not_equal(productos['producto_id'], faltante.pk))
+        df = preprocesamiento.desde_snapshot(tabla, snapshot.dimension('empleados', self.directorio), productos)
+
+        mayo = (datetime.date(2024, 5, 1), datetime.date(2024, 5, 31))
+        filtros = [
+            (None, None, None, None),
+            (*mayo, None, None),
+            (datetime.date(2024, 5, 1), datetime.date(2024, 5, 1), None, None),
+            (None, None, 10, 14),
+            (*mayo, 14, 14),
+            (None, None, 23, 23),
+        ]
+        for agrupacion in ('empleado', 'producto', 'dia'):
+            for filtro in filtros:
+                with self.subTest(agrupacion=agrupacion, filtro=filtro):
+                    esperado = dashboard.ventas_agrupadas.__wrapped__(self.engine, agrupacion, filtro, ('sql',))
+                    if agrupacion == 'producto':
+                        esperado = esperado[esperado['producto_nombre'] != faltante.nombre]
+                    obtenido = preprocesamiento.agrupar(df, agrupacion, filtro)
+                    self.assertEqual(self.filas(obtenido, esperado.columns), self.filas(esperado, esperado.columns))
+
+    def test_la_marca_del_tablero_ve_ediciones_que_no_cambian_el_total(self):
+        marca = dashboard.marca_de_agua(self.engine)
+        # Otro producto en una línea, sin tocar el total de la factura
+        linea = DetalleFactura.objects.filter(producto=self.productos[0]).first()
+        DetalleFactura.objects.filter(pk=linea.pk).update(producto=self.productos[1])
+        self.assertNotEqual(dashboard.marca_de_agua(self.engine), marca)
+
+        marca = dashboard.marca_de_agua(self.engine)
+        cubo.reconstruir()
+        self.assertNotEqual(dashboard.marca_de_agua(self.engine), marca)
+
+    @staticmethod
+    def filas(df, columnas):
+        filas = df[list(columnas)].astype(object).itertuples(index=False)
+        return sorted(tuple(round(v, 2) if isinstance(v, float) else v for v in fila) for fila in filas)
+
+class CuboVentasTests(TestCase):
+    def setUp(self):
+        self.basicos = crear_basicos()
+        self.a, self.b = crear_productos(2)
+        self.hoy = datetime.date.today()
+
+    def vender(self, *lineas):
+        factura = crear_factura(self.basicos)
+        DetalleFactura.objects.bulk_create([
+            DetalleFactura(factura=factura, producto=p, cantidad=c, precio_unitario=p.precio) for p, c in lineas
+        ])
+        return factura
+
+    def celdas(self, modelo, clave):
+        return {
+            (getattr(c, clave), c.producto_id): (c.lineas, c.cantidad, c.total)
+            for c in modelo.objects.all()
+        }
+
+    def estado(self):
+        return [self.celdas(CuboHora, 'hora'), self.celdas(CuboDia, 'fecha'), self.celdas(CuboMes, 'mes')]
+
+    def test_triggers_siguen_ventas_ediciones_y_anulaciones(self):
+        primera = self.vender((self.a, 2), (self.b, 1))
+        self.vender((self.a, 3))
+        mes = self.hoy.replace(day=1)
+        self.assertEqual(self.celdas(CuboDia, 'fecha'), {
+            (self.hoy, self.a.pk): (2, 5, Decimal('5000.00')),
+            (self.hoy, self.b.pk): (1, 1, Decimal('1000.00')),
+        })
+        self.assertEqual(self.celdas(CuboMes, 'mes')[(mes, self.a.pk)], (2, 5, Decimal('5000.00')))
+
+        linea = primera.detalles.get(producto=self.b)
+        linea.cantidad = 4
+        linea.save()
+        self.assertEqual(self.celdas(CuboDia, 'fecha')[(self.hoy, self.b.pk)], (1, 4, Decimal('4000.00')))
+
+        # Guardar sin cambios no mueve nada; anular saca la factura y borra las celdas vacías
+        primera.save()
+        primera.anulado = True
+        primera.save()
+        self.assertEqual(self.celdas(CuboDia, 'fecha'), {(self.hoy, self.a.pk): (1, 3, Decimal('3000.00'))})
+        self.assertEqual(len(self.celdas(CuboHora, 'hora')), 1)
+
+        Factura.objects.filter(pk=primera.pk).update(anulado=False)
+        self.assertEqual(self.celdas(CuboDia, 'fecha')[(self.hoy, self.b.pk)], (1, 4, Decimal('4000.00')))
+
+        primera.delete()
+        self.assertEqual(set(self.celdas(CuboMes, 'mes')), {(mes, self.a.pk)})
+
+    def test_reconstruir_da_lo_mismo_que_los_triggers(self):
+        self.vender((self.a, 1), (self.b, 2))
+        otra = self.vender((self.b, 5))
+        hace_un_mes = self.hoy.replace(day=1) - datetime.timedelta(days=1)
+        Factura.objects.filter(pk=otra.pk).update(fecha_emision=hace_un_mes, hora_emision=datetime.time(23, 30))
+        incremental = self.estado()
+
+        self.assertEqual(cubo.reconstruir(), 3)
+        self.assertEqual(self.estado(), incremental)
+        self.assertIn((23, self.b.pk), incremental[0])
+        self.assertIn((hace_un_mes.replace(day=1), self.b.pk), incremental[2])
+
+    def test_analytics_por_dia_y_mes_leen_el_cubo(self):
+        self.vender((self.a, 2), (self.b, 1))
+        self.vender((self.a, 1))
+        # Celdas del cubo y nombres de productos
+        with self.assertNumQueries(2):
+            por_dia = list(ventas_por_dia(self.hoy.year))
+        self.assertEqual(
+            sorted((v['dia'], v['producto__nombre'], v['total']) for v in por_dia),
+            [(self.hoy, 'Producto 0', 3), (self.hoy, 'Producto 1', 1)],
+        )
+        por_mes = list(ventas_por_mes(self.hoy.year))
+        self.assertEqual({v['producto__nombre']: v['total'] for v in por_mes}, {'Producto 0': 3, 'Producto 1': 1})
+        self.assertEqual({v['mes'] for v in por_mes}, {self.hoy.replace(day=1)})
+
+
+class SeriesVentasTests(TestCase):
+    def setUp(self):
+        self.basicos = crear_basicos()
+        self.a, self.b, self.c = crear_productos(3)
+        self.lunes = datetime.date(2025, 3, 3)
+
+    def vender(self, fecha, hora, *lineas):
+        factura = crear_factura(self.basicos)
+        DetalleFactura.objects.bulk_create([
+            DetalleFactura(factura=factura, producto=p, cantidad=c, precio_unitario=p.precio) for p, c in lineas
+        ])
+        Factura.objects.filter(pk=factura.pk).update(fecha_emision=fecha, hora_emision=datetime.time(hora))
+
+    def test_matriz_densa_por_dia_semana_mes_y_hora(self):
+        self.vender(self.lunes, 10, (self.a, 2), (self.b, 1))
+        self.vender(self.lunes + datetime.timedelta(days=8), 22, (self.a, 3))
+        desde, hasta = self.lunes, self.lunes + datetime.timedelta(days=13)
+
+        with self.assertNumQueries(2):
+            por_dia = serie(desde, hasta)
+        self.assertEqual(por_dia.valores.shape, (2, 14))
+        self.assertEqual(list(por_dia.nombres), ['Producto 0', 'Producto 1'])
+        self.assertEqual(por_dia.periodos[0], np.datetime64('2025-03-03'))
+        self.assertEqual(por_dia.valores[0, [0, 8]].tolist(), [2, 3])
+        self.assertEqual(por_dia.valores.sum(), 6)
+
+        por_semana = serie(desde, hasta, 'semana', medida='total')
+        self.assertEqual(por_semana.valores.tolist(), [[2000, 3000], [1000, 0]])
+        self.assertEqual(por_semana.periodos.tolist(), [datetime.date(2025, 3, 3), datetime.date(2025, 3, 10)])
+
+        por_mes = serie(datetime.date(2025, 2, 15), hasta, 'mes')
+        self.assertEqual(por_mes.valores.tolist(), [[0, 5], [0, 1]])
+
+        por_hora = serie(desde, hasta, 'hora', dimension='empleado')
+        self.assertEqual(list(por_hora.nombres), ['Ana Bar'])
+        self.assertEqual(por_hora.valores[0, [10, 22]].tolist(), [3, 3])
+
+        self.assertEqual(serie(datetime.date(2024, 1, 1), datetime.date(2024, 1, 31)).valores.shape, (0, 31))
+
+    def test_metricas_derivadas(self):
+        for dia, cantidades in enumerate([(1, 5, 0), (2, 0, 4), (3, 1, 2)] * 3):
+            lineas = [(p, c) for p, c in zip((self.a, self.b, self.c), cantidades) if c]
+            self.vender(self.lunes + datetime.timedelta(days=dia), 12, *lineas)
+        datos = serie(self.lunes, self.lunes + datetime.timedelta(days=8))
+
+        self.assertEqual(datos.acumulado_movil(3)[0].tolist(), [1, 3, 6, 6, 6, 6, 6, 6, 6])
+        self.assertEqual(datos.totales().tolist(), [6, 6, 6] * 3)
+
+        variacion = datos.variacion_semanal()
+        self.assertTrue(np.isnan(variacion[:, :7]).all())
+        self.assertEqual(variacion[:, 7].tolist(), [1, -5, 4])
+        with self.assertRaises(ValueError):
+            serie(self.lunes, self.lunes, 'mes').variacion_semanal()
+
+        indices, valores = datos.top(2)
+        self.assertEqual(indices[:, :3].tolist(), [[1, 2, 0], [0, 0, 2]])
+        self.assertEqual(valores[:, :3].tolist(), [[5, 4, 3], [1, 2, 2]])
+
+
+class ApiAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.basicos = crear_basicos()
+        self.a, self.b = crear_productos(2)
+        self.hoy = datetime.date.today()
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+
+    def vender(self, *lineas):
+        factura = crear_factura(self.basicos)
+        DetalleFactura.objects.bulk_create([
+            DetalleFactura(factura=factura, producto=p, cantidad=c, precio_unitario=p.precio) for p, c in lineas
+        ])
+
+    def pedir(self, granularidad, dimension, **params):
+        url = reverse('api_analytics', args=[granularidad, dimension])
+        etag = params.pop('etag', None)
+        return self.client.get(url, params, **({'HTTP_IF_NONE_MATCH': etag} if etag else {}))
+
+    def test_json_columnar_y_304_hasta_que_cambian_los_datos(self):
+        self.vender((self.a, 2), (self.b, 1))
+        rango = {'desde': self.hoy.isoformat(), 'hasta': self.hoy.isoformat()}
+        respuesta = self.pedir('dia', 'producto', **rango)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(respuesta['ETag'].startswith('W/'))
+        self.assertEqual(respuesta.json(), {
+            'granularidad': 'dia', 'dimension': 'producto', 'medida': 'cantidad', **rango,
+            'periodos': [self.hoy.isoformat()],
+            'claves': [self.a.pk, self.b.pk],
+            'nombres': ['Producto 0', 'Producto 1'],
+            'celdas': {'fila': [0, 1], 'periodo': [0, 0], 'valor': [2, 1]},
+        })
+
+        self.assertEqual(self.pedir('dia', 'producto', etag=respuesta['ETag'], **rango).status_code, 304)
+        self.vender((self.a, 1))
+        nueva = self.pedir('dia', 'producto', etag=respuesta['ETag'], **rango)
+        self.assertEqual(nueva.status_code, 200)
+        self.assertEqual(nueva.json()['celdas']['valor'], [3, 1])
+        self.assertNotEqual(nueva['ETag'], respuesta['ETag'])
+
+    def test_reconstruir_el_cubo_cambia_la_etag(self):
+        self.vender((self.a, 2))
+        # Como una carga con los triggers suspendidos: el cubo cambia sin pasar por el registro
+        for modelo in (CuboHora, CuboDia, CuboMes):
+            modelo.objects.update(cantidad=99)
+        vieja = self.pedir('dia', 'producto')
+        self.assertEqual(vieja.json()['celdas']['valor'], [99])
+
+        cubo.reconstruir()
+        nueva = self.pedir('dia', 'producto', etag=vieja['ETag'])
+        self.assertEqual(nueva.status_code, 200)
+        self.assertEqual(nueva.json()['celdas']['valor'], [2])
+
+    def test_renombrar_en_un_worker_cambia_la_etag_en_los_demas(self):
+        # Cada worker con su propia caché en memoria
+        worker = lambda nombre: override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': nombre}})
+        self.vender((self.a, 2))
+        with worker('b'):
+            vieja = self.pedir('dia', 'producto')
+            self.assertEqual(vieja.json()['nombres'], ['Producto 0'])
+        with worker('a'):
+            self.a.nombre = 'Cerveza'
+            self.a.save()
+        with worker('b'):
+            nueva = self.pedir('dia', 'producto', etag=vieja['ETag'])
+        self.assertEqual(nueva.status_code, 200)
+        self.assertNotEqual(nueva['ETag'], vieja['ETag'])
+        self.assertEqual(nueva.json()['nombres'], ['Cerveza'])
+
+    def test_respuesta_en_cache_no_recalcula(self):
+        self.vender((self.a, 2))
+        with mock.patch.object(analytics_api, 'columnas', wraps=analytics_api.columnas) as columnas:
+            primera = self.pedir('hora', 'empleado', medida='total')
+            segunda = self.pedir('hora', 'empleado', medida='total')
+        self.assertEqual(columnas.call_count, 1)
+        self.assertEqual(primera.content, segunda.content)
+        self.assertEqual(primera.json()['nombres'], ['Ana Bar'])
+        self.assertEqual(primera.json()['celdas']['valor'], [2000.0])
+
+    def test_tipo_pago_desde_el_desglose(self):
+        otro = TipoPago.objects.create(nombre='Tarjeta')
+        ayer = self.hoy - datetime.timedelta(days=1)
+        VentaDiariaDesglose.objects.bulk_create([
+            VentaDiariaDesglose(fecha=self.hoy, tipo_pago=self.basicos['tipo_pago'], empleado=self.basicos['empleado'],
+                                cantidad_facturas=2, total=Decimal('30.50')),
+            VentaDiariaDesglose(fecha=ayer, tipo_pago=otro, empleado=self.basicos['empleado'],
+                                cantidad_facturas=1, total=Decimal('12.25')),
+        ])
+        datos = self.pedir('mes', 'tipo_pago', medida='total', desde=ayer.isoformat(), hasta=self.hoy.isoformat()).json()
+        self.assertEqual(datos['nombres'], ['Efectivo', 'Tarjeta'])
+        self.assertEqual(datos['periodos'][-1], self.hoy.strftime('%Y-%m'))
+        self.assertEqual(
+            sorted(zip(datos['celdas']['fila'], datos['celdas']['valor'])), [(0, 30.5), (1, 12.25)],
+        )
+
+    def test_peticiones_invalidas(self):
+        for granularidad, dimension, params in [
+            ('hora', 'tipo_pago', {}),
+            ('anio', 'producto', {}),
+            ('dia', 'cliente', {}),
+            ('dia', 'producto', {'medida': 'propina'}),
+            ('dia', 'producto', {'desde': '2025-13-01'}),
+            ('dia', 'producto', {'desde': '2025-02-01', 'hasta': '2025-01-01'}),
+            ('dia', 'producto', {'desde': '2015-01-01', 'hasta': '2025-01-01'}),
+        ]:
+            respuesta = self.pedir(granularidad, dimension, **params)
+            self.assertEqual(respuesta.status_code, 400, (granularidad, dimension, params))
+            self.assertIn('error', respuesta.json())
+
+        self.client.logout()
+        self.assertEqual(self.pedir('dia', 'producto').status_code, 302)
+
+
+class PlanillasTests(TestCase):
+    def setUp(self):
+        self.basicos = crear_basicos()
+        self.a, self.b = crear_productos(2)
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+
+    def vender(self, lineas, **extra):
+        factura = crear_factura(self.basicos, **extra)
+        DetalleFactura.objects.bulk_create([
+            DetalleFactura(factura=factura, producto=p, cantidad=c, precio_unitario=p.precio) for p, c in lineas
+        ])
+        return factura
+
+    def descargar(self, tabla, formato, **params):
+        respuesta = self.client.get(reverse('exportar_tabla', args=[tabla, formato]), params)
+        self.assertEqual(respuesta.status_code, 200)
+        return b''.join(respuesta.streaming_content)
+
+    def test_csv_de_ventas_con_filtros(self):
+        primera = self.vender([(self.a, 2), (self.b, 1)])
+        otro = Empleado.objects.create(id='E002', nombre='Beto', apellido='Caja', celular=3100000002)
+        self.vender([(self.b, 5)], empleado=otro)
+        hoy = datetime.date.today().isoformat()
+
+        filas = self.descargar('ventas', 'csv', desde=hoy, hasta=hoy, empleado='E001').decode('utf-8-sig').splitlines()
+        self.assertEqual(filas[0], 'Factura,Fecha,Hora,Empleado,Tipo de pago,Anulada,Id producto,Producto,Cantidad,Precio unitario')
+        self.assertEqual([f.split(',')[0] for f in filas[1:]], [primera.pk, primera.pk])
+        self.assertEqual(filas[1].split(',')[-3:], ['Producto 0', '2', '1000.00'])
+        ayer = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+        self.assertEqual(len(self.descargar('ventas', 'csv', hasta=ayer).splitlines()), 1)
+        self.assertEqual(self.client.get(reverse('exportar_tabla', args=['clientes', 'csv'])).status_code, 404)
+
+    def test_xlsx_de_inventario_y_compras(self):
+        compra = Compra.objects.create(proveedor=Proveedor.objects.create(nombre='Distribuidora & Cía'))
+        DetalleCompra.objects.create(compra=compra, producto=self.a, cantidad=3, costo_producto=Decimal('500.00'))
+        for tabla, esperado in (('inventario', ['1', 'Producto 0', '1000.00', '100']), ('compras', [str(compra.pk)])):
+            with zipfile.ZipFile(BytesIO(self.descargar(tabla, 'xlsx'))) as libro:
+                self.assertIn('xl/workbook.xml', libro.namelist())
+                hoja = libro.read('xl/worksheets/sheet1.xml').decode()
+            filas = re.findall(r'<row>(.*?)</row>', hoja)
+            valores = re.findall(r'<(?:v|t)>(.*?)</(?:v|t)>', filas[1])
+            self.assertEqual(len(filas), 2 if tabla == 'compras' else 3)
+            self.assertEqual(valores[:len(esperado)], esperado)
+        self.assertIn('Distribuidora &amp; Cía', hoja)
+
+    def test_accion_del_admin_exporta_lo_seleccionado(self):
+        elegida = self.vender([(self.a, 1)])
+        self.vender([(self.b, 1)])
+        respuesta = self.client.post(reverse('admin:gestion_factura_changelist'), {
+            'action': 'exportar_csv', '_selected_action': [elegida.pk],
+        })
+        filas = b''.join(respuesta.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual([f.split(',')[0] for f in filas[1:]], [elegida.pk])
+
+    def pico_de_memoria(self, formato):
+        with mock.patch.object(planillas, 'TAMANO_BLOQUE', 500):
+            respuesta = planillas.respuesta('ventas', formato, planillas.filas('ventas'))
+            tracemalloc.start()
+            try:
+                tamano = sum(len(bloque) for bloque in respuesta.streaming_content)
+                return tamano, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    def test_memoria_constante(self):
+        for lotes in (5, 20):
+            while Factura.objects.count() < lotes:
+                self.vender([(self.a, 1), (self.b, 2)] * 250)
+            picos = {formato: self.pico_de_memoria(formato) for formato in ('csv', 'xlsx')}
+            if lotes == 5:
+                antes = picos
+        # Cuatro veces más líneas (20.000): la salida crece, el pico de memoria no
+        for formato, (tamano, pico) in picos.items():
+            self.assertGreater(tamano, 3 * antes[formato][0], formato)
+            self.assertLess(pico, 2_000_000, formato)
+            self.assertLess(pico, 1.5 * antes[formato][1], formato)
+
+
+class GeneradorDatosTests(TransactionTestCase):
+
+    def setUp(self):
+        self.desde, self.hasta = datetime.date(2025, 3, 3), datetime.date(2025, 3, 30)
+
+    def generar(self, **opciones):
+        call_command(
+            'generar_datos', desde=self.desde, hasta=self.hasta, procesos=1, stdout=StringIO(), stderr=StringIO(),
+            **opciones,
+        )
+
+    def triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' ORDER BY name")
+            return cursor.fetchall()
+
+    def test_genera_ventas_coherentes_y_restaura_los_triggers(self):
+        triggers = self.triggers()
+        # Una factura previa sin secuencia: los consecutivos siguen después de ella
+        basicos = crear_basicos()
+        Factura.objects.filter(pk=crear_factura(basicos).pk).update(id='2503030007', fecha_emision=self.desde)
+
+        self.generar(lineas=4000, productos=20, empleados=3)
+        self.assertEqual(self.triggers(), triggers)
+        lineas = DetalleFactura.objects.count()
+        self.assertAlmostEqual(lineas, 4000, delta=400)
+        self.assertEqual(Producto.objects.count(), 20)
+        self.assertEqual(Empleado.objects.count(), 3)
+
+        facturas = Factura.objects.filter(fecha_emision__range=(self.desde, self.hasta))
+        primer_dia = sorted(facturas.filter(fecha_emision=self.desde).values_list('id', 'hora_emision'))
+        self.assertEqual(primer_dia[1][0], '2503030008')
+        self.assertEqual([h for _, h in primer_dia[1:]], sorted(h for _, h in primer_dia[1:]))
+        self.assertEqual(SecuenciaFactura.objects.get(fecha=self.desde).ultimo, int(primer_dia[-1][0][6:]))
+
+        # Noches y fines de semana concentran las ventas
+        noche = facturas.filter(hora_emision__gte=datetime.time(19)).count()
+        self.assertGreater(noche, facturas.count() / 2)
+        sabados = facturas.filter(fecha_emision__week_day=7).count()
+        lunes = facturas.filter(fecha_emision__week_day=2).count()
+        self.assertGreater(sabados, 2 * lunes)
+
+        # Resumen y cubo reconstruidos con los datos cargados
+        activas = facturas.filter(anulado=False)
+        self.assertEqual(
+            VentaDiaria.objects.aggregate(s=Sum('total'))['s'], activas.aggregate(s=Sum('total'))['s'],
+        )
+        self.assertEqual(
+            CuboDia.objects.aggregate(s=Sum('cantidad'))['s'],
+            DetalleFactura.objects.filter(factura__anulado=False).aggregate(s=Sum('cantidad'))['s'],
+        )
+
+    def test_triggers_de_una_carga_interrumpida_se_recrean(self):
+        triggers = self.triggers()
+        engine = generador.engine_de_django()
+        self.addCleanup(engine.dispose)
+        # Como un proceso matado dentro del bloque: nunca llega a salir
+        suspension = generador.triggers_suspendidos(engine)
+        suspendidos = suspension.__enter__()
+        self.addCleanup(suspension.__exit__, None, None, None)
+        self.assertTrue(suspendidos)
+        self.assertLess(len(self.triggers()), len(triggers))
+
+        salida = StringIO()
+        call_command('generar_datos', restaurar_triggers=True, stdout=salida)
+        self.assertIn('Triggers recreados', salida.getvalue())
+        self.assertEqual(self.triggers(), triggers)
+        self.assertFalse(TriggerSuspendido.objects.exists())
+
+        # Otra vez interrumpida: la siguiente carga los recrea al empezar
+        otra = generador.triggers_suspendidos(engine)
+        otra.__enter__()
+        self.addCleanup(otra.__exit__, None, None, None)
+        self.generar(lineas=200, productos=5)
+        self.assertEqual(self.triggers(), triggers)
+
+    def test_la_carga_cambia_la_version_de_los_datos(self):
+        antes = versiones.leer(versiones.DATOS)
+        self.generar(lineas=200, productos=5, con_triggers=True)
+        self.assertGreater(versiones.leer(versiones.DATOS), antes)
+
+    def test_otra_corrida_continua_la_numeracion_con_triggers(self):
+        self.generar(lineas=500, productos=5)
+        self.generar(lineas=500, productos=5, con_triggers=True, semilla=1)
+        self.assertEqual(Producto.objects.count(), 5)
+        self.assertEqual(Factura.objects.values('id').distinct().count(), Factura.objects.count())
+        # Con los triggers activos la segunda carga sí queda en el registro de cambios
+        self.assertTrue(CambioFactura.objects.exists())
+        self.assertEqual(
+            CuboDia.objects.aggregate(s=Sum('lineas'))['s'],
+            DetalleFactura.objects.filter(factura__anulado=False).count(),
+        )
+
+
+def nivel_mini(test):
+    """Plantillas en un directorio temporal y un nivel ``mini`` de 400 líneas durante ``test``."""
+    directorio = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+    ajustes = override_settings(DATOS_PRUEBA_DIR=directorio)
+    ajustes.enable()
+    test.addCleanup(ajustes.disable)
+    niveles = mock.patch.dict(datos_prueba.NIVELES, {'mini': 400})
+    niveles.start()
+    test.addCleanup(niveles.stop)
+    return Path(directorio)
+
+
+class DatosPruebaTests(TransactionTestCase):
+
+    def setUp(self):
+        nivel_mini(self)
+
+    def test_construye_una_vez_y_restaura_los_mismos_datos(self):
+        plantilla, construida = datos_prueba.construir('mini', procesos=1)
+        self.assertTrue(construida)
+        self.assertEqual(datos_prueba.construir('mini'), (plantilla, False))
+        self.assertIn(datos_prueba.huella(), plantilla.name)
+
+        cache.set('analytics:api:vieja', b'{}')
+        datos_prueba.restaurar('mini')
+        self.assertIsNone(cache.get('analytics:api:vieja'))
+        lineas = DetalleFactura.objects.count()
+        self.assertAlmostEqual(lineas, 400, delta=80)
+        self.assertEqual(
+            CuboDia.objects.aggregate(s=Sum('cantidad'))['s'],
+            DetalleFactura.objects.filter(factura__anulado=False).aggregate(s=Sum('cantidad'))['s'],
+        )
+
+        # Lo que se cambie después se pierde al restaurar otra vez
+        DetalleFactura.objects.all().delete()
+        datos_prueba.restaurar('mini')
+        self.assertEqual(DetalleFactura.objects.count(), lineas)
+
+    def test_otra_receta_construye_otra_plantilla_y_borra_la_vieja(self):
+        vieja, _ = datos_prueba.construir('mini', procesos=1)
+        with mock.patch.object(datos_prueba, 'FORMATO', datos_prueba.FORMATO + 1):
+            nueva, construida = datos_prueba.construir('mini', procesos=1)
+        self.assertTrue(construida)
+        self.assertNotEqual(nueva, vieja)
+        self.assertFalse(vieja.exists())
+        with self.assertRaises(ValueError):
+            datos_prueba.ruta('enorme')
+
+
+class BenchmarkVistasTests(TransactionTestCase):
+
+    def setUp(self):
+        self.directorio = nivel_mini(self)
+
+    def benchmark(self, **opciones):
+        call_command(
+            'benchmark_vistas', niveles=['mini'], repeticiones=1, linea_base=str(self.directorio / 'base.json'),
+            stdout=StringIO(), **opciones,
+        )
+
+    def test_mide_las_vistas_y_detecta_regresiones(self):
+        self.benchmark(guardar_linea_base=True, resultados=str(self.directorio / 'resultados.json'))
+        resultados = linea_base.cargar(self.directorio / 'resultados.json')
+        medidos = resultados['niveles']['mini']
+        self.assertEqual(set(medidos), set(ESCENARIOS))
+        for metricas in medidos.values():
+            self.assertGreater(metricas['consultas'], 0)
+            self.assertGreater(metricas['instrucciones_sqlite'], 0)
+            self.assertGreater(metricas['tiempo_ms'], 0)
+        self.assertEqual(linea_base.cargar(self.directorio / 'base.json')['niveles'], resultados['niveles'])
+        # Corre sobre una copia: la base de pruebas sigue vacía
+        self.assertFalse(Factura.objects.exists())
+
+        # Una consulta más es regresión; medio milisegundo más no
+        peor = {'maquina': resultados['maquina'], 'niveles': {'mini': {'panel_admin': dict(medidos['panel_admin'])}}}
+        peor['niveles']['mini']['panel_admin']['tiempo_ms'] += 0.5
+        self.assertEqual(linea_base.comparar(peor, resultados), [])
+        peor['niveles']['mini']['panel_admin']['consultas'] += 1
+        self.assertEqual(
+            linea_base.comparar(peor, resultados),
+            [('mini', 'panel_admin', 'consultas', medidos['panel_admin']['consultas'],
+              medidos['panel_admin']['consultas'] + 1)],
+        )
+
+        # El doble de tiempo es regresión en la misma máquina; en otra no dice nada
+        lento = {'maquina': resultados['maquina'], 'niveles': {'mini': {'panel_admin': dict(medidos['panel_admin'])}}}
+        lento['niveles']['mini']['panel_admin']['tiempo_ms'] = 2 * medidos['panel_admin']['tiempo_ms'] + 10
+        self.assertEqual([r[2] for r in linea_base.comparar(lento, resultados)], ['tiempo_ms'])
+        lento['maquina'] = {**resultados['maquina'], 'cpus': 64}
+        self.assertEqual(linea_base.comparar(lento, resultados), [])
+
+        base = linea_base.cargar(self.directorio / 'base.json')
+        base['niveles']['mini']['registrar_venta']['consultas'] = 1
+        linea_base.guardar(base, self.directorio / 'base.json')
+        with self.assertRaisesMessage(CommandError, '1 regresiones'):
+            self.benchmark(escenarios=['registrar_venta'], umbral=[('tiempo_ms', 100.0), ('p95_ms', 100.0)])
+
+
+@override_settings(SQL_INSTRUMENTACION=True, SQL_LENTA_MS=0)
+class InstrumentacionSQLTests(TestCase):
+
+    def medir(self, vista):
+        middleware = InstrumentacionSQLMiddleware(lambda request: vista() or HttpResponse())
+        with self.assertLogs('backend.webapp.gestion.sql') as logs:
+            respuesta = middleware(RequestFactory().get('/ventas/registrar/'))
+        return respuesta, json.loads(logs.records[-1].getMessage())
+
+    def test_marca_n_mas_1_y_captura_el_plan_de_las_lentas(self):
+        productos = crear_productos(6)
+
+        def vista():
+            for producto in productos:
+                Producto.objects.filter(pk=producto.pk).exists()
+            list(Producto.objects.filter(pk__in=[p.pk for p in productos[:2]]))
+            list(Producto.objects.filter(pk__in=[p.pk for p in productos]))
+
+        respuesta, linea = self.medir(vista)
+        self.assertEqual(linea['consultas'], 8)
+        self.assertEqual(linea['vista'], 'registrar_venta')
+        # Las dos listas IN tienen la misma forma, pero solo se repiten dos veces
+        self.assertEqual([n1['veces'] for n1 in linea['n1']], [6])
+        self.assertIn('"gestion_producto"."id" = %s', linea['n1'][0]['sql'])
+        self.assertEqual(len(linea['lentas']), 5)
+        self.assertTrue(all(lenta['plan'] for lenta in linea['lentas']))
+        self.assertRegex(respuesta['Server-Timing'], r'^db;dur=[\d.]+;desc="8 consultas", n1;desc="1 formas repetidas", sql-lenta;')
+
+    def test_cabecera_en_las_vistas_y_apagado_no_se_instala(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        with self.assertLogs('backend.webapp.gestion.sql') as logs:
+            respuesta = self.client.get(reverse('panel_admin'))
+        self.assertTrue(respuesta['Server-Timing'].startswith('db;dur='))
+        self.assertEqual(json.loads(logs.records[-1].getMessage())['vista'], 'panel_admin')
+
+        with override_settings(SQL_INSTRUMENTACION=False), self.assertRaises(MiddlewareNotUsed):
+            InstrumentacionSQLMiddleware(lambda request: HttpResponse())
+
+
+def _sumar_en_otro_proceso():
+    metricas.FACTURAS_CREADAS.inc(5)
+
+
+class MetricasTests(TestCase):
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = override_settings(METRICAS_DIR=directorio, DOCUMENTOS_CACHE_DIR=directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.basicos = crear_basicos()
+        self.productos = crear_productos(2)
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+
+    def valores(self):
+        respuesta = self.client.get('/metrics')
+        self.assertEqual(respuesta['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        texto = respuesta.content.decode()
+        return dict(linea.rsplit(' ', 1) for linea in texto.splitlines() if not linea.startswith('#')), texto
+
+    def test_contadores_de_negocio_histogramas_y_cache(self):
+        a, b = self.productos
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('registrar_venta'), datos_venta(self.basicos, [(a, 2), (b, 3)]))
+        factura = Factura.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('ventas_panel'), {'venta_id': factura.pk})
+        self.client.get(reverse('factura_pdf', args=[factura.pk]))
+        self.client.get(reverse('factura_pdf', args=[factura.pk]))
+
+        valores, texto = self.valores()
+        self.assertEqual(valores['bar_facturas_creadas_total'], '1')
+        self.assertEqual(valores['bar_facturas_anuladas_total'], '1')
+        self.assertEqual(valores['bar_unidades_vendidas_total'], '5')
+        self.assertEqual(valores['bar_pdf_dibujo_segundos_count'], '1')
+        self.assertEqual(valores['bar_cache_lecturas_total{cache="documentos",resultado="fallo"}'], '1')
+        self.assertEqual(valores['bar_cache_lecturas_total{cache="documentos",resultado="acierto"}'], '1')
+        self.assertEqual(valores['bar_http_peticion_segundos_count{vista="factura_pdf",metodo="GET"}'], '2')
+        self.assertEqual(valores['bar_http_peticion_segundos_bucket{vista="factura_pdf",metodo="GET",le="+Inf"}'], '2')
+        self.assertIn('bar_http_db_segundos_sum{vista="registrar_venta"}', valores)
+        self.assertIn('# TYPE bar_http_peticion_segundos histogram', texto)
+
+        # Las cubetas son acumulativas
+        cubetas = [
+            float(valor) for clave, valor in valores.items()
+            if clave.startswith('bar_http_peticion_segundos_bucket{vista="factura_pdf"')
+        ]
+        self.assertEqual(cubetas, sorted(cubetas))
+
+    def test_suma_los_procesos_y_solo_responde_a_las_ip_permitidas(self):
+        metricas.FACTURAS_CREADAS.inc()
+        proceso = multiprocessing.get_context('fork').Process(target=_sumar_en_otro_proceso)
+        proceso.start()
+        proceso.join()
+        self.assertEqual(proceso.exitcode, 0)
+        self.assertEqual(len(list(Path(settings.METRICAS_DIR).glob('*.bin'))), 2)
+        self.assertEqual(self.valores()[0]['bar_facturas_creadas_total'], '6')
+
+        # El proceso terminó: su archivo se pliega en el acumulado y el total no cambia
+        self.assertEqual(metricas.plegar(settings.METRICAS_DIR), 1)
+        self.assertEqual(len(list(Path(settings.METRICAS_DIR).glob('*.bin'))), 1)
+        self.assertEqual(self.valores()[0]['bar_facturas_creadas_total'], '6')
+        self.assertEqual(metricas.plegar(settings.METRICAS_DIR), 0)
+
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.8').status_code, 403)
+
+
+class PerfiladoTests(TestCase):
+
+    def setUp(self):
+        self.directorio = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        ajustes = override_settings(PERFILADO_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.admin = User.objects.create_superuser('admin', password='x')
+
+    def test_un_administrador_pide_el_perfil_y_lo_descarga(self):
+        self.client.force_login(self.admin)
+        respuesta = self.client.get(reverse('panel_admin'), {'perfilar': '1'})
+        captura = respuesta['X-Perfil']
+        self.assertEqual(sorted(ruta.name for ruta in self.directorio.iterdir()),
+                         [f"{captura}.folded", f"{captura}.json", f"{captura}.prof"])
+
+        estadisticas = pstats.Stats(str(self.directorio / f"{captura}.prof"))
+        self.assertTrue(any(funcion == 'panel_admin' for _, _, funcion in estadisticas.stats))
+        pilas = dict(linea.rsplit(' ', 1) for linea in (self.directorio / f"{captura}.folded").read_text().splitlines())
+        self.assertEqual(sum(int(valor) for valor in pilas.values()), perfilado.capturas()[0]['muestras'])
+
+        # La cabecera también sirve; la lista va de la más lenta a la más rápida
+        self.client.get(reverse('ventas_panel'), HTTP_X_PERFILAR='1')
+        panel = self.client.get(reverse('perfiles_panel'))
+        capturas = panel.context['capturas']
+        self.assertEqual({c['vista'] for c in capturas}, {'panel_admin', 'ventas_panel'})
+        self.assertEqual([c['ms'] for c in capturas], sorted((c['ms'] for c in capturas), reverse=True))
+        self.assertEqual(capturas[0]['motivo'], 'pedido')
+        self.assertContains(panel, reverse('descargar_perfil', args=[f"{captura}.prof"]))
+
+        descarga = self.client.get(reverse('descargar_perfil', args=[f"{captura}.folded"]))
+        self.assertEqual(b''.join(descarga.streaming_content).decode(), (self.directorio / f"{captura}.folded").read_text())
+        self.assertEqual(self.client.get(reverse('descargar_perfil', args=[f"{captura}.json"])).status_code, 404)
+
+    def test_sin_rol_de_administrador_no_se_perfila(self):
+        self.client.force_login(User.objects.create_user('cajero', password='x'))
+        respuesta = self.client.get(reverse('panel_user'), {'perfilar': '1'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('X-Perfil', respuesta)
+        self.assertEqual(list(self.directorio.iterdir()), [])
+        self.assertEqual(self.client.get(reverse('perfiles_panel')).status_code, 302)
+
+    @override_settings(PERFILADO_MUESTREO=1.0, PERFILADO_MAX=2)
+    def test_muestreo_y_rotacion(self):
+        for _ in range(3):
+            respuesta = self.client.get(reverse('login'))
+        self.assertEqual(len(list(self.directorio.glob('*.json'))), 2)
+        self.assertEqual(len(list(self.directorio.iterdir())), 6)
+        self.assertTrue((self.directorio / f"{respuesta['X-Perfil']}.json").exists())
+        self.assertEqual({c['motivo'] for c in perfilado.capturas(self.directorio)}, {'muestreo'})
+
+    def test_muestreador_cuenta_las_pilas_del_hilo(self):
+        def ocupada():
+            fin = time.perf_counter() + 0.2
+            while time.perf_counter() < fin:
+                pass
+
+        muestreador = perfilado.Muestreador(threading.get_ident(), 0.001)
+        muestreador.start()
+        ocupada()
+        pilas = muestreador.detener()
+        self.assertTrue(pilas)
+        self.assertTrue(any(pila.endswith('ocupada (gestion/tests.py:' + str(ocupada.__code__.co_firstlineno) + ')')
+                            for pila in pilas))
@@ -12,13 +12,17 @@ urlpatterns = [
     path('admin-panel/empleados/', views.empleados_panel, name='empleados_panel'),
     path('admin-panel/inventario/', views.inventario_panel, name='inventario_panel'),
     path('admin-panel/opciones/', views.opciones_panel, name='opciones_panel'),
+    path('admin-panel/perfiles/', views.perfiles_panel, name='perfiles_panel'),
+    path('admin-panel/perfiles/<str:archivo>', views.descargar_perfil, name='descargar_perfil'),
 
     path('compras/registrar/', views.registrar_compra, name='registrar_compra'),
     path('compras/modificar/<int:compra_id>/', views.modificar_compra, name='modificar_compra'),
 
     path('ventas/registrar/', views.registrar_venta, name='registrar_venta'),
+    path('ventas/modificar/<str:venta_id>/', views.modificar_venta, name='modificar_venta'),
     path('ventas/<str:factura_id>/', views.detalle_factura, name='detalle_factura'),
 
+    path('inventario/buscar/', views.busqueda_productos, name='busqueda_productos'),
     path('inventario/registrar/', views.registrar_producto, name='registrar_producto'),
     path('inventario/modificar/<int:producto_id>/', views.modificar_producto, name='modificar_producto'),
 
@@ -26,5 +30,9 @@ urlpatterns = [
     path('empleados/modificar/<str:empleado_id>/', views.modificar_empleado, name='modificar_empleado'),
     
     path('factura/<str:factura_id>/pdf/', views.factura_pdf, name='factura_pdf'),
+
+    path('api/analytics/<str:granularidad>/<str:dimension>/', views.api_analytics, name='api_analytics'),
+    path('exportar/<str:tabla>/<str:formato>/', views.exportar_tabla, name='exportar_tabla'),
+    path('metrics', views.metricas_prometheus, name='metricas'),
     
 ]
@@ -0,0 +1,27 @@
+# versiones.py
+"""
+Contadores de versión compartidos por todos los procesos.
+
+Las cachés de cada proceso (``locmem``) no ven lo que invalida otro worker;
+estos contadores sí, porque están en la base. Leer varias claves es una
+consulta por la clave primaria; una clave que nunca se incrementó vale 0.
+"""
+from django.db.models import F
+
+from backend.webapp.gestion.models import Version
+
+# Cambia cuando los agregados de ventas cambian sin pasar por el registro de
+# cambios: reconstrucciones del resumen o del cubo y cargas masivas
+DATOS = 'datos'
+
+
+def leer(*claves):
+    """Valores de ``claves``, en el mismo orden."""
+    valores = dict(Version.objects.filter(clave__in=claves).values_list('clave', 'valor'))
+    return tuple(valores.get(clave, 0) for clave in claves)
+
+
+def incrementar(*claves):
+    # Crear primero (sin pisar las existentes) deja el incremento atómico entre procesos
+    Version.objects.bulk_create([Version(clave=clave) for clave in claves], ignore_conflicts=True)
+    Version.objects.filter(clave__in=claves).update(valor=F('valor') + 1)
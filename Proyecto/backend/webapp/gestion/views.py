@@ -18,11 +18,21 @@ from django.utils import timezone
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import HttpResponse
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.template.loader import render_to_string
+from django.views.decorators.http import condition
+from backend.webapp.gestion.analytics import api as analytics_api
 from backend.webapp.gestion.analytics.utils import ventas_por_dia, ventas_por_mes
-from django.db.models import Sum
+from backend.webapp.gestion.busqueda import buscar_productos, filtrar_por_nombre
+from backend.webapp.gestion import documentos, metricas, perfilado, planillas
+from backend.webapp.gestion.catalogo import catalogo_compra, catalogo_venta, configuracion_actual, listar
+from backend.webapp.gestion.lineas import Conciliacion
+from backend.webapp.gestion.paginacion import filtrar_por_fecha, paginar, pide_json, respuesta_json
+from backend.webapp.gestion.pdf import dibujar_factura
+from backend.webapp.gestion.resumen import total_del_dia
+from backend.webapp.gestion.roles import ROL_ADMIN, es_admin, es_user, roles_de
+from backend.webapp.gestion.stock import ajustar_stock, obtener_productos
 
 def login_view(request):
     if request.method == 'POST':
@@ -33,7 +43,7 @@ def login_view(request):
         if user is not None:
             login(request, user)
             # Aquí puedes redirigir según el tipo de usuario:
-            if user.is_superuser or user.groups.filter(name='Administrador').exists():
+            if ROL_ADMIN in roles_de(request, user):
                 return redirect('panel_admin')
             else:
                 return redirect('panel_user')  # puedes definir esta vista luego
@@ -44,12 +54,6 @@ def login_view(request):
 def logout_view(request):
     logout(request)
     return redirect('login')
-def es_admin(user):
-    return user.is_superuser or user.groups.filter(name='Administrador').exists()
-
-def es_user(user):
-    return not es_admin(user)
-
 @login_required
 @user_passes_test(es_admin)
 def panel_admin(request):
@@ -58,7 +62,7 @@ def panel_admin(request):
 
     # Obtener las ventas totales de hoy para el panel del dueño
     today = timezone.localdate()
-    ventas_hoy_admin = Factura.objects.filter(fecha_emision=today, anulado=False).aggregate(total_dia=Sum('total'))['total_dia'] or Decimal('0.00')
+    ventas_hoy_admin = total_del_dia(today)
 
     context = {
         'productos_bajo_stock': productos_bajo_stock,
@@ -72,10 +76,7 @@ def panel_user(request):
     # Obtener las ventas totales de hoy para el negocio (cuadre de caja general)
     # No se filtra por empleado específico, ya que la caja es compartida o manejada por pocos.
     today = timezone.localdate()
-    ventas_hoy_general = Factura.objects.filter(
-        fecha_emision=today,
-        anulado=False
-    ).aggregate(total_dia=Sum('total'))['total_dia'] or Decimal('0.00')
+    ventas_hoy_general = total_del_dia(today)
 
     context = {
         'ventas_hoy_general': ventas_hoy_general,
@@ -86,9 +87,13 @@ def ventas_panel(request):
     if request.method == 'POST':
         venta_id = request.POST.get('venta_id')
         try:
-            factura = Factura.objects.get(pk=venta_id)
-            factura.anulado = not factura.anulado
-            factura.save()
+            with transaction.atomic():
+                factura = Factura.objects.get(pk=venta_id)
+                factura.anulado = not factura.anulado
+                factura.save(update_fields=['anulado'])
+                if factura.anulado:
+                    transaction.on_commit(metricas.factura_anulada)
+            documentos.invalidar(factura.pk)
             estado = "anulada" if factura.anulado else "reactivada"
             messages.success(request, f"Venta #{factura.id} {estado} correctamente.")
         except Factura.DoesNotExist:
@@ -96,65 +101,134 @@ def ventas_panel(request):
         return redirect('ventas_panel')
 
     query_id = request.GET.get('id')
+    ventas = Factura.objects.all()
     if query_id:
-        ventas = Factura.objects.filter(id=query_id).select_related('cliente', 'empleado')
-    else:
-        ventas = Factura.objects.select_related('cliente', 'empleado').order_by('-fecha_emision')
+        ventas = ventas.filter(id=query_id)
+    ventas = filtrar_por_fecha(ventas, request.GET, 'fecha_emision')
+    if request.GET.get('empleado'):
+        ventas = ventas.filter(empleado_id=request.GET['empleado'])
+    if request.GET.get('cliente', '').isdigit():
+        ventas = ventas.filter(cliente_id=request.GET['cliente'])
+    if request.GET.get('estado') in ('activo', 'anulado'):
+        ventas = ventas.filter(anulado=request.GET['estado'] == 'anulado')
+
+    orden = ['-fecha_emision', '-id']
+    if pide_json(request):
+        return respuesta_json(*paginar(ventas.values(
+            'id', 'fecha_emision', 'hora_emision', 'total', 'anulado',
+            'cliente_id', 'cliente__nombre', 'empleado_id', 'empleado__nombre', 'empleado__apellido',
+        ), orden, request.GET))
+
+    ventas, siguiente = paginar(
+        ventas.select_related('cliente', 'empleado').only(
+            'id', 'fecha_emision', 'total', 'anulado',
+            'cliente__nombre', 'empleado__nombre', 'empleado__apellido',
+        ),
+        orden,
+        request.GET,
+    )
 
-    configuracion = ConfiguracionFactura.objects.first()
+    configuracion = configuracion_actual()
 
     # Aquí se define la URL del panel correcto
-    if request.user.is_superuser or request.user.groups.filter(name='Administrador').exists():
+    if es_admin(request.user):
         panel_url = 'panel_admin'
     else:
         panel_url = 'panel_user'
 
     return render(request, 'gestion/ventas_panel.html', {
         'ventas': ventas,
+        'siguiente': siguiente,
         'query_id': query_id or '',
         'configuracion': configuracion,
-        'panel_url': panel_url  # ← Añadimos esto
+        'panel_url': panel_url,  # ← Añadimos esto
+        'empleados': listar('empleados'),
+        'filtros': request.GET,
     })
+def etag_factura(request, factura_id):
+    # Se guarda en la petición para no recalcularla dentro de la vista
+    request.huella_factura = documentos.huella(factura_id)
+    return request.huella_factura
+
+def documento_factura(request, factura_id, tipo, generar):
+    """Contenido del documento desde la caché en disco, o generado y guardado."""
+    huella = request.huella_factura
+    if huella is None:
+        raise Http404("Factura no encontrada")
+    contenido = documentos.leer(factura_id, huella, tipo)
+    if contenido is None:
+        contenido = generar()
+        documentos.guardar(factura_id, huella, tipo, contenido)
+    return contenido
+
+@condition(etag_func=etag_factura)
 def detalle_factura(request, factura_id):
-    factura = get_object_or_404(
-        Factura.objects.select_related('cliente', 'empleado', 'tipo_impuesto', 'tipo_pago', 'configuracion')
-                       .prefetch_related('detalles__producto'),
-        pk=factura_id
-    )
-    return render(request, 'gestion/detalle_factura.html', {
-        'factura': factura
-    })
+    def generar():
+        factura = get_object_or_404(
+            Factura.objects.select_related('cliente', 'empleado', 'tipo_impuesto', 'tipo_pago', 'configuracion')
+                           .prefetch_related('detalles__producto'),
+            pk=factura_id
+        )
+        return render_to_string('gestion/detalle_factura.html', {'factura': factura}, request).encode()
+
+    return HttpResponse(documento_factura(request, factura_id, 'html', generar))
 def compras_panel(request):
     query_id = request.GET.get('id')
+    compras = Compra.objects.all()
     if query_id:
-        compras = Compra.objects.filter(id=query_id).select_related('proveedor')
-    else:
-        compras = Compra.objects.select_related('proveedor').order_by('-fecha')
+        compras = compras.filter(id=query_id)
+    compras = filtrar_por_fecha(compras, request.GET, 'fecha__date')
+    if request.GET.get('proveedor', '').isdigit():
+        compras = compras.filter(proveedor_id=request.GET['proveedor'])
+
+    orden = ['-fecha', '-id']
+    if pide_json(request):
+        return respuesta_json(*paginar(
+            compras.values('id', 'fecha', 'total', 'proveedor_id', 'proveedor__nombre'), orden, request.GET
+        ))
+
+    compras, siguiente = paginar(
+        compras.select_related('proveedor').only('id', 'fecha', 'total', 'proveedor__nombre'),
+        orden,
+        request.GET,
+    )
     return render(request, 'gestion/compras_panel.html', {
         'compras': compras,
-        'query_id': query_id or ''
+        'siguiente': siguiente,
+        'query_id': query_id or '',
+        'filtros': request.GET,
     })
 
 def empleados_panel(request):
     query_id = request.GET.get('id')
+    empleados = Empleado.objects.all()
     if query_id:
-        empleados = Empleado.objects.filter(id=query_id)
-    else:
-        empleados = Empleado.objects.all()
+        empleados = empleados.filter(id=query_id)
+
+    campos = ('id', 'nombre', 'apellido', 'celular', 'estado')
+    if pide_json(request):
+        return respuesta_json(*paginar(empleados.values(*campos), ['id'], request.GET))
+
+    empleados, siguiente = paginar(empleados.only(*campos), ['id'], request.GET)
     return render(request, 'gestion/empleados_panel.html', {
         'empleados': empleados,
+        'siguiente': siguiente,
         'query_id': query_id or ''
     })
 
 def inventario_panel(request):
     query_nombre = request.GET.get('nombre')
+    productos = Producto.objects.all()
     if query_nombre:
-        productos = Producto.objects.filter(nombre__icontains=query_nombre)
-    else:
-        productos = Producto.objects.all()
+        productos = filtrar_por_nombre(productos, query_nombre)
+
+    campos = ('id', 'nombre', 'precio', 'stock', 'cantidad_medida', 'unidad_medida')
+    if pide_json(request):
+        return respuesta_json(*paginar(productos.values(*campos), ['id'], request.GET))
+    productos, siguiente = paginar(productos.only(*campos), ['id'], request.GET)
 
     # Determina el panel de retorno y permisos
-    if request.user.is_superuser or request.user.groups.filter(name='Administrador').exists():
+    if es_admin(request.user):
         panel_url = 'panel_admin'
         puede_editar = True
     else:
@@ -163,12 +237,68 @@ def inventario_panel(request):
 
     return render(request, 'gestion/inventario_panel.html', {
         'productos': productos,
+        'siguiente': siguiente,
         'query_nombre': query_nombre or '',
         'panel_url': panel_url,
         'puede_editar': puede_editar
     })
 
 
+def busqueda_productos(request):
+    # Búsqueda por nombre para el inventario y el formulario de ventas
+    return JsonResponse({'resultados': buscar_productos(request.GET.get('q', ''))})
+
+
+def etag_analytics(request, granularidad, dimension):
+    # Una petición inválida no tiene ETag: la vista responde 400
+    try:
+        request.etag_analytics = analytics_api.etag(analytics_api.consulta(granularidad, dimension, request.GET))
+    except ValueError:
+        request.etag_analytics = None
+    return request.etag_analytics
+
+@login_required
+@user_passes_test(es_admin)
+@condition(etag_func=etag_analytics)
+def api_analytics(request, granularidad, dimension):
+    try:
+        parametros = analytics_api.consulta(granularidad, dimension, request.GET)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    response = HttpResponse(analytics_api.contenido(parametros, request.etag_analytics), content_type='application/json')
+    # Los clientes pueden guardarla, pero deben revalidar con la ETag en cada uso
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@login_required
+@user_passes_test(es_admin)
+def exportar_tabla(request, tabla, formato):
+    # ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD&empleado=ID (el empleado solo aplica a ventas)
+    if tabla not in planillas.TABLAS or formato not in planillas.FORMATOS:
+        raise Http404("Exportación no disponible")
+    return planillas.respuesta(tabla, formato, planillas.filas(tabla, request.GET))
+
+def metricas_prometheus(request):
+    # Sin sesión, para que Prometheus pueda leerlas; solo desde METRICAS_IPS
+    if request.META.get('REMOTE_ADDR') not in settings.METRICAS_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(metricas.exposicion(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@login_required
+@user_passes_test(es_admin)
+def perfiles_panel(request):
+    # Las capturas del perfilado, de la más lenta a la más rápida
+    return render(request, 'gestion/perfiles_panel.html', {'capturas': perfilado.capturas()})
+
+@login_required
+@user_passes_test(es_admin)
+def descargar_perfil(request, archivo):
+    ruta = perfilado.ruta_archivo(archivo)
+    if ruta is None:
+        raise Http404("Perfil no encontrado")
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=archivo)
+
+
 def opciones_panel(request):
     configuracion = ConfiguracionFactura.objects.first()
 
@@ -179,47 +309,46 @@ def opciones_panel(request):
             configuracion.save()
         else:
             ConfiguracionFactura.objects.create(prefijo=nuevo_prefijo)
+        # El prefijo aparece en todas las facturas ya emitidas
+        documentos.invalidar_todo()
         return redirect('opciones_panel')
 
     return render(request, 'gestion/opciones_panel.html', {'configuracion': configuracion})
 
+def leer_lineas_compra(request):
+    """Lee las líneas del formulario de compra y valida que los productos existan."""
+    lineas = [
+        {'producto_id': int(pid), 'cantidad': int(cant), 'costo_producto': Decimal(cost)}
+        for pid, cant, cost in zip(
+            request.POST.getlist('producto'),
+            request.POST.getlist('cantidad'),
+            request.POST.getlist('costo'),
+        )
+    ]
+    obtener_productos(linea['producto_id'] for linea in lineas)
+    return lineas
+
+def guardar_lineas_compra(compra, detalles, lineas):
+    """Aplica solo la diferencia entre ``detalles`` y ``lineas`` y suma el stock neto."""
+    conciliacion = Conciliacion(detalles, lineas, ['cantidad', 'costo_producto'])
+    conciliacion.aplicar(DetalleCompra, compra=compra)
+    ajustar_stock(conciliacion.cambios)
+
 @transaction.atomic
 def registrar_compra(request):
     if request.method == 'POST':
         proveedor_id = request.POST.get('proveedor')
-        productos = request.POST.getlist('producto')
-        cantidades = request.POST.getlist('cantidad')
-        costos = request.POST.getlist('costo')
-
         proveedor = Proveedor.objects.get(pk=proveedor_id) if proveedor_id else None
-        compra = Compra.objects.create(proveedor=proveedor)
-        total = 0
-
-        for pid, cant, cost in zip(productos, cantidades, costos):
-            producto = Producto.objects.get(pk=pid)
-            cantidad = int(cant)
-            costo_producto = Decimal(cost)
-
-            DetalleCompra.objects.create(
-                compra=compra,
-                producto=producto,
-                cantidad=cantidad,
-                costo_producto=costo_producto
-            )
-
-            producto.stock += cantidad
-            producto.save()
-
-            total += cantidad * costo_producto
+        lineas = leer_lineas_compra(request)
 
-        compra.total = total
-        compra.save()
+        total = sum((l['cantidad'] * l['costo_producto'] for l in lineas), Decimal('0.00'))
+        compra = Compra.objects.create(proveedor=proveedor, total=total)
+        guardar_lineas_compra(compra, [], lineas)
 
         return redirect('compras_panel')
 
     context = {
-        'productos': Producto.objects.all(),
-        'proveedores': Proveedor.objects.all(),
+        **catalogo_compra(),
     }
     return render(request, 'gestion/registrar_compra.html', context)
 
@@ -229,48 +358,20 @@ def modificar_compra(request, compra_id):
 
     if request.method == 'POST':
         proveedor_id = request.POST.get('proveedor')
-        productos = request.POST.getlist('producto')
-        cantidades = request.POST.getlist('cantidad')
-        costos = request.POST.getlist('costo')
-
         proveedor = Proveedor.objects.get(pk=proveedor_id) if proveedor_id else None
-        compra.proveedor = proveedor
-        compra.total = 0
-
-        for detalle in compra.detalles.all():
-            producto = detalle.producto
-            producto.stock -= detalle.cantidad
-            producto.save()
-
-        compra.detalles.all().delete()
+        lineas = leer_lineas_compra(request)
 
-        total = 0
-        for pid, cant, cost in zip(productos, cantidades, costos):
-            producto = Producto.objects.get(pk=pid)
-            cantidad = int(cant)
-            costo_producto = Decimal(cost)
+        guardar_lineas_compra(compra, list(compra.detalles.all()), lineas)
 
-            DetalleCompra.objects.create(
-                compra=compra,
-                producto=producto,
-                cantidad=cantidad,
-                costo_producto=costo_producto
-            )
-
-            producto.stock += cantidad
-            producto.save()
-
-            total += cantidad * costo_producto
-
-        compra.total = total
-        compra.save()
+        compra.proveedor = proveedor
+        compra.total = sum((l['cantidad'] * l['costo_producto'] for l in lineas), Decimal('0.00'))
+        compra.save(update_fields=['proveedor', 'total'])
 
         return redirect('compras_panel')
 
     context = {
         'compra': compra,
-        'productos': Producto.objects.all(),
-        'proveedores': Proveedor.objects.all(),
+        **catalogo_compra(),
     }
     return render(request, 'gestion/modificar_compra.html', context)
 
@@ -295,9 +396,10 @@ def registrar_venta(request):
 
         subtotal = Decimal('0.00')
         productos_validos = []
+        productos_por_id = obtener_productos(productos)
 
         for pid, cant in zip(productos, cantidades):
-            producto = Producto.objects.get(pk=pid)
+            producto = productos_por_id[int(pid)]
             cantidad = int(cant)
 
             if cantidad > producto.stock:
@@ -308,11 +410,7 @@ def registrar_venta(request):
 
         if errores:
             context = {
-                'productos': Producto.objects.all(),
-                'clientes': Cliente.objects.all(),
-                'empleados': Empleado.objects.all(),
-                'tipos_pago': TipoPago.objects.all(),
-                'impuestos': DetalleImpuesto.objects.all(),
+                **catalogo_venta(),
                 'errores': errores,
                 'cliente_id': cliente_id,
                 'empleado_id': empleado_id,
@@ -343,25 +441,28 @@ def registrar_venta(request):
             propina=propina,
         )
 
-        for producto, cantidad in productos_validos:
-            DetalleFactura.objects.create(
+        DetalleFactura.objects.bulk_create([
+            DetalleFactura(
                 factura=factura,
                 producto=producto,
                 cantidad=cantidad,
                 precio_unitario=producto.precio
             )
-            producto.stock -= cantidad
-            producto.save()
+            for producto, cantidad in productos_validos
+        ])
+
+        descuentos = {}
+        for producto, cantidad in productos_validos:
+            descuentos[producto.pk] = descuentos.get(producto.pk, 0) - cantidad
+        ajustar_stock(descuentos)
+        unidades = sum(cantidad for _, cantidad in productos_validos)
+        transaction.on_commit(lambda: metricas.venta_registrada(unidades))
 
         return redirect('ventas_panel')
 
     # GET normal
     context = {
-        'productos': Producto.objects.all(),
-        'clientes': Cliente.objects.all(),
-        'empleados': Empleado.objects.all(),
-        'tipos_pago': TipoPago.objects.all(),
-        'impuestos': DetalleImpuesto.objects.all(),
+        **catalogo_venta(),
     }
     return render(request, 'gestion/registrar_venta.html', context)
 
@@ -369,7 +470,6 @@ def registrar_venta(request):
 @transaction.atomic
 def modificar_venta(request, venta_id):
     factura = get_object_or_404(Factura, pk=venta_id)
-    detalles_anteriores = list(factura.detallefactura_set.all())
 
     if request.method == 'POST':
         cliente_id = request.POST.get('cliente')
@@ -386,21 +486,35 @@ def modificar_venta(request, venta_id):
         tipo_pago = TipoPago.objects.get(pk=tipo_pago_id)
         tipo_impuesto = DetalleImpuesto.objects.get(pk=impuesto_id)
 
-        # Revertir stock anterior
-        for detalle in detalles_anteriores:
-            producto = detalle.producto
-            producto.stock += detalle.cantidad
-            producto.save()
+        productos_por_id = obtener_productos(productos)
+        lineas = [
+            {'producto_id': int(pid), 'cantidad': int(cant), 'precio_unitario': productos_por_id[int(pid)].precio}
+            for pid, cant in zip(productos, cantidades)
+        ]
+        conciliacion = Conciliacion(factura.detalles.all(), lineas, ['cantidad', 'precio_unitario'])
 
-        # Eliminar detalles anteriores
-        factura.detallefactura_set.all().delete()
+        # Solo se valida lo que la edición agrega: las unidades que ya estaban
+        # en la factura siguen reservadas para ella.
+        errores = []
+        for pid, cambio in conciliacion.cambios.items():
+            if cambio > 0 and cambio > productos_por_id[pid].stock:
+                producto = productos_por_id[pid]
+                disponible = producto.stock + conciliacion.anteriores[pid]
+                errores.append(f"Stock insuficiente para el producto: {producto.nombre} (stock disponible: {disponible})")
 
-        subtotal = Decimal('0.00')
-        for pid, cant in zip(productos, cantidades):
-            producto = Producto.objects.get(pk=pid)
-            cantidad = int(cant)
-            subtotal += producto.precio * cantidad
+        if errores:
+            context = {
+                'factura': factura,
+                'detalles': factura.detalles.select_related('producto'),
+                **catalogo_venta(),
+                'errores': errores,
+            }
+            return render(request, 'gestion/modificar_venta.html', context)
 
+        conciliacion.aplicar(DetalleFactura, factura=factura)
+        ajustar_stock({pid: -cambio for pid, cambio in conciliacion.cambios.items()})
+
+        subtotal = sum((l['precio_unitario'] * l['cantidad'] for l in lineas), Decimal('0.00'))
         impuesto_decimal = tipo_impuesto.impuesto / Decimal('100.0')
         base_gravable = subtotal
         impuesto_total = (base_gravable * impuesto_decimal).quantize(Decimal('0.01'))
@@ -417,35 +531,14 @@ def modificar_venta(request, venta_id):
         factura.recibido = recibido
         factura.propina = propina
         factura.save()
-
-        # Crear nuevos detalles y descontar stock
-        for pid, cant in zip(productos, cantidades):
-            producto = Producto.objects.get(pk=pid)
-            cantidad = int(cant)
-
-            if cantidad > producto.stock:
-                raise ValueError(f"Stock insuficiente para {producto.nombre}")
-
-            DetalleFactura.objects.create(
-                factura=factura,
-                producto=producto,
-                cantidad=cantidad,
-                precio_unitario=producto.precio
-            )
-
-            producto.stock -= cantidad
-            producto.save()
+        documentos.invalidar(factura.pk)
 
         return redirect('ventas_panel')
 
     context = {
         'factura': factura,
-        'detalles': factura.detallefactura_set.all(),
-        'productos': Producto.objects.all(),
-        'clientes': Cliente.objects.all(),
-        'empleados': Empleado.objects.all(),
-        'tipos_pago': TipoPago.objects.all(),
-        'impuestos': DetalleImpuesto.objects.all(),
+        'detalles': factura.detalles.select_related('producto'),
+        **catalogo_venta(),
     }
     return render(request, 'gestion/modificar_venta.html', context)
 
@@ -544,72 +637,14 @@ def modificar_empleado(request, empleado_id):
 
     return render(request, 'gestion/modificar_empleado.html', {'empleado': empleado})
 
+@condition(etag_func=etag_factura)
 def factura_pdf(request, factura_id):
-    factura = get_object_or_404(Factura.objects.prefetch_related('detalles__producto'), pk=factura_id)
-
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Factura_{factura.id}.pdf"'
-
-    p = canvas.Canvas(response, pagesize=letter)
-    width, height = letter
-    y = height - 40
-
-    # Cabecera
-    p.setFont("Helvetica-Bold", 16)
-    prefijo = factura.configuracion.prefijo  # Asegúrate que existe ese campo
-    p.drawCentredString(width / 2, y, f"Factura {prefijo}{factura.id}")
-    y -= 30
-
-    # Datos básicos
-    p.setFont("Helvetica", 12)
-    p.drawString(50, y, f"Fecha: {factura.fecha_emision} {factura.hora_emision.strftime('%H:%M')}")
-    y -= 20
-    p.drawString(50, y, f"Cliente: {factura.cliente}")
-    y -= 20
-    p.drawString(50, y, f"Empleado: {factura.empleado}")
-    y -= 20
-    p.drawString(50, y, f"Método de Pago: {factura.tipo_pago}")
-    y -= 40
-
-    # Encabezados de tabla
-    p.setFont("Helvetica-Bold", 11)
-    p.drawString(50, y, "Producto")
-    p.drawString(250, y, "Cantidad")
-    p.drawString(350, y, "Precio Unit.")
-    p.drawString(450, y, "Total")
-    y -= 20
-
-    p.setFont("Helvetica", 10)
-    for item in factura.detalles.all():
-        if y < 100:  # Salto de página si estamos muy abajo
-            p.showPage()
-            y = height - 40
-        total_item = item.precio_unitario * item.cantidad
-        p.drawString(50, y, str(item.producto.nombre))
-        p.drawString(250, y, str(item.cantidad))
-        p.drawString(350, y, f"${item.precio_unitario:.2f}")
-        p.drawString(450, y, f"${total_item:.2f}")
-        y -= 18
-
-    # Totales
-    y -= 30
-    p.setFont("Helvetica-Bold", 11)
-    p.drawString(50, y, f"Subtotal: ${factura.subtotal:.2f}")
-    y -= 18
-    p.drawString(50, y, f"Base Gravable: ${factura.base_gravable:.2f}")
-    y -= 18
-    impuesto = factura.total - factura.base_gravable
-    p.drawString(50, y, f"Impuesto ({factura.tipo_impuesto.nombre}): ${impuesto:.2f}")
-    y -= 18
-    p.drawString(50, y, f"Propina: ${factura.propina:.2f}")
-    y -= 18
-    p.drawString(50, y, f"Total: ${factura.total:.2f}")
-    y -= 18
-    p.drawString(50, y, f"Recibido: ${factura.recibido:.2f}")
-    y -= 18
-    cambio = factura.recibido - factura.total
-    p.drawString(50, y, f"Cambio: ${cambio:.2f}")
-
-    p.showPage()
-    p.save()
+    contenido = documento_factura(request, factura_id, 'pdf', lambda: dibujar_factura_pdf(factura_id))
+    response = HttpResponse(contenido, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="Factura_{factura_id}.pdf"'
     return response
+
+def dibujar_factura_pdf(factura_id):
+    factura = get_object_or_404(Factura.objects.prefetch_related('detalles__producto'), pk=factura_id)
+    with metricas.dibujo_pdf():
+        return dibujar_factura(factura)
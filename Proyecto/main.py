@@ -3,6 +3,7 @@ import subprocess
 import sys
 from pathlib import Path
 
+from backend.datapp import snapshot
 from backend.datapp.dashboard import run_dashboard
 
 
@@ -18,17 +19,24 @@ def main() -> None:
     )
     parser.add_argument(
         "--app",
-        choices=["dashboard", "server"],
+        choices=["dashboard", "server", "snapshot"],
         default="dashboard",
         help=(
-            "Elige 'dashboard' para Streamlit (por defecto) "
-            "o 'server' para Django"
+            "Elige 'dashboard' para Streamlit (por defecto), "
+            "'server' para Django o 'snapshot' para actualizar los datos de analytics"
         ),
     )
+    parser.add_argument(
+        "--completo",
+        action="store_true",
+        help="Con --app snapshot, reconstruye todos los meses en vez de solo los cambios",
+    )
     args = parser.parse_args()
 
     if args.app == "dashboard":
         run_dashboard()
+    elif args.app == "snapshot":
+        snapshot.ejecutar(completo=args.completo)
     else:
         run_django()
 